@@ -11,4 +11,5 @@ class ChatAgentClient:
         return AssistantChatAgentResponse(
             message=f"Here is the {agent_name} Processed message: This is a placeholder response for the user-question typeOfTheRequest:{type(user_chat_agent_request)}",
             figure=None,  # Placeholder for any figure data if needed
+            data=None,  # Placeholder for the result rows of the question
         )
@@ -0,0 +1,37 @@
+from typing import Protocol, runtime_checkable
+
+from app.agent.chat_agent_scheme import UserChatAgentRequest, AssistantChatAgentResponse
+
+
+class AgentTimeoutError(Exception):
+    """Raised when an agent call does not complete within the configured timeout."""
+
+    pass
+
+
+@runtime_checkable
+class ChatAgent(Protocol):
+    """
+    Synchronous chat agent protocol. e.g. ChatAgentClient
+    Sync agents must not be called from the event loop directly, wrap them with an executor adapter.
+    """
+
+    def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse: ...
+
+
+@runtime_checkable
+class AsyncChatAgent(Protocol):
+    """
+    Asynchronous chat agent protocol used by the service layer.
+    Implementations must not block the event loop.
+    """
+
+    async def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse: ...
+
+    def stats(self) -> dict: ...
+
+    async def ping(self, timeout_seconds: float) -> dict:
+        """Reachability of the agent backend: {"reachable": bool, "latency_ms": float, ...}, never raises"""
+        ...
+
+    async def close(self) -> None: ...
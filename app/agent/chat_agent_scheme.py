@@ -1,10 +1,26 @@
+from typing import List, Optional
 from pydantic import BaseModel
+from app.model.tabular_model import TabularResult
+
+
+class AgentContextMessage(BaseModel):
+    role: str
+    content: str
 
 
 class UserChatAgentRequest(BaseModel):
     message: str
+    model: Optional[str] = None
+    # previous turns of the conversation within the context token budget, oldest first
+    history: List[AgentContextMessage] = []
+    # rolling summary of the turns older than history
+    summary: Optional[str] = None
+    # when False the agent response cache is bypassed for this request
+    use_cache: bool = True
 
 
 class AssistantChatAgentResponse(BaseModel):
     message: str
     figure: dict | None = None
+    # result rows of the answer, kept out of message and rendered as a markdown table only when needed
+    data: TabularResult | None = None
@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from loguru import logger
+
+from app.agent.chat_agent_protocol import AgentTimeoutError, ChatAgent
+from app.agent.chat_agent_scheme import UserChatAgentRequest, AssistantChatAgentResponse
+
+
+def _timed_process(agent: ChatAgent, user_chat_agent_request: UserChatAgentRequest) -> tuple[AssistantChatAgentResponse, float]:
+    """Run the sync agent in the worker and return the result with its execution time in seconds."""
+    started = time.perf_counter()
+    result = agent.process(user_chat_agent_request)
+    return result, time.perf_counter() - started
+
+
+@dataclass
+class AgentCallStats:
+    """Counters for agent calls. Queue wait is the time between the call and the start of execution in a worker."""
+
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    in_flight: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+    execution_seconds_total: float = 0.0
+    execution_seconds_max: float = 0.0
+
+    def record(self, queue_wait: float, execution: float) -> None:
+        self.queue_wait_seconds_total += queue_wait
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+        self.execution_seconds_total += execution
+        self.execution_seconds_max = max(self.execution_seconds_max, execution)
+
+    def as_dict(self) -> dict:
+        completed = max(self.calls - self.errors - self.timeouts, 1)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "queue_wait_seconds_avg": self.queue_wait_seconds_total / completed,
+            "queue_wait_seconds_max": self.queue_wait_seconds_max,
+            "execution_seconds_avg": self.execution_seconds_total / completed,
+            "execution_seconds_max": self.execution_seconds_max,
+        }
+
+
+class ExecutorChatAgent:
+    """
+    Async adapter for a sync ChatAgent, runs agent.process in an executor so the event loop is never blocked.
+
+    - max_concurrency bounds the calls submitted to the executor, the rest wait in the adapter
+    - timeout_seconds bounds the wait of the caller, the executor slot is released when the work really finishes
+    """
+
+    executor_type = "executor"
+
+    def __init__(self, agent: ChatAgent, executor: Executor, max_concurrency: int, timeout_seconds: float | None):
+        self.agent = agent
+        self.agent_name = getattr(agent, "agent_name", type(agent).__name__)
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._timeout_seconds = timeout_seconds
+        self._stats = AgentCallStats()
+
+    async def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse:
+        logger.debug(f"BEGIN AGENT: {self.agent_name} process in {self.executor_type} executor")
+        self._stats.calls += 1
+        self._stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            # the slot is held until the executor work is done, even if the caller gives up on timeout
+            await asyncio.wait_for(self._semaphore.acquire(), self._timeout_seconds)
+            try:
+                future = asyncio.get_running_loop().run_in_executor(self._executor, _timed_process, self.agent, user_chat_agent_request)
+            except Exception:
+                self._semaphore.release()
+                raise
+            future.add_done_callback(lambda _: self._semaphore.release())
+
+            remaining = None if self._timeout_seconds is None else max(self._timeout_seconds - (time.perf_counter() - started), 0)
+            result, execution = await asyncio.wait_for(asyncio.shield(future), remaining)
+        except TimeoutError:
+            self._stats.timeouts += 1
+            logger.error(f"Agent {self.agent_name} timed out after {self._timeout_seconds} seconds")
+            raise AgentTimeoutError(f"Agent {self.agent_name} timed out after {self._timeout_seconds} seconds")
+        except Exception as e:
+            self._stats.errors += 1
+            logger.error(f"Agent {self.agent_name} failed: {e}")
+            raise
+        finally:
+            self._stats.in_flight -= 1
+
+        queue_wait = max(time.perf_counter() - started - execution, 0.0)
+        self._stats.record(queue_wait, execution)
+        logger.debug(f"END AGENT: {self.agent_name} process. queue_wait: {queue_wait:.4f}s, execution: {execution:.4f}s")
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "agent": self.agent_name,
+            "executor": self.executor_type,
+            "max_concurrency": self._max_concurrency,
+            "timeout_seconds": self._timeout_seconds,
+            **self._stats.as_dict(),
+        }
+
+    async def ping(self, timeout_seconds: float) -> dict:
+        """Round trip of a no-op through the executor, slow when its workers are busy, fails when they are gone"""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(self._executor, time.perf_counter), timeout_seconds)
+        except Exception as e:
+            return {
+                "reachable": False,
+                "executor": self.executor_type,
+                "error": f"{type(e).__name__}: {e}",
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        return {
+            "reachable": True,
+            "executor": self.executor_type,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "in_flight": self._stats.in_flight,
+        }
+
+    async def close(self) -> None:
+        logger.info(f"Shutting down {self.executor_type} executor of agent {self.agent_name}")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ThreadPoolChatAgent(ExecutorChatAgent):
+    """Runs a sync agent in a bounded thread pool. For I/O bound agents (LLM SDK calls, SQL execution)."""
+
+    executor_type = "thread"
+
+    def __init__(self, agent: ChatAgent, max_workers: int, max_concurrency: int, timeout_seconds: float | None = None):
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-agent")
+        super().__init__(agent, executor, max_concurrency, timeout_seconds)
+
+
+class ProcessPoolChatAgent(ExecutorChatAgent):
+    """
+    Runs a sync agent in a process pool. For CPU bound agents (pandas, plotly figure building).
+    The agent, requests and responses must be picklable.
+    """
+
+    executor_type = "process"
+
+    def __init__(self, agent: ChatAgent, max_workers: int, max_concurrency: int, timeout_seconds: float | None = None):
+        # spawn: forking a process with a running event loop and db client threads is not safe
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        super().__init__(agent, executor, max_concurrency, timeout_seconds)
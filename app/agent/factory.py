@@ -0,0 +1,87 @@
+from typing import Optional
+from loguru import logger
+from app.agent.chat_agent_client import ChatAgentClient
+from app.agent.chat_agent_protocol import AsyncChatAgent
+from app.agent.executor_adapter import ProcessPoolChatAgent, ThreadPoolChatAgent
+from app.agent.load_balancer import LoadBalancedChatAgent
+from app.agent.openai_agent_client import OpenAIChatAgentClient
+from app.agent.response_cache import CachedChatAgent, DatabaseResponseCache, MemoryResponseCache
+from app.agent.single_flight import KEY_FUNCTIONS, SingleFlightChatAgent
+from app.config.agent import agent_config
+
+
+def create_openai_agent_client() -> OpenAIChatAgentClient:
+    """Create the upstream agent client from configuration"""
+    return OpenAIChatAgentClient(
+        base_url=agent_config.UPSTREAM_BASE_URL,
+        api_key=agent_config.UPSTREAM_API_KEY,
+        default_model=agent_config.UPSTREAM_MODEL,
+        timeout_seconds=agent_config.TIMEOUT_SECONDS,
+        connect_timeout_seconds=agent_config.UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+        max_retries=agent_config.UPSTREAM_MAX_RETRIES,
+        backoff_base_seconds=agent_config.UPSTREAM_BACKOFF_BASE_SECONDS,
+        backoff_max_seconds=agent_config.UPSTREAM_BACKOFF_MAX_SECONDS,
+        stream=agent_config.UPSTREAM_STREAM,
+        max_connections=agent_config.UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=agent_config.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry_seconds=agent_config.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+class ChatAgentFactory:
+    """Factory class for creating the async chat agent used by the service layer"""
+
+    _agent: Optional[AsyncChatAgent] = None
+
+    @classmethod
+    def get_agent(cls, force_new: bool = False) -> AsyncChatAgent:
+        """Get the async chat agent based on configuration"""
+        logger.info(f"Getting ChatAgentFactory.agent with AGENT_BACKEND: {agent_config.BACKEND}, AGENT_EXECUTOR: {agent_config.EXECUTOR}")
+
+        if force_new or cls._agent is None:
+            if agent_config.BACKEND == "openai":
+                # natively async, no executor needed
+                logger.info(f"Creating OpenAIChatAgentClient with AGENT_UPSTREAM_BASE_URL: {agent_config.UPSTREAM_BASE_URL}")
+                cls._agent = create_openai_agent_client()
+                if agent_config.UPSTREAM_ENDPOINTS:
+                    logger.info(f"Creating LoadBalancedChatAgent for models: {list(agent_config.UPSTREAM_ENDPOINTS)}")
+                    cls._agent = LoadBalancedChatAgent(
+                        cls._agent,
+                        agent_config.UPSTREAM_ENDPOINTS,
+                        [agent_config.UPSTREAM_BASE_URL],
+                        ewma_alpha=agent_config.UPSTREAM_EWMA_ALPHA,
+                        failure_threshold=agent_config.UPSTREAM_CIRCUIT_FAILURE_THRESHOLD,
+                        open_seconds=agent_config.UPSTREAM_CIRCUIT_OPEN_SECONDS,
+                        hedge_enabled=agent_config.UPSTREAM_HEDGE_ENABLED,
+                        hedge_quantile=agent_config.UPSTREAM_HEDGE_QUANTILE,
+                        hedge_min_samples=agent_config.UPSTREAM_HEDGE_MIN_SAMPLES,
+                        hedge_min_delay_seconds=agent_config.UPSTREAM_HEDGE_MIN_DELAY_SECONDS,
+                    )
+            elif agent_config.EXECUTOR == "process":
+                logger.info("Creating ProcessPoolChatAgent")
+                cls._agent = ProcessPoolChatAgent(
+                    ChatAgentClient(), agent_config.MAX_WORKERS, agent_config.MAX_CONCURRENCY, agent_config.TIMEOUT_SECONDS
+                )
+            else:
+                logger.info("Creating ThreadPoolChatAgent")
+                cls._agent = ThreadPoolChatAgent(
+                    ChatAgentClient(), agent_config.MAX_WORKERS, agent_config.MAX_CONCURRENCY, agent_config.TIMEOUT_SECONDS
+                )
+
+            if agent_config.CACHE_ENABLED:
+                logger.info(f"Enabling agent response cache with AGENT_CACHE_BACKEND: {agent_config.CACHE_BACKEND}")
+                if agent_config.CACHE_BACKEND == "database":
+                    backend = DatabaseResponseCache(agent_config.CACHE_MAX_ENTRIES, agent_config.CACHE_TTL_SECONDS)
+                else:
+                    backend = MemoryResponseCache(agent_config.CACHE_MAX_ENTRIES, agent_config.CACHE_TTL_SECONDS)
+                cls._agent = CachedChatAgent(cls._agent, backend)
+
+            # outermost, so coalesced calls also share a single cache lookup
+            if agent_config.SINGLE_FLIGHT_ENABLED:
+                logger.info(f"Enabling agent single-flight with AGENT_SINGLE_FLIGHT_KEY: {agent_config.SINGLE_FLIGHT_KEY}")
+                cls._agent = SingleFlightChatAgent(cls._agent, KEY_FUNCTIONS[agent_config.SINGLE_FLIGHT_KEY])
+        return cls._agent
+
+
+# Global instance
+chat_agent = ChatAgentFactory.get_agent()
@@ -0,0 +1,140 @@
+"""
+Fake OpenAI compatible upstream server.
+
+A local stand-in for an LLM provider, used to exercise and measure the upstream agent client offline.
+Latency, token rate and error injection are configurable.
+
+Usage:
+    uv run python -m app.agent.fake_upstream --port 8001 --latency 0.05 --tokens-per-second 200 --error-rate 0.1
+
+Then point the API to it:
+    AGENT_BACKEND=openai AGENT_UPSTREAM_BASE_URL=http://localhost:8001/v1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeUpstreamSettings:
+    """Behaviour of the fake upstream"""
+
+    latency_seconds: float = 0.05  # time to first token
+    tokens_per_second: float = 0.0  # 0: all tokens at once
+    completion_tokens: int = 32
+    error_rate: float = 0.0  # probability of an injected error response
+    error_status_code: int = 503
+    retry_after_seconds: float | None = None  # Retry-After header of injected 429 errors
+
+
+def _completion_tokens(question: str, count: int) -> list[str]:
+    words = (f"Fake upstream answer to: {question}".split() or ["answer"]) * count
+    return [f"{word} " for word in words[:count]]
+
+
+def create_fake_upstream_app(settings: FakeUpstreamSettings | None = None) -> FastAPI:
+    """Create the fake upstream FastAPI application. settings can be changed at runtime through app.state.settings."""
+    app = FastAPI(title="Fake OpenAI compatible upstream")
+    app.state.settings = settings or FakeUpstreamSettings()
+    app.state.requests = 0
+    app.state.injected_errors = 0
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "fake-upstream"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        current: FakeUpstreamSettings = app.state.settings
+        app.state.requests += 1
+        body = await request.json()
+        model = body.get("model") or "fake-model"
+        question = body["messages"][-1]["content"] if body.get("messages") else ""
+        tokens = _completion_tokens(question, body.get("max_tokens") or current.completion_tokens)
+
+        await asyncio.sleep(current.latency_seconds)
+
+        if current.error_rate and random.random() < current.error_rate:
+            app.state.injected_errors += 1
+            headers = {}
+            if current.error_status_code == 429 and current.retry_after_seconds is not None:
+                headers["Retry-After"] = str(current.retry_after_seconds)
+            return JSONResponse(
+                {"error": {"message": "Injected error", "type": "fake_upstream_error"}},
+                status_code=current.error_status_code,
+                headers=headers,
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        token_delay = 1 / current.tokens_per_second if current.tokens_per_second > 0 else 0
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * len(tokens))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": len(question.split()),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": len(question.split()) + len(tokens),
+                },
+            }
+
+        async def events():
+            for token in tokens:
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI compatible upstream server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Token rate, 0 for all tokens at once")
+    parser.add_argument("--completion-tokens", type=int, default=32)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected error")
+    parser.add_argument("--error-status-code", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds of injected 429 errors")
+    args = parser.parse_args()
+
+    settings = FakeUpstreamSettings(
+        latency_seconds=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status_code=args.error_status_code,
+        retry_after_seconds=args.retry_after,
+    )
+    uvicorn.run(create_fake_upstream_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
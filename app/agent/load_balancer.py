@@ -0,0 +1,272 @@
+import asyncio
+import random
+import time
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from app.agent.chat_agent_scheme import UserChatAgentRequest, AssistantChatAgentResponse
+from app.agent.openai_agent_client import OpenAIChatAgentClient, UpstreamAgentError
+from app.core.latency_histogram import LatencyHistogram
+
+
+class CircuitBreaker:
+    """
+    Consecutive failure circuit breaker.
+    closed -> open after `failure_threshold` consecutive failures, open -> half_open after `open_seconds`,
+    half_open lets one probe request through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+        if self.state == "half_open":
+            return not self._probe_in_flight
+        return self.state == "closed"
+
+    def on_start(self) -> None:
+        if self.state == "half_open":
+            self._probe_in_flight = True
+
+    def on_cancel(self) -> None:
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class UpstreamEndpoint:
+    """An upstream replica with its live latency (EWMA), in-flight count, circuit breaker and latency histogram."""
+
+    def __init__(self, base_url: str, ewma_alpha: float, breaker: CircuitBreaker):
+        self.base_url = base_url
+        self.ewma_alpha = ewma_alpha
+        self.ewma_seconds: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.breaker = breaker
+        self.histogram = LatencyHistogram("upstream_endpoint_latency_seconds", "Latency of an upstream endpoint")
+
+    def score(self) -> float:
+        """Expected wait on this endpoint, lower is better. Endpoints without samples are tried first."""
+        return (self.ewma_seconds or 0.0) * (self.in_flight + 1)
+
+    def observe(self, latency: float) -> None:
+        self.histogram.observe(latency)
+        if self.ewma_seconds is None:
+            self.ewma_seconds = latency
+        else:
+            self.ewma_seconds = self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.ewma_seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "state": self.breaker.state,
+            "ewma_seconds": self.ewma_seconds,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency": self.histogram.as_dict(),
+        }
+
+
+class EndpointPool:
+    """Endpoints serving one model. Picks with power of two choices on the endpoint score."""
+
+    def __init__(self, endpoints: list[UpstreamEndpoint]):
+        self.endpoints = endpoints
+        self.histogram = LatencyHistogram("upstream_pool_latency_seconds", "Latency of the upstream endpoints of a model")
+
+    def choose(self, exclude: Iterable[UpstreamEndpoint] = ()) -> Optional[UpstreamEndpoint]:
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude and endpoint.breaker.allow()]
+        if not candidates:
+            return None
+        if len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        return min(candidates, key=lambda endpoint: endpoint.score())
+
+    def hedge_delay(self, quantile: float, min_samples: int, min_delay_seconds: float) -> Optional[float]:
+        """Delay before hedging: the recent latency quantile of the pool, None until enough samples are collected."""
+        if len(self.histogram.recent) < min_samples:
+            return None
+        return max(self.histogram.quantile(quantile), min_delay_seconds)
+
+
+class LoadBalancedChatAgent:
+    """
+    Routes agent requests across multiple OpenAI compatible endpoints per model.
+
+    - picks the endpoint with the lowest EWMA latency x in-flight score (power of two choices)
+    - ejects failing endpoints with a circuit breaker and fails over once to another endpoint
+    - optionally hedges: if the first endpoint is slower than the pool's recent p95, the request is also sent
+      to a second endpoint and the first successful response wins
+    """
+
+    def __init__(
+        self,
+        client: OpenAIChatAgentClient,
+        endpoints_by_model: dict[str, list[str]],
+        default_endpoints: list[str],
+        ewma_alpha: float = 0.3,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        hedge_enabled: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_min_delay_seconds: float = 0.05,
+    ):
+        self.agent_name = "LoadBalancedChatAgent"
+        self.client = client
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        endpoints: dict[str, UpstreamEndpoint] = {}
+
+        def pool(urls: list[str]) -> EndpointPool:
+            # replicas shared by several models keep one state
+            for url in urls:
+                endpoints.setdefault(url, UpstreamEndpoint(url, ewma_alpha, CircuitBreaker(failure_threshold, open_seconds)))
+            return EndpointPool([endpoints[url] for url in urls])
+
+        self.pools = {model: pool(urls) for model, urls in endpoints_by_model.items()}
+        self.default_pool = pool(default_endpoints)
+        self.endpoints = endpoints
+
+    def _pool(self, model: Optional[str]) -> EndpointPool:
+        return self.pools.get(model or self.client.default_model, self.default_pool)
+
+    async def _call(
+        self, pool: EndpointPool, endpoint: UpstreamEndpoint, user_chat_agent_request: UserChatAgentRequest, deadline: float
+    ) -> AssistantChatAgentResponse:
+        endpoint.breaker.on_start()
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        started = time.monotonic()
+        try:
+            result = await self.client.process_at(user_chat_agent_request, endpoint.base_url, deadline)
+        except asyncio.CancelledError:
+            # lost a hedge race, neither a success nor a failure of the endpoint
+            endpoint.breaker.on_cancel()
+            raise
+        except Exception:
+            endpoint.failures += 1
+            endpoint.breaker.record_failure()
+            if endpoint.breaker.state == "open":
+                logger.warning(f"Circuit opened for upstream endpoint: {endpoint.base_url}")
+            raise
+        finally:
+            endpoint.in_flight -= 1
+
+        latency = time.monotonic() - started
+        endpoint.breaker.record_success()
+        endpoint.observe(latency)
+        pool.histogram.observe(latency)
+        return result
+
+    async def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse:
+        pool = self._pool(user_chat_agent_request.model)
+        deadline = time.monotonic() + self.client.timeout_seconds
+        primary = pool.choose()
+        if primary is None:
+            raise UpstreamAgentError(f"No healthy upstream endpoint for model: {user_chat_agent_request.model}")
+        logger.debug(f"Routing agent request to upstream endpoint: {primary.base_url}")
+
+        hedge_delay = pool.hedge_delay(self.hedge_quantile, self.hedge_min_samples, self.hedge_min_delay_seconds) if self.hedge_enabled else None
+        if hedge_delay is None:
+            try:
+                return await self._call(pool, primary, user_chat_agent_request, deadline)
+            except UpstreamAgentError:
+                # fail over once to another endpoint, the failure already counts against the primary's breaker
+                fallback = pool.choose(exclude=[primary])
+                if fallback is None:
+                    raise
+                logger.warning(f"Failing over agent request from {primary.base_url} to {fallback.base_url}")
+                return await self._call(pool, fallback, user_chat_agent_request, deadline)
+
+        primary_task = asyncio.create_task(self._call(pool, primary, user_chat_agent_request, deadline))
+        tasks = [primary_task]
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay)
+            if done:
+                error = primary_task.exception()
+                if error is None:
+                    return primary_task.result()
+                # failed before the hedge delay, fail over once like an unhedged request
+                fallback = pool.choose(exclude=[primary]) if isinstance(error, UpstreamAgentError) else None
+                if fallback is None:
+                    raise error
+                logger.warning(f"Failing over agent request from {primary.base_url} to {fallback.base_url}")
+                return await self._call(pool, fallback, user_chat_agent_request, deadline)
+
+            secondary = pool.choose(exclude=[primary])
+            if secondary is None:
+                return await primary_task
+
+            self.hedges += 1
+            logger.debug(f"Hedging agent request after {hedge_delay:.3f}s to upstream endpoint: {secondary.base_url}")
+            secondary_task = asyncio.create_task(self._call(pool, secondary, user_chat_agent_request, deadline))
+            tasks.append(secondary_task)
+            pending = {primary_task, secondary_task}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # the losing hedge, or every call when the caller is cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            **self.client.stats(),
+            "agent": self.agent_name,
+            "hedge_enabled": self.hedge_enabled,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "endpoints": [endpoint.as_dict() for endpoint in self.endpoints.values()],
+        }
+
+    async def ping(self, timeout_seconds: float) -> dict:
+        """Ping every upstream endpoint, reachable when any endpoint is reachable and its circuit is not open"""
+        endpoints = list(self.endpoints.values())
+        results = await asyncio.gather(*(self.client.ping(timeout_seconds, endpoint.base_url) for endpoint in endpoints))
+        for endpoint, result in zip(endpoints, results):
+            result["circuit"] = endpoint.breaker.state
+        reachable = [result for result in results if result["reachable"] and result["circuit"] != "open"]
+        return {
+            "reachable": bool(reachable),
+            "latency_ms": min((result["latency_ms"] for result in reachable), default=None),
+            "endpoints": results,
+        }
+
+    async def close(self) -> None:
+        await self.client.close()
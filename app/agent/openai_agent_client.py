@@ -0,0 +1,264 @@
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+from loguru import logger
+
+from app.agent.chat_agent_protocol import AgentTimeoutError
+from app.agent.chat_agent_scheme import UserChatAgentRequest, AssistantChatAgentResponse
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamAgentError(Exception):
+    """Raised when the upstream returns a non retryable error or retries are exhausted."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OpenAIChatAgentClient:
+    """
+    Async chat agent calling an OpenAI compatible /v1/chat/completions upstream.
+
+    - one pooled httpx.AsyncClient with keep-alive is shared by all requests
+    - 429, 5xx and transport errors are retried with full jitter exponential backoff (Retry-After is honored)
+    - every call has a deadline covering all attempts and backoffs
+    - responses can be streamed from the upstream, retries only happen before the first chunk
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        default_model: str = "gpt-4o-mini",
+        timeout_seconds: float = 60.0,
+        connect_timeout_seconds: float = 5.0,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 0.25,
+        backoff_max_seconds: float = 4.0,
+        stream: bool = False,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry_seconds: float = 30.0,
+    ):
+        self.agent_name = "OpenAIChatAgentClient"
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.default_model = default_model
+        self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.stream_responses = stream
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_seconds,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            logger.info(f"Creating pooled upstream http client. base_url: {self.base_url}")
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(limits=self._limits, headers=headers)
+        return self._client
+
+    def _payload(self, user_chat_agent_request: UserChatAgentRequest, stream: bool) -> dict:
+        messages = []
+        if user_chat_agent_request.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{user_chat_agent_request.summary}"})
+        messages.extend({"role": message.role, "content": message.content} for message in user_chat_agent_request.history)
+        messages.append({"role": "user", "content": user_chat_agent_request.message})
+        return {
+            "model": user_chat_agent_request.model or self.default_model,
+            "messages": messages,
+            "stream": stream,
+        }
+
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise AgentTimeoutError(f"Upstream deadline of {self.timeout_seconds} seconds exceeded")
+        return remaining
+
+    def _timeout(self, deadline: float) -> httpx.Timeout:
+        remaining = self._remaining(deadline)
+        return httpx.Timeout(remaining, connect=min(self.connect_timeout_seconds, remaining))
+
+    async def _backoff(self, attempt: int, deadline: float, retry_after: Optional[str] = None) -> None:
+        """Sleep before the next attempt, full jitter exponential backoff. Raises if the deadline would be exceeded."""
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if time.monotonic() + delay >= deadline:
+            raise AgentTimeoutError(f"Upstream deadline of {self.timeout_seconds} seconds exceeded while retrying")
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    async def _send(self, base_url: str, payload: dict, deadline: float) -> httpx.Response:
+        """
+        Send the completion request with retries, returns a response with an unread body and a successful status.
+        The caller must close the response.
+        """
+        url = f"{base_url.rstrip('/')}/chat/completions"
+        attempt = 0
+        while True:
+            self.attempts += 1
+            try:
+                request = self.client.build_request("POST", url, json=payload, timeout=self._timeout(deadline))
+                response = await self.client.send(request, stream=True)
+            except httpx.TimeoutException as e:
+                if time.monotonic() >= deadline:
+                    raise AgentTimeoutError(f"Upstream deadline of {self.timeout_seconds} seconds exceeded") from e
+                error, retry_after = e, None
+            except httpx.TransportError as e:
+                error, retry_after = e, None
+            else:
+                if response.status_code < 400:
+                    return response
+                await response.aread()
+                await response.aclose()
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise UpstreamAgentError(f"Upstream error {response.status_code}: {response.text}", response.status_code)
+                error = UpstreamAgentError(f"Upstream error {response.status_code}", response.status_code)
+                retry_after = response.headers.get("retry-after")
+
+            if attempt >= self.max_retries:
+                raise UpstreamAgentError(f"Upstream request failed after {attempt + 1} attempts: {error}", getattr(error, "status_code", None))
+            logger.warning(f"Upstream attempt {attempt + 1} failed, retrying: {error}")
+            await self._backoff(attempt, deadline, retry_after)
+            attempt += 1
+
+    async def complete(
+        self, user_chat_agent_request: UserChatAgentRequest, base_url: Optional[str] = None, deadline: Optional[float] = None
+    ) -> AssistantChatAgentResponse:
+        """Non streaming completion against base_url (default: configured upstream) within deadline (monotonic time)."""
+        deadline = deadline or time.monotonic() + self.timeout_seconds
+        response = await self._send(base_url or self.base_url, self._payload(user_chat_agent_request, stream=False), deadline)
+        try:
+            # the httpx timeout applies per read, the deadline covers the whole body
+            async with asyncio.timeout(self._remaining(deadline)):
+                await response.aread()
+        except TimeoutError as e:
+            raise AgentTimeoutError(f"Upstream deadline of {self.timeout_seconds} seconds exceeded while reading the response") from e
+        finally:
+            await response.aclose()
+        result = response.json()
+        return AssistantChatAgentResponse(message=result["choices"][0]["message"].get("content") or "", figure=None)
+
+    async def stream(
+        self, user_chat_agent_request: UserChatAgentRequest, base_url: Optional[str] = None, deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Stream content deltas of a completion from the upstream (server-sent events)."""
+        deadline = deadline or time.monotonic() + self.timeout_seconds
+        response = await self._send(base_url or self.base_url, self._payload(user_chat_agent_request, stream=True), deadline)
+        lines = response.aiter_lines()
+        try:
+            while True:
+                # the deadline is checked per line, it only covers the waits for the upstream, not the consumer
+                try:
+                    async with asyncio.timeout(self._remaining(deadline)):
+                        line = await anext(lines)
+                except StopAsyncIteration:
+                    break
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if chunk.get("choices"):
+                    content = chunk["choices"][0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+        except (httpx.TimeoutException, TimeoutError) as e:
+            raise AgentTimeoutError(f"Upstream deadline of {self.timeout_seconds} seconds exceeded while streaming") from e
+        finally:
+            await response.aclose()
+
+    async def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse:
+        return await self.process_at(user_chat_agent_request, self.base_url)
+
+    async def process_at(
+        self, user_chat_agent_request: UserChatAgentRequest, base_url: str, deadline: Optional[float] = None
+    ) -> AssistantChatAgentResponse:
+        """Process a request against a given upstream base_url, streamed or not as configured."""
+        logger.debug(f"BEGIN AGENT: {self.agent_name} process. base_url: {base_url}")
+        self.requests += 1
+        self.in_flight += 1
+        deadline = deadline or time.monotonic() + self.timeout_seconds
+        try:
+            if self.stream_responses:
+                chunks = [chunk async for chunk in self.stream(user_chat_agent_request, base_url, deadline)]
+                result = AssistantChatAgentResponse(message="".join(chunks), figure=None)
+            else:
+                result = await self.complete(user_chat_agent_request, base_url, deadline)
+        except AgentTimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Agent {self.agent_name} failed: {e}")
+            raise
+        finally:
+            self.in_flight -= 1
+        logger.debug(f"END AGENT: {self.agent_name} process")
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "agent": self.agent_name,
+            "base_url": self.base_url,
+            "stream": self.stream_responses,
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+        }
+
+    async def ping(self, timeout_seconds: float, base_url: Optional[str] = None) -> dict:
+        """GET /models of the upstream, any answer below 500 (e.g. 401) means the upstream is reachable"""
+        base_url = (base_url or self.base_url).rstrip("/")
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(
+                f"{base_url}/models", timeout=httpx.Timeout(timeout_seconds, connect=min(self.connect_timeout_seconds, timeout_seconds))
+            )
+            return {
+                "reachable": response.status_code < 500,
+                "base_url": base_url,
+                "status_code": response.status_code,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        except httpx.HTTPError as e:
+            return {
+                "reachable": False,
+                "base_url": base_url,
+                "error": f"{type(e).__name__}: {e}",
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+
+    async def close(self) -> None:
+        if self._client is not None:
+            logger.info("Closing pooled upstream http client")
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+from loguru import logger
+
+from app.agent.chat_agent_protocol import AsyncChatAgent
+from app.agent.chat_agent_scheme import UserChatAgentRequest, AssistantChatAgentResponse
+from app.repository.agent_cache_repository import AgentCacheRepository
+
+_WHITESPACE = re.compile(r"\s+")
+
+# request fields which are not part of the question context
+_NON_CONTEXT_FIELDS = {"message", "model", "use_cache"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt for exact-match lookups: case and whitespace insensitive."""
+    return _WHITESPACE.sub(" ", prompt).strip().lower()
+
+
+def agent_request_key(user_chat_agent_request: UserChatAgentRequest) -> str:
+    """
+    Cache key of an agent request: normalized prompt + model + hash of the remaining request context.
+    Example : "count of customers  by Status" and "Count of customers by status" have the same key.
+    """
+    context = user_chat_agent_request.model_dump(mode="json", exclude=_NON_CONTEXT_FIELDS)
+    context_hash = hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+    key_source = json.dumps(
+        {
+            "prompt": normalize_prompt(user_chat_agent_request.message),
+            "model": user_chat_agent_request.model,
+            "context": context_hash,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key_source.encode()).hexdigest()
+
+
+class ResponseCacheBackend(Protocol):
+    """Storage for cached agent responses"""
+
+    name: str
+    evictions: int
+    # entries held in this process, None when they are not kept in memory
+    memory_entries: Optional[int]
+
+    async def get(self, key: str) -> Optional[AssistantChatAgentResponse]: ...
+    async def set(self, key: str, response: AssistantChatAgentResponse) -> None: ...
+    async def clear(self) -> None: ...
+
+
+class MemoryResponseCache:
+    """In-process LRU cache with TTL. Entries are per worker process."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._entries: OrderedDict[str, tuple[float, AssistantChatAgentResponse]] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[AssistantChatAgentResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    @property
+    def memory_entries(self) -> int:
+        return len(self._entries)
+
+    async def set(self, key: str, response: AssistantChatAgentResponse) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class DatabaseResponseCache:
+    """
+    Persistent cache in the agent_response_cache collection. Shared by all workers and survives restarts.
+    Size is bounded by trimming the oldest entries every `trim_interval` writes.
+    """
+
+    name = "database"
+    memory_entries = None
+
+    def __init__(self, max_entries: int, ttl_seconds: float, trim_interval: int = 100):
+        self.repository = AgentCacheRepository()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._trim_interval = trim_interval
+        self._writes = 0
+        self._indexes_created = False
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[AssistantChatAgentResponse]:
+        response = await self.repository.find_by_key(key)
+        return AssistantChatAgentResponse(**response) if response else None
+
+    async def set(self, key: str, response: AssistantChatAgentResponse) -> None:
+        if not self._indexes_created:
+            await self.repository.create_indexes()
+            self._indexes_created = True
+        await self.repository.save(key, response.model_dump(), self._ttl_seconds)
+        self._writes += 1
+        if self._writes % self._trim_interval == 0:
+            self.evictions += await self.repository.delete_oldest(self._max_entries)
+
+    async def clear(self) -> None:
+        await self.repository.delete_all()
+
+
+class CachedChatAgent:
+    """
+    Exact-match response cache in front of an AsyncChatAgent.
+    Requests with use_cache=False bypass the cache and do not update it.
+    """
+
+    def __init__(self, agent: AsyncChatAgent, backend: ResponseCacheBackend):
+        self.agent = agent
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+
+    async def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse:
+        if not user_chat_agent_request.use_cache:
+            self.bypassed += 1
+            return await self.agent.process(user_chat_agent_request)
+
+        key = agent_request_key(user_chat_agent_request)
+        try:
+            cached = await self.backend.get(key)
+        except Exception as e:
+            # a broken cache must never fail the chat, fall back to the agent
+            self.errors += 1
+            logger.error(f"Agent response cache get failed: {e}")
+            cached = None
+
+        if cached is not None:
+            self.hits += 1
+            logger.debug(f"Agent response cache hit. key: {key}")
+            return cached
+
+        self.misses += 1
+        response = await self.agent.process(user_chat_agent_request)
+        try:
+            await self.backend.set(key, response)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Agent response cache set failed: {e}")
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        cache_stats = {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+            "evictions": self.backend.evictions,
+            "memory_entries": self.backend.memory_entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+        return {**self.agent.stats(), "cache": cache_stats}
+
+    async def ping(self, timeout_seconds: float) -> dict:
+        return await self.agent.ping(timeout_seconds)
+
+    async def close(self) -> None:
+        await self.agent.close()
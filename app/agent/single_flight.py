@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import json
+from typing import Callable
+
+from loguru import logger
+
+from app.agent.chat_agent_protocol import AsyncChatAgent
+from app.agent.chat_agent_scheme import UserChatAgentRequest, AssistantChatAgentResponse
+from app.agent.response_cache import agent_request_key
+
+
+def normalized_request_key(user_chat_agent_request: UserChatAgentRequest) -> str:
+    """Same question as the response cache key. Cache opt-out requests never share a call with cached ones."""
+    return f"{agent_request_key(user_chat_agent_request)}:{user_chat_agent_request.use_cache}"
+
+
+def exact_request_key(user_chat_agent_request: UserChatAgentRequest) -> str:
+    """Byte-identical requests only."""
+    return hashlib.sha256(json.dumps(user_chat_agent_request.model_dump(mode="json"), sort_keys=True).encode()).hexdigest()
+
+
+KEY_FUNCTIONS: dict[str, Callable[[UserChatAgentRequest], str]] = {
+    "normalized": normalized_request_key,
+    "exact": exact_request_key,
+}
+
+
+class SingleFlightChatAgent:
+    """
+    Coalesces concurrent identical agent requests: the first caller starts the agent call,
+    callers with the same key while it is in flight await the same call and receive its result (or exception).
+    The shared call runs in its own task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self, agent: AsyncChatAgent, key_function: Callable[[UserChatAgentRequest], str] = normalized_request_key):
+        self.agent = agent
+        self.key_function = key_function
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def process(self, user_chat_agent_request: UserChatAgentRequest) -> AssistantChatAgentResponse:
+        key = self.key_function(user_chat_agent_request)
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.create_task(self.agent.process(user_chat_agent_request))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._complete(key, done))
+        else:
+            self.coalesced += 1
+            logger.debug(f"Coalesced agent request with in-flight call. key: {key}")
+        return await asyncio.shield(task)
+
+    def _complete(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # retrieve the exception so it is not reported as never retrieved when every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        single_flight_stats = {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+        return {**self.agent.stats(), "single_flight": single_flight_stats}
+
+    async def ping(self, timeout_seconds: float) -> dict:
+        return await self.agent.ping(timeout_seconds)
+
+    async def close(self) -> None:
+        await self.agent.close()
@@ -0,0 +1,35 @@
+from functools import lru_cache
+from typing import Callable
+
+from loguru import logger
+
+from app.config.context import context_config
+
+CHARACTERS_PER_TOKEN = 4
+
+
+def approximate_token_count(text: str) -> int:
+    """Rough token count of english text for BPE tokenizers, ~4 characters per token."""
+    return (len(text) + CHARACTERS_PER_TOKEN - 1) // CHARACTERS_PER_TOKEN
+
+
+@lru_cache(maxsize=1)
+def _get_counter() -> Callable[[str], int]:
+    if context_config.TOKENIZER == "approximate":
+        return approximate_token_count
+    try:
+        import tiktoken
+    except ImportError:
+        if context_config.TOKENIZER == "tiktoken":
+            raise
+        logger.info("tiktoken is not installed, using approximate token counts")
+        return approximate_token_count
+
+    encoding = tiktoken.get_encoding(context_config.TIKTOKEN_ENCODING)
+    logger.info(f"Using tiktoken token counts with encoding: {context_config.TIKTOKEN_ENCODING}")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    """Token count of a text with the configured tokenizer."""
+    return _get_counter()(text) if text else 0
@@ -0,0 +1,105 @@
+# batch api
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from app.config.batch import batch_config
+from app.schema.batch_schema import BatchResponse
+from app.security.auth_service import AuthService
+from app.core.metrics import MetricsRoute
+from app.core.ndjson import iter_lines
+from app.service.batch_service import BatchService, BatchValidationError, batch_runner
+
+router = APIRouter(prefix="/v1", tags=["batch"], route_class=MetricsRoute)
+service = BatchService()
+auth_service = AuthService()
+
+
+################
+# batch api list
+################
+# create a batch from an NDJSON body
+@router.post("/batches", response_model=BatchResponse, response_model_by_alias=True)
+async def create_batch(
+    request: Request,
+    metadata: Optional[str] = Query(None, description="Optional description of the batch, stored as metadata.description"),
+    username: str = Depends(auth_service.verify_credentials),
+):
+    """
+    Create a batch of chat completions for offline workloads.
+    The body is NDJSON (application/x-ndjson), one request per line in the OpenAI batch input format:
+    {"custom_id": "q-1", "method": "POST", "url": "/v1/chat/completions", "body": {"messages": [{"role": "user", "content": "..."}]}}
+    The body is read line by line, the batch is processed in the background with BATCH_CONCURRENCY requests at a time.
+    """
+    logger.debug(f"BEGIN API: Create Batch for username: {username}")
+    try:
+        lines = iter_lines(request.stream(), batch_config.MAX_LINE_BYTES)
+        result = await service.create_batch(username, lines, {"description": metadata} if metadata else None)
+    except BatchValidationError as e:
+        raise HTTPException(status_code=400, detail=e.errors)
+    except Exception as e:
+        logger.error(f"Error in create_batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    batch_runner.notify()
+    logger.debug("END API: Create Batch")
+    return result
+
+
+# list the batches of the current user
+@router.get("/batches", response_model=List[BatchResponse], response_model_by_alias=True)
+async def list_batches(username: str = Depends(auth_service.verify_credentials)):
+    """
+    List the batches of the current user, newest first
+    """
+    try:
+        return await service.find_by_username(username)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# get the status of a batch
+@router.get("/batches/{batch_id}", response_model=BatchResponse, response_model_by_alias=True)
+async def retrieve_batch(batch_id: str, username: str = Depends(auth_service.verify_credentials)):
+    """
+    Get the status and request counts of a batch
+    """
+    try:
+        result = await service.find_by_id(batch_id, username)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return result
+
+
+# cancel a batch
+@router.post("/batches/{batch_id}/cancel", response_model=BatchResponse, response_model_by_alias=True)
+async def cancel_batch(batch_id: str, username: str = Depends(auth_service.verify_credentials)):
+    """
+    Cancel a queued or running batch, the results of processed requests are kept
+    """
+    try:
+        result = await service.cancel(batch_id, username)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return result
+
+
+# download the results of a batch
+@router.get("/batches/{batch_id}/results")
+async def retrieve_batch_results(batch_id: str, username: str = Depends(auth_service.verify_credentials)):
+    """
+    Stream the results of a batch as NDJSON in input order, one line per processed request in the OpenAI batch output format.
+    The results of a running batch are the results so far.
+    """
+    if await service.find_by_id(batch_id, username) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return StreamingResponse(
+        service.iter_results(batch_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{batch_id}.jsonl"'},
+    )
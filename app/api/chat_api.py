@@ -1,13 +1,16 @@
 # chat api
 
-from typing import Any, List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Request
-from app.schema.chat_schema import ChatCompletionRequest, ChatCompletionResponse, ChatMessageResponse
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response, status
+from app.schema.chat_schema import ChatCompletionRequest, ChatCompletionResponse, ChatMessageListResponse, MessageDataResponse
 from app.service.chat_service import ChatService
+from app.mapper.field_selection import CHAT_COMPLETION_FIELDS, parse_fields
 from app.security.auth_service import AuthService
+from app.core.metrics import MetricsRoute
 from loguru import logger
 
-router = APIRouter(prefix="/v1", tags=["chat"])
+router = APIRouter(prefix="/v1", tags=["chat"], route_class=MetricsRoute)
+FIELDS_DESCRIPTION = f"Comma separated response fields to return, one of: {', '.join(CHAT_COMPLETION_FIELDS)}. All fields when not set"
 service = ChatService()
 auth_service = AuthService()
 
@@ -18,17 +21,24 @@ auth_service = AuthService()
 # create a chat completion
 @router.post("/chat/completions", response_model=ChatCompletionResponse)
 async def create_chat_completion(
-    chat_completion: ChatCompletionRequest, request: Request, username: str = Depends(auth_service.verify_credentials)
+    chat_completion: ChatCompletionRequest,
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    username: str = Depends(auth_service.verify_credentials),
 ):
     """
     Chat completion API - Given a list of messages comprising a conversation, the model will return a response.
     If completion_id is not provided, start a new chat completion by providing a list of messages.
     If completion_id is provided, the model will continue the conversation from the last message.
+    If background is true, returns 202 with the saved user message and the answer is generated in the background.
     Summary: question -> Send button from chat interface(UI)
     """
     logger.debug(f"BEGIN API: Create Chat Completion for username: {username}")
     try:
-        result = await service.handle_chat_completion(chat_completion, username)
+        result = await service.handle_chat_completion(chat_completion, username, background_tasks)
+        if chat_completion.background:
+            response.status_code = status.HTTP_202_ACCEPTED
         logger.debug("END API: Create Chat Completion")
         return result
     except Exception as e:
@@ -37,49 +47,106 @@ async def create_chat_completion(
 
 
 # get all chat completions
-@router.get("/chat/completions", response_model=List[ChatCompletionResponse], deprecated=True)
-async def list_chat_completions(request: Request, username: str = Depends(auth_service.verify_credentials)):
+@router.get("/chat/completions", response_model=List[ChatCompletionResponse], response_model_exclude_unset=True, deprecated=True)
+async def list_chat_completions(
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION, examples=["completion_id,model,created"]),
+    username: str = Depends(auth_service.verify_credentials),
+):
     """
     Get all chat completions
     Summary: First load the chat interface(UI) for list of chat completions on the left side.
     """
-    logger.debug(f"BEGIN API: list_chat_completions for username: {username}")
+    logger.debug(f"BEGIN API: list_chat_completions for username: {username}, fields: {fields}")
     page: int = 1
     limit: int = 10
     sort: dict = {"created_date": -1}
     project: dict = {}
 
+    try:
+        selected_fields = parse_fields(fields, CHAT_COMPLETION_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         query = {"created_by": username}
-        return await service.find(query, page, limit, sort, project)
+        return await service.find(query, page, limit, sort, project, fields=selected_fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # get a chat completion by id
-@router.get("/chat/completions/{completion_id}", response_model=ChatCompletionResponse)
-async def retrieve_chat_completion(completion_id: str, request: Request, username: str = Depends(auth_service.verify_credentials)):
+@router.get("/chat/completions/{completion_id}", response_model=ChatCompletionResponse, response_model_exclude_unset=True)
+async def retrieve_chat_completion(
+    completion_id: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Only the last limit messages, all messages when not set"),
+    include_figures: bool = Query(True, description="If false, figures are omitted and messages have a `has_figure` flag"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION, examples=["completion_id,model"]),
+    username: str = Depends(auth_service.verify_credentials),
+):
     """
     Get a chat completion by id
     Summary: Click on a chat completion on the left side to load the chat completion on the right side.
     """
     try:
-        return await service.find_by_id(completion_id)
+        selected_fields = parse_fields(fields, CHAT_COMPLETION_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await service.find_by_id(completion_id, limit=limit, include_figures=include_figures, fields=selected_fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# get all messages for a chat completion
-@router.get("/chat/completions/{completion_id}/messages", response_model=List[ChatMessageResponse], deprecated=True)
-async def list_messages(completion_id: str, request: Request, username: str = Depends(auth_service.verify_credentials)):
+# get a page of the messages of a chat completion
+@router.get("/chat/completions/{completion_id}/messages", response_model=ChatMessageListResponse, response_model_by_alias=True)
+async def list_messages(
+    completion_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100, description="The maximum number of messages of the page"),
+    before: Optional[str] = Query(None, description="A message_id, the page holds the messages before (older than) this message"),
+    after: Optional[str] = Query(None, description="A message_id, the page holds the messages after (newer than) this message"),
+    order: Literal["desc", "asc"] = Query("desc", description="`desc` starts at the newest message, `asc` at the oldest"),
+    include_figures: bool = Query(True, description="If false, figures are omitted and messages have a `has_figure` flag"),
+    username: str = Depends(auth_service.verify_credentials),
+):
     """
-    Get all messages for a chat completion
+    Get a page of the messages of a chat completion, newest first by default.
+    Load older messages with `before` set to the `last_id` of the previous page while `has_more` is true.
     Summary: Click on a chat completion on the left side to load the chat completion on the right side.
     """
     try:
-        return await service.find_messages(completion_id)
+        result = await service.find_message_page(completion_id, limit, before, after, order, include_figures)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Chat completion not found")
+    return result
+
+
+# get a page of the tabular result of a message
+@router.get("/chat/completions/{completion_id}/messages/{message_id}/data", response_model=MessageDataResponse)
+async def retrieve_message_data(
+    completion_id: str,
+    message_id: str,
+    request: Request,
+    offset: int = Query(0, ge=0, description="The index of the first row"),
+    limit: int = Query(100, ge=1, description="The maximum number of rows, capped by RESULT_PAGE_MAX_ROWS"),
+    username: str = Depends(auth_service.verify_credentials),
+):
+    """
+    Get the rows of the tabular result of a message, page by page
+    Summary: Large results are only partially rendered into the message content, the full result is paged here.
+    """
+    try:
+        result = await service.find_message_data(completion_id, message_id, offset, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Message data not found")
+    return result
 
 
 ################
@@ -91,12 +158,20 @@ async def list_messages(completion_id: str, request: Request, username: str = De
     response_model=Optional[dict[str, Any]],
     response_model_exclude_none=True,
 )
-async def retrieve_plot(completion_id: str, message_id: str, request: Request, username: str = Depends(auth_service.verify_credentials)):
+async def retrieve_plot(
+    completion_id: str,
+    message_id: str,
+    request: Request,
+    max_points: Optional[int] = Query(
+        None, ge=10, description="Max points per line/scatter trace (LTTB) and max bins per histogram trace of the returned figure"
+    ),
+    username: str = Depends(auth_service.verify_credentials),
+):
     """
     Get a plot figure for a message to visualize the data
     Summary: Click on a message on the right side to load the plot on the right side.
     """
     try:
-        return await service.find_plot_by_message(completion_id, message_id)
+        return await service.find_plot_by_message(completion_id, message_id, max_points)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
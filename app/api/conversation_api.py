@@ -1,15 +1,26 @@
+import json
+from typing import Optional
 from fastapi import APIRouter
-from fastapi import Request, Depends, HTTPException
+from fastapi import Request, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
-from app.schema.conversation_schema import ConversationResponse, ConversationItemResponse
+from app.config.conversation_import import import_config
+from app.core.ndjson import iter_lines
+from app.mapper.field_selection import CONVERSATION_FIELDS, parse_fields
+from app.schema.conversation_schema import ConversationImportResponse, ConversationResponse, ConversationItemResponse
 from app.service.chat_service import ChatService
 from app.security.auth_service import AuthService
+from app.core.metrics import MetricsRoute
+from app.service.completion_job_worker import completion_job_worker
+from app.service.conversation_import import ConversationImporter
 
 
-router = APIRouter(prefix="/v1", tags=["conversation"])
+router = APIRouter(prefix="/v1", tags=["conversation"], route_class=MetricsRoute)
 chat_service = ChatService()
 auth_service = AuthService()
+conversation_importer = ConversationImporter()
+FIELDS_DESCRIPTION = f"Comma separated response fields to return, one of: {', '.join(CONVERSATION_FIELDS)}. All fields when not set"
 
 
 ################
@@ -22,28 +33,94 @@ auth_service = AuthService()
 
 # get all conversations for current user
 @router.get("/conversations", response_model=ConversationResponse, response_model_exclude_none=True)
-async def list_conversations(username: str = Depends(auth_service.verify_credentials)) -> ConversationResponse:
+async def list_conversations(
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION, examples=["title,update_time"]),
+    username: str = Depends(auth_service.verify_credentials),
+) -> ConversationResponse:
     """
     Get all conversations by current user
     """
-    logger.debug(f"Listing conversations for username: {username}")
+    logger.debug(f"Listing conversations for username: {username}, fields: {fields}")
     try:
-        return await chat_service.find_all_conversations(username)
+        selected_fields = parse_fields(fields, CONVERSATION_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await chat_service.find_all_conversations(username, selected_fields)
     except Exception as e:
         logger.error(f"Error in list_conversations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# export all conversations of current user, declared before /conversations/{completion_id}
+@router.get("/conversations/export")
+async def export_conversations(
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    username: str = Depends(auth_service.verify_credentials),
+):
+    """
+    Export all conversations by current user with their messages as NDJSON, one conversation per line, oldest first.
+    The export is streamed from the database with constant memory regardless of the history size.
+    """
+    logger.debug(f"Exporting conversations for username: {username}, gzip: {gzip}")
+    filename = "conversations.jsonl.gz" if gzip else "conversations.jsonl"
+    return StreamingResponse(
+        chat_service.export_conversations(username, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# import conversations for current user
+@router.post("/conversations/import", response_model=ConversationImportResponse)
+async def import_conversations(request: Request, username: str = Depends(auth_service.verify_credentials)) -> ConversationImportResponse:
+    """
+    Import conversations for current user from an NDJSON body, one conversation with its messages per line (the export format).
+    Records are validated while the body streams in and written with unordered bulk upserts by completion_id.
+    Invalid records are reported per line without aborting the import.
+    """
+    logger.debug(f"Importing conversations for username: {username}")
+    try:
+        return await conversation_importer.import_conversations(username, iter_lines(request.stream(), import_config.MAX_RECORD_BYTES))
+    except Exception as e:
+        logger.error(f"Error in import_conversations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # get a conversation by id for current user
 @router.get("/conversations/{completion_id}", response_model=ConversationItemResponse, response_model_exclude_none=True)
 async def retrieve_conversation(
-    completion_id: str, request: Request, username: str = Depends(auth_service.verify_credentials)
+    completion_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION, examples=["title,async_status"]),
+    username: str = Depends(auth_service.verify_credentials),
 ) -> ConversationItemResponse:
     """
     Get a conversation by id for current user
     """
-    logger.debug(f"Retrieving conversation with completion_id: {completion_id}")
+    logger.debug(f"Retrieving conversation with completion_id: {completion_id}, fields: {fields}")
+    try:
+        selected_fields = parse_fields(fields, CONVERSATION_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        return await chat_service.find_conversation_by_id(completion_id)
+        return await chat_service.find_conversation_by_id(completion_id, selected_fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# subscribe to the background completion status of a conversation
+@router.get("/conversations/{completion_id}/events")
+async def stream_conversation_events(completion_id: str, request: Request, username: str = Depends(auth_service.verify_credentials)):
+    """
+    Server-sent events of the conversation's async_status until the background completion is completed or failed.
+    """
+    logger.debug(f"Subscribing to conversation events with completion_id: {completion_id}")
+
+    async def events():
+        async for async_status in completion_job_worker.subscribe(completion_id):
+            if await request.is_disconnected():
+                return
+            yield f"event: async_status\ndata: {json.dumps({'completion_id': completion_id, 'async_status': async_status})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
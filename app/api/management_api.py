@@ -1,18 +1,32 @@
-from fastapi import APIRouter
-from fastapi.responses import RedirectResponse, JSONResponse
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse
 from pathlib import Path
 from pydantic import BaseModel
 import toml
 from loguru import logger
 from environs import Env
 import json
+from app.agent.factory import chat_agent
+from app.service.completion_job_worker import completion_job_worker
+from app.service.enrichment_pipeline import enrichment_pipeline
+from app.service.batch_service import batch_runner
+from app.config.server import server_config
+from app.config.startup import startup_config
+from app.core.startup_profiler import startup_profiler
+from app.core.metrics import MetricsRoute, registry
+from app.service.readiness import readiness_probe
+from app.core.request_profiler import request_profiler
+from app.security.auth_service import AuthService
+from app.service.memory_profiler import memory_profiler
 
 
 env = Env()
 env.read_env()
 REDIRECT_TO_GRADIO_UI = env.bool("REDIRECT_TO_GRADIO_UI", True)
 
-router = APIRouter(tags=["management"])
+router = APIRouter(tags=["management"], route_class=MetricsRoute)
+auth_service = AuthService()
 
 
 #### Health Check #################################################
@@ -25,9 +39,170 @@ async def health_check():
     """
     Health check endpoint, returns 200 if the system is running
     """
+    startup_profiler.milestone("first_healthy_response")
     return HealthResponse()
 
 
+#### Readiness ##################################################
+@router.get("/management/ready")
+async def readiness_check():
+    """
+    Readiness endpoint for load balancers, returns 200 when this worker can serve requests and 503 when it is degraded:
+    database ping with its latency and connection pool, agent backend reachability and event loop lag.
+    The result is cached for READY_CACHE_SECONDS.
+    """
+    result, cached = await readiness_probe.check()
+    return JSONResponse(status_code=200 if result["status"] == "ok" else 503, content={**result, "cached": cached})
+
+
+#### Agent #######################################################
+@router.get("/management/agent")
+async def agent_stats():
+    """
+    Agent stats endpoint, returns call counts, queue wait and execution times of the chat agent
+    """
+    return chat_agent.stats()
+
+
+#### Jobs ########################################################
+@router.get("/management/jobs")
+async def job_stats():
+    """
+    Background completion job stats endpoint, returns queue size and completed/failed job counts of this worker
+    """
+    return completion_job_worker.stats()
+
+
+#### Enrichment ##################################################
+@router.get("/management/enrichment")
+async def enrichment_stats():
+    """
+    Post-response enrichment pipeline stats endpoint, returns queue size, queue lag and task counts of this worker
+    """
+    return enrichment_pipeline.stats()
+
+
+#### Batches #####################################################
+@router.get("/management/batches")
+async def batch_stats():
+    """
+    Batch runner stats endpoint, returns the running batch, requests in flight and completed/failed request counts of this worker
+    """
+    return batch_runner.stats()
+
+
+#### Metrics ####################################################
+@router.get("/management/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics endpoint of this worker: request latency per route and status, response serialization,
+    repository operations, agent calls, auth verification, payload sizes and in-flight requests
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+#### Startup ####################################################
+@router.get("/management/startup")
+async def startup_profile(
+    min_ms: float = Query(startup_config.IMPORT_MIN_MS, ge=0, description="Leave out imports faster than min_ms"),
+    depth: int = Query(startup_config.IMPORT_MAX_DEPTH, ge=1, le=20, description="Levels of the import tree"),
+):
+    """
+    Startup profile endpoint, returns the import tree, the timed lifespan phases and the milestones
+    (imported, ready, first_healthy_response, seconds since the process start) of this worker
+    """
+    return startup_profiler.report(min_ms, depth)
+
+
+#### Profiles ###################################################
+@router.get("/management/profiles")
+async def list_profiles(username: str = Depends(auth_service.verify_admin)):
+    """
+    Request profiles endpoint (admin only), returns the requests being profiled, the armed requests and the finished profiles of this worker
+    """
+    return request_profiler.stats()
+
+
+@router.post("/management/profiles/arm")
+async def arm_profiles(
+    count: int = Query(1, ge=0, description="Profile the next count requests of this worker, 0 disarms"),
+    path_prefix: str = Query("/v1/", description="Only profile requests with a path starting with path_prefix"),
+    username: str = Depends(auth_service.verify_admin),
+):
+    """
+    Arm request profiling (admin only), the next requests are profiled without the profiling header.
+    Their profile ids are returned in the X-Profile-Id response header and listed at /management/profiles
+    """
+    return request_profiler.arm(count, path_prefix)
+
+
+@router.get("/management/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Literal["collapsed", "json"] = Query("collapsed", description="collapsed: flamegraph.pl/speedscope input, json: summary and stacks"),
+    username: str = Depends(auth_service.verify_admin),
+):
+    """
+    Request profile endpoint (admin only), returns the sampled stacks of a profiled request in the collapsed stack format:
+    one line per stack, frames separated by ';' and the sample count. Suspended requests end with a [waiting] frame
+    """
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found in this worker: {profile_id}")
+    if format == "json":
+        return {**profile.summary(), "stacks": dict(profile.stacks.most_common())}
+    return PlainTextResponse(profile.collapsed())
+
+
+#### Memory #####################################################
+@router.get("/management/memory")
+async def memory_report(
+    collect: bool = Query(False, description="Run a full garbage collection before counting the objects"),
+    username: str = Depends(auth_service.verify_admin),
+):
+    """
+    Memory endpoint (admin only), returns RSS, gc generations, live objects of MEMORY_TRACKED_TYPES, agent response cache entries,
+    documents of the embedded database and the tracemalloc totals of this worker
+    """
+    return await memory_profiler.report(collect)
+
+
+@router.post("/management/memory/snapshots")
+async def take_memory_snapshot(username: str = Depends(auth_service.verify_admin)):
+    """
+    Take a tracemalloc snapshot (admin only), tracemalloc starts with the first snapshot which is the baseline.
+    Compare it with GET /management/memory/snapshots/{snapshot_id}/diff
+    """
+    return memory_profiler.take_snapshot()
+
+
+@router.get("/management/memory/snapshots/{snapshot_id}/diff")
+async def diff_memory_snapshots(
+    snapshot_id: str,
+    against: Optional[str] = Query(None, description="Snapshot to compare with, the snapshot taken before snapshot_id when not set"),
+    group_by: Literal["filename", "lineno"] = Query("lineno", description="Group the allocations by module (filename) or by line"),
+    limit: int = Query(25, ge=1, le=500),
+    username: str = Depends(auth_service.verify_admin),
+):
+    """
+    Memory growth between two tracemalloc snapshots (admin only), the allocations grown the most first
+    """
+    diff = memory_profiler.diff(snapshot_id, against, group_by, limit)
+    if diff is None:
+        raise HTTPException(
+            status_code=404, detail="Snapshots not found in this worker, take two snapshots with POST /management/memory/snapshots"
+        )
+    return diff
+
+
+@router.delete("/management/memory/snapshots")
+async def clear_memory_snapshots(username: str = Depends(auth_service.verify_admin)):
+    """
+    Drop the tracemalloc snapshots and stop tracemalloc (admin only)
+    """
+    return memory_profiler.clear()
+
+
 #### Version #######################################################
 __version__ = None
 
@@ -75,7 +250,7 @@ async def root():
     """
     Redirect root to Gradio UI
     """
-    if REDIRECT_TO_GRADIO_UI:
+    if REDIRECT_TO_GRADIO_UI and server_config.MOUNT_UI:
         return RedirectResponse(url="/ui")
     else:
         return _get_manifest()
@@ -0,0 +1,65 @@
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class AgentConfig(BaseSettings):
+    """Chat agent configuration to be set with AGENT PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="AGENT_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # placeholder: ChatAgentClient, openai: OpenAI compatible /v1/chat/completions upstream
+    BACKEND: Literal["placeholder", "openai"] = "placeholder"
+
+    # OpenAI compatible upstream, used when BACKEND is openai
+    UPSTREAM_BASE_URL: str = "http://localhost:8001/v1"
+    UPSTREAM_API_KEY: str = ""
+    UPSTREAM_MODEL: str = "gpt-4o-mini"  # used when the request has no model
+    UPSTREAM_STREAM: bool = False  # stream the upstream response and assemble it
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # retries on 429, 5xx and transport errors with full jitter exponential backoff, within TIMEOUT_SECONDS
+    UPSTREAM_MAX_RETRIES: int = 3
+    UPSTREAM_BACKOFF_BASE_SECONDS: float = 0.25
+    UPSTREAM_BACKOFF_MAX_SECONDS: float = 4.0
+
+    # multiple endpoints per model as json, e.g. {"gpt-4o": ["http://a:8000/v1", "http://b:8000/v1"]}
+    # models without endpoints use UPSTREAM_BASE_URL. Requests are balanced on EWMA latency x in-flight.
+    UPSTREAM_ENDPOINTS: dict[str, list[str]] = {}
+    UPSTREAM_EWMA_ALPHA: float = 0.3
+    # circuit breaker ejects an endpoint after consecutive failures for a while
+    UPSTREAM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    UPSTREAM_CIRCUIT_OPEN_SECONDS: float = 30.0
+    # hedging: send to a second endpoint when the first is slower than the recent latency quantile
+    UPSTREAM_HEDGE_ENABLED: bool = False
+    UPSTREAM_HEDGE_QUANTILE: float = 0.95
+    UPSTREAM_HEDGE_MIN_SAMPLES: int = 20
+    UPSTREAM_HEDGE_MIN_DELAY_SECONDS: float = 0.05
+
+    # sync agents are offloaded to an executor so they never block the event loop
+    # thread: I/O bound agents (LLM SDK calls, SQL), process: CPU bound agents (pandas, plotly building)
+    EXECUTOR: Literal["thread", "process"] = "thread"
+    MAX_WORKERS: int = 8
+    # max agent calls running or waiting in the executor, the rest wait in the agent queue
+    MAX_CONCURRENCY: int = 16
+    # per agent call deadline, for the upstream it covers all retries
+    TIMEOUT_SECONDS: float = 60.0
+
+    # exact-match response cache in front of the agent, memory: per worker, database: shared and persistent
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: Literal["memory", "database"] = "memory"
+    CACHE_TTL_SECONDS: float = 3600.0
+    CACHE_MAX_ENTRIES: int = 1024
+
+    # concurrent identical requests share one in-flight agent call, normalized: same as cache key, exact: identical requests
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_KEY: Literal["normalized", "exact"] = "normalized"
+
+
+agent_config = AgentConfig()
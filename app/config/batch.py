@@ -0,0 +1,24 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class BatchConfig(BaseSettings):
+    """Batch chat completion configuration to be set with BATCH PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="BATCH_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # requests of one batch processed at the same time, batches run one after the other
+    CONCURRENCY: int = 4
+    MAX_REQUESTS: int = 10000  # requests per batch
+    MAX_LINE_BYTES: int = 1024 * 1024
+    # a running batch is owned by a worker while its lease is renewed, after a restart it is resumed once the lease expired
+    LEASE_SECONDS: float = 60.0
+    # interval to look for batches to start or resume
+    POLL_SECONDS: float = 5.0
+
+
+batch_config = BatchConfig()
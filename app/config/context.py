@@ -0,0 +1,28 @@
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ContextConfig(BaseSettings):
+    """Conversation context configuration to be set with CONTEXT PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="CONTEXT_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # send previous turns of the conversation to the agent, False: only the last user message
+    ENABLED: bool = True
+    # token budget of the whole context: rolling summary + recent turns + the current question
+    MAX_TOKENS: int = 3000
+    # part of MAX_TOKENS reserved for the rolling summary of the turns which don't fit the budget anymore
+    SUMMARY_MAX_TOKENS: int = 500
+    # recent messages loaded per turn, bounds the work of context assembly on long conversations
+    MAX_MESSAGES: int = 50
+    # auto: tiktoken if installed else approximate (~4 characters per token)
+    TOKENIZER: Literal["auto", "tiktoken", "approximate"] = "auto"
+    TIKTOKEN_ENCODING: str = "cl100k_base"
+
+
+context_config = ContextConfig()
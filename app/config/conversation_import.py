@@ -0,0 +1,21 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ImportConfig(BaseSettings):
+    """Conversation import configuration to be set with IMPORT PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="IMPORT_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # records per unordered bulk write, one batch is written while the next one is validated
+    BATCH_SIZE: int = 500
+    MAX_RECORD_BYTES: int = 16 * 1024 * 1024
+    # errors listed in the response, failed records are counted beyond it
+    MAX_REPORTED_ERRORS: int = 1000
+
+
+import_config = ImportConfig()
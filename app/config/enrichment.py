@@ -0,0 +1,30 @@
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class EnrichmentConfig(BaseSettings):
+    """Post-response enrichment (title, snippet) configuration to be set with ENRICHMENT PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="ENRICHMENT_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    ENABLED: bool = True
+    WORKERS: int = 2
+    # tasks beyond the queue size are dropped, enrichment is never allowed to slow down chat requests
+    QUEUE_SIZE: int = 1000
+    MAX_ATTEMPTS: int = 3
+    RETRY_BACKOFF_SECONDS: float = 0.5  # doubled on every retry
+    # on shutdown queued tasks are processed for at most this long
+    DRAIN_TIMEOUT_SECONDS: float = 10.0
+
+    # heuristic: first sentence of the first question, agent: generated by the chat agent
+    TITLE_MODE: Literal["heuristic", "agent"] = "heuristic"
+    TITLE_MAX_CHARACTERS: int = 60
+    SNIPPET_MAX_CHARACTERS: int = 120
+
+
+enrichment_config = EnrichmentConfig()
@@ -0,0 +1,22 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ExportConfig(BaseSettings):
+    """Conversation export configuration to be set with EXPORT PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="EXPORT_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # conversations fetched from the database per cursor batch, bounds the memory of an export
+    BATCH_SIZE: int = 100
+    # bytes of NDJSON collected before a chunk is sent (and compressed)
+    CHUNK_BYTES: int = 64 * 1024
+    # 1 (fastest) to 9 (smallest)
+    GZIP_LEVEL: int = 6
+
+
+export_config = ExportConfig()
@@ -0,0 +1,23 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class JobConfig(BaseSettings):
+    """Background completion job configuration to be set with JOB PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="JOB_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    WORKERS: int = 4  # concurrent background jobs per process
+    QUEUE_SIZE: int = 1000
+    # a claimed job is owned by a worker until its lease expires, then any worker (after a restart too) can claim it again
+    LEASE_SECONDS: float = 300.0
+    # interval to look for claimable jobs in the database, e.g. jobs submitted by other processes or left by a restart
+    POLL_SECONDS: float = 5.0
+    MAX_ATTEMPTS: int = 3
+
+
+job_config = JobConfig()
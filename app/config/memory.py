@@ -0,0 +1,31 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class MemoryConfig(BaseSettings):
+    """Memory profiling (/management/memory) configuration to be set with MEMORY PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="MEMORY_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # true: tracemalloc traces from the process start (slower allocations), false: it starts with the first snapshot
+    TRACEMALLOC_AT_STARTUP: bool = False
+    # frames stored per allocation, 1 is enough to group by file and line
+    TRACEMALLOC_FRAMES: int = 1
+    # snapshots kept in memory by this worker, the oldest ones are dropped
+    MAX_SNAPSHOTS: int = 5
+    # live objects counted by type name, walks the gc tracked objects when /management/memory is called
+    TRACKED_TYPES: list[str] = [
+        "ChatCompletion",
+        "ChatMessageModel",
+        "CompletionJobModel",
+        "UserChatAgentRequest",
+        "AssistantChatAgentResponse",
+        "TabularResult",
+    ]
+
+
+memory_config = MemoryConfig()
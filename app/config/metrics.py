@@ -0,0 +1,18 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class MetricsConfig(BaseSettings):
+    """Prometheus metrics (/management/metrics) configuration to be set with METRICS PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="METRICS_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # false: no middleware and no timings, /management/metrics is empty
+    ENABLED: bool = True
+
+
+metrics_config = MetricsConfig()
@@ -0,0 +1,30 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ProfilingConfig(BaseSettings):
+    """On-demand request profiling (/management/profiles) configuration to be set with PROFILING PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="PROFILING_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # false: no middleware, requests are never profiled
+    ENABLED: bool = True
+    # a request of an admin (SECURITY_ADMIN_USERNAMES) with this header is profiled
+    HEADER: str = "X-Profile"
+    # sampling interval of the stacks of a profiled request
+    INTERVAL_MS: float = 5.0
+    # requests profiled at the same time by this worker, more requests are served without profiling
+    MAX_CONCURRENT: int = 2
+    # sampling of a request stops after this, the profile is marked as truncated
+    MAX_DURATION_SECONDS: float = 60.0
+    # finished profiles kept in memory by this worker, the oldest ones are dropped
+    MAX_STORED: int = 50
+    # upper bound of the requests armed with POST /management/profiles/arm
+    MAX_ARMED: int = 20
+
+
+profiling_config = ProfilingConfig()
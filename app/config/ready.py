@@ -0,0 +1,24 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ReadyConfig(BaseSettings):
+    """Readiness probe (/management/ready) configuration to be set with READY PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="READY_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # the probe result is reused for this long, frequent load balancer checks never reach the database or the agent
+    CACHE_SECONDS: float = 2.0
+    DB_TIMEOUT_SECONDS: float = 2.0
+    AGENT_TIMEOUT_SECONDS: float = 2.0
+    # an unreachable agent backend makes the worker not ready, false: it is only reported
+    AGENT_REQUIRED: bool = True
+    # event loop lag above this makes the worker not ready, the worker can not answer requests in time
+    MAX_LOOP_LAG_MS: float = 500.0
+
+
+ready_config = ReadyConfig()
@@ -0,0 +1,27 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ResultConfig(BaseSettings):
+    """Tabular result configuration to be set with RESULT PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="RESULT_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # rows of a tabular result rendered as a markdown table into the message content, the rest is paged with /data
+    MARKDOWN_MAX_ROWS: int = 20
+    # max rows of one /messages/{message_id}/data page
+    PAGE_MAX_ROWS: int = 1000
+
+    # figures of messages with a tabular result are generated on the first /plot request and saved with the message
+    LAZY_FIGURE: bool = True
+    # rendered figures kept in memory per worker
+    FIGURE_CACHE_MAX_ENTRIES: int = 256
+    # default max points per trace of /plot responses when the request has no max_points, 0: full resolution
+    PLOT_MAX_POINTS: int = 0
+
+
+result_config = ResultConfig()
@@ -15,6 +15,8 @@ class SecurityConfig(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here"
     ENABLED: bool = True
     DEFAULT_USERNAME: str = "admin"
+    # users allowed to profile requests (/management/profiles), JSON list in env: SECURITY_ADMIN_USERNAMES='["admin"]'
+    ADMIN_USERNAMES: list[str] = ["admin"]
 
 
 @lru_cache()
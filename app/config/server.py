@@ -0,0 +1,42 @@
+from typing import Literal, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ServerConfig(BaseSettings):
+    """Production server (python -m app.serve) configuration to be set with SERVER PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="SERVER_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    APP: str = "main:app"
+    HOST: str = "0.0.0.0"
+    PORT: int = 7860
+    # worker processes, 0: one per CPU core. The embedded database lives in the process memory, it always runs 1 worker
+    WORKERS: int = 0
+    # uvloop and httptools, asyncio and h11 are used where they are not installed
+    LOOP: Literal["uvloop", "asyncio", "auto"] = "uvloop"
+    HTTP: Literal["httptools", "h11", "auto"] = "httptools"
+    # import the application once before the workers are forked, workers share its memory copy-on-write
+    PRELOAD: bool = True
+    # move the objects of the preloaded application to the permanent GC generation, so collections never touch (copy) them
+    GC_FREEZE: bool = True
+    BACKLOG: int = 2048
+    # max connections and tasks per worker before 503, unlimited when not set
+    LIMIT_CONCURRENCY: Optional[int] = None
+    TIMEOUT_KEEP_ALIVE: int = 5
+    TIMEOUT_GRACEFUL_SHUTDOWN: int = 30
+    ACCESS_LOG: bool = False
+    # FastAPI debug mode (tracebacks in error responses), for development only
+    DEBUG: bool = False
+    # the Gradio UI keeps its sessions in the process memory, it is mounted only when the server runs 1 worker.
+    # false: API-only server, gradio and plotly are never imported
+    MOUNT_UI: bool = True
+    # port of the standalone Gradio UI (python -m app.serve_ui), it calls the API over http at BASE_URL
+    UI_PORT: int = 7861
+
+
+server_config = ServerConfig()
@@ -0,0 +1,21 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class StartupConfig(BaseSettings):
+    """Startup profiling configuration to be set with STARTUP PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="STARTUP_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    # max seconds from the process start to the first healthy response (scripts/profile_startup.py, embedded database)
+    BUDGET_SECONDS: float = 10.0
+    # imports faster than this are left out of the import tree of /management/startup
+    IMPORT_MIN_MS: float = 5.0
+    IMPORT_MAX_DEPTH: int = 4
+
+
+startup_config = StartupConfig()
@@ -0,0 +1,31 @@
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class TracingConfig(BaseSettings):
+    """Request tracing configuration to be set with TRACING PREFIX in env variables"""
+
+    model_config = SettingsConfigDict(
+        env_prefix="TRACING_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+    ENABLED: bool = False
+    # share of the requests traced, a sampled flag of an incoming traceparent header is honored
+    SAMPLE_RATE: float = 1.0
+    # jsonl: one span per line in JSONL_FILE, otlp: OTLP/HTTP JSON to OTLP_ENDPOINT/v1/traces (e.g. an OpenTelemetry collector)
+    EXPORTER: Literal["jsonl", "otlp"] = "jsonl"
+    JSONL_FILE: str = "traces.jsonl"
+    OTLP_ENDPOINT: str = "http://localhost:4318"
+    OTLP_TIMEOUT_SECONDS: float = 5.0
+    SERVICE_NAME: str = "openai-chatbot-api"
+    # the trace id of every request is returned in this header, also for requests which are not sampled
+    RESPONSE_HEADER: str = "X-Trace-Id"
+    # finished spans waiting for the exporter, spans beyond it are dropped
+    QUEUE_SIZE: int = 10000
+    EXPORT_BATCH_SIZE: int = 512
+
+
+tracing_config = TracingConfig()
@@ -0,0 +1,35 @@
+from collections import deque
+from typing import Optional
+
+from app.core.metrics import LATENCY_BUCKETS_SECONDS, Histogram
+
+
+class LatencyHistogram(Histogram):
+    """
+    Unlabelled latency histogram with the buckets of the Prometheus metrics, and a window of recent samples for quantiles.
+    Rendered as a dict in the management stats, it is not registered in /management/metrics.
+    """
+
+    def __init__(self, name: str = "latency_seconds", documentation: str = "Latency", window: int = 200):
+        super().__init__(name, documentation, buckets=LATENCY_BUCKETS_SECONDS)
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float, *labels: str) -> None:
+        super().observe(value, *labels)
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile of the recent samples, None without samples."""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+    def as_dict(self) -> dict:
+        counts, total, count = self.series.get((), ([0] * (len(self.buckets) + 1), 0.0, 0))
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip([*self.buckets, float("inf")], counts):
+            cumulative += bucket_count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {"count": count, "sum": total, "buckets": buckets, "p50": self.quantile(0.5), "p95": self.quantile(0.95)}
@@ -0,0 +1,313 @@
+"""
+Prometheus metrics of this worker, exposed in the text format at /management/metrics.
+
+Recording a value is a dict lookup and a few additions on the event loop thread, the text is only built when
+/management/metrics is scraped. Label values must come from a small set (route templates, method names),
+never from ids or user input.
+"""
+
+import bisect
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi.routing import APIRoute
+
+from app.config.metrics import metrics_config
+
+LATENCY_BUCKETS_SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS_BYTES = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.series: dict[tuple, Any] = {}
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in self.series.items()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._functions: dict[tuple, Callable[[], float]] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self.series[labels] = value
+
+    def set_function(self, function: Callable[[], float], *labels: str) -> None:
+        """The value is read from function when the metrics are scraped"""
+        self._functions[labels] = function
+
+    def _samples(self) -> list[str]:
+        for labels, function in self._functions.items():
+            try:
+                self.series[labels] = function()
+            except Exception:
+                self.series.pop(labels, None)
+        return super()._samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS_SECONDS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            # counts per bucket (the last one is +Inf), sum, count
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = _labels(self.label_names, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Any:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS_SECONDS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        return "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+
+
+# Global instance
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response is sent, _count is the request count",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being processed")
+http_requests_in_flight.set(0)
+http_request_size = registry.histogram("http_request_size_bytes", "HTTP request body size", ("method", "route"), SIZE_BUCKETS_BYTES)
+http_response_size = registry.histogram("http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS_BYTES)
+response_serialization_duration = registry.histogram(
+    "http_response_serialization_seconds",
+    "Time from the return of the endpoint to the response start (validation, encoding)",
+    ("method", "route"),
+)
+repository_operation_duration = registry.histogram(
+    "repository_operation_seconds", "Repository operation latency", ("repository", "method", "outcome")
+)
+agent_call_duration = registry.histogram("agent_call_seconds", "Chat agent call latency", ("agent", "outcome"))
+auth_verification_duration = registry.histogram("auth_verification_seconds", "API key verification latency", ("outcome",))
+stored_message_size = registry.histogram("stored_message_size_bytes", "Content size of the stored chat messages", ("role",), SIZE_BUCKETS_BYTES)
+
+
+# times of the request being processed, shared with MetricsRoute. A dict, so updates made in a thread pool copy of the context are seen
+_request_timing: ContextVar[Optional[dict[str, float]]] = ContextVar("request_timing", default=None)
+
+
+def route_label(scope: dict) -> str:
+    """Route template of the request, e.g. /v1/chat/completions/{completion_id}, ids never become label values"""
+    # mounted applications (Gradio UI, static files) add their path to root_path
+    prefix = scope.get("root_path", "")[len(scope["app_root_path"]) :] if "app_root_path" in scope else ""
+    route = scope.get("route")
+    if route is not None:
+        return prefix + route.path
+    return f"{prefix}/{{path}}" if prefix else "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, body sizes and in-flight requests of every HTTP request"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timing: dict[str, float] = {}
+        token = _request_timing.set(timing)
+        sizes = [0, 0]
+        status = [500]
+
+        async def receive_with_size() -> dict:
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def send_with_size(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                timing["response_started"] = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive_with_size, send_with_size)
+        finally:
+            http_requests_in_flight.dec()
+            _request_timing.reset(token)
+            method, route = scope["method"], route_label(scope)
+            http_request_duration.observe(time.perf_counter() - started, method, route, str(status[0]))
+            http_request_size.observe(sizes[0], method, route)
+            http_response_size.observe(sizes[1], method, route)
+            if "endpoint_returned" in timing and "response_started" in timing:
+                response_serialization_duration.observe(timing["response_started"] - timing["endpoint_returned"], method, route)
+
+
+def _mark_endpoint_returned(endpoint: Callable) -> Callable:
+    """The endpoint, recording when it returns. FastAPI reads the signature of the original endpoint (functools.wraps)."""
+
+    def mark() -> None:
+        timing = _request_timing.get()
+        if timing is not None:
+            timing["endpoint_returned"] = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_endpoint(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark()
+
+        return async_endpoint
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            mark()
+
+    return sync_endpoint
+
+
+class MetricsRoute(APIRoute):
+    """API route measuring the response serialization: APIRouter(route_class=MetricsRoute)"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, _mark_endpoint_returned(endpoint) if metrics_config.ENABLED else endpoint, **kwargs)
+
+
+def timed_methods(repository: str) -> Callable[[type], type]:
+    """
+    Class decorator recording the latency of the public async methods (and async generators) of a repository
+    in repository_operation_seconds. Example : @timed_methods("chat")
+    """
+
+    def wrap(method_name: str, method: Callable) -> Callable:
+        if inspect.isasyncgenfunction(method):
+
+            @functools.wraps(method)
+            async def timed_generator(*args, **kwargs):
+                started, outcome = time.perf_counter(), "error"
+                try:
+                    async for item in method(*args, **kwargs):
+                        yield item
+                    outcome = "ok"
+                finally:
+                    repository_operation_duration.observe(time.perf_counter() - started, repository, method_name, outcome)
+
+            return timed_generator
+
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            started, outcome = time.perf_counter(), "error"
+            try:
+                result = await method(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                repository_operation_duration.observe(time.perf_counter() - started, repository, method_name, outcome)
+
+        return timed
+
+    def decorate(cls: type) -> type:
+        if not metrics_config.ENABLED:
+            return cls
+        for name, method in list(vars(cls).items()):
+            if not name.startswith("_") and (inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method)):
+                setattr(cls, name, wrap(name, method))
+        return cls
+
+    return decorate
@@ -0,0 +1,18 @@
+from typing import AsyncIterator
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Split a byte stream (e.g. a streamed NDJSON request body) into lines without reading it at once.
+    A line longer than max_line_bytes raises ValueError.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"A line is longer than {max_line_bytes} bytes")
+    if buffer:
+        yield buffer
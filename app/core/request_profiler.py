@@ -0,0 +1,291 @@
+"""
+On-demand sampling profiler of individual requests, safe to use in production.
+
+A request is profiled when an admin sends it with the PROFILING_HEADER header (X-Profile: 1) or when requests were
+armed with POST /management/profiles/arm. A sampler thread records the stack of the request every PROFILING_INTERVAL_MS:
+- cpu samples: the request's coroutine is running on the event loop thread, its stack up to the running frame
+- wait samples: the request is suspended, its chain of awaiting coroutines ending with [waiting]
+  (database, agent backend, thread pool, other requests holding the event loop)
+
+The profile is returned with the X-Profile-Id response header and retrieved in the collapsed stack format
+(flamegraph.pl, speedscope, inferno) at GET /management/profiles/{profile_id}.
+At most PROFILING_MAX_CONCURRENT requests are profiled at the same time, sampling stops after PROFILING_MAX_DURATION_SECONDS.
+"""
+
+import asyncio
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+from app.config.profiling import profiling_config
+from app.core.metrics import route_label
+from app.security.auth_service import AuthService
+
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_STATUS_HEADER = b"x-profile-status"
+MAX_STACK_DEPTH = 200
+
+_PATH_PREFIXES = sorted(
+    {str(Path(__file__).resolve().parents[2]), sysconfig.get_paths()["purelib"], sysconfig.get_paths()["stdlib"]},
+    key=len,
+    reverse=True,
+)
+_short_filenames: dict[str, str] = {}
+
+
+def short_filename(filename: str) -> str:
+    """File name relative to the project, site-packages or the standard library"""
+    short = _short_filenames.get(filename)
+    if short is None:
+        short = filename
+        for prefix in _PATH_PREFIXES:
+            if filename.startswith(prefix + "/"):
+                short = filename[len(prefix) + 1 :]
+                break
+        _short_filenames[filename] = short
+    return short
+
+
+def _frame_label(frame: FrameType) -> str:
+    """function (file:line)"""
+    return f"{frame.f_code.co_qualname} ({short_filename(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+
+class RequestProfile:
+    """Stacks of one profiled request, sampled by the sampler thread"""
+
+    def __init__(self, scope: dict, trigger: str, username: Optional[str], coroutine: Any, root_frame: FrameType):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.route: Optional[str] = None
+        self.trigger = trigger
+        self.username = username
+        self.status_code: Optional[int] = None
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.truncated = False
+        self.stacks: Counter[str] = Counter()
+        self.cpu_samples = 0
+        self.wait_samples = 0
+        self._started = time.perf_counter()
+        self._loop_thread_id = threading.get_ident()
+        # the task's coroutine, and the frame of ProfilingMiddleware where the stacks start
+        self._coroutine = coroutine
+        self._root_frame = root_frame
+
+    def _running_stack(self, frame: Optional[FrameType]) -> Optional[list[str]]:
+        """Stack of the request when its coroutine is running on the event loop thread"""
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(_frame_label(frame))
+            if frame is self._root_frame:
+                labels.reverse()
+                return labels
+            frame = frame.f_back
+        return None
+
+    def _waiting_stack(self) -> Optional[list[str]]:
+        """Chain of the awaiting coroutines of the suspended request"""
+        labels, awaitable, in_request = [], self._coroutine, False
+        while awaitable is not None and len(labels) < MAX_STACK_DEPTH:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                # a future, a task or a thread pool call: the request waits for something outside of its stack
+                break
+            in_request = in_request or frame is self._root_frame
+            if in_request:
+                labels.append(_frame_label(frame))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "ag_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        if not labels:
+            return None
+        labels.append("[waiting]")
+        return labels
+
+    def sample(self, frames: dict[int, FrameType]) -> None:
+        if time.perf_counter() - self._started > profiling_config.MAX_DURATION_SECONDS:
+            self.truncated = True
+            return
+        stack = self._running_stack(frames.get(self._loop_thread_id))
+        if stack is not None:
+            self.cpu_samples += 1
+        else:
+            stack = self._waiting_stack()
+            if stack is None:
+                return
+            self.wait_samples += 1
+        self.stacks[";".join(stack)] += 1
+
+    def finish(self, route: str) -> None:
+        self.route = route
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        # the stacks outlive the request, the coroutine and its frames do not
+        self._coroutine = None
+        self._root_frame = None
+
+    def collapsed(self) -> str:
+        """Collapsed stack format, one line per stack: frame;frame;frame count. The root frame is the request."""
+        root = f"{self.method} {self.route or self.path}"
+        return "".join(f"{root};{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "trigger": self.trigger,
+            "username": self.username,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "interval_ms": profiling_config.INTERVAL_MS,
+            "samples": self.cpu_samples + self.wait_samples,
+            "cpu_samples": self.cpu_samples,
+            "wait_samples": self.wait_samples,
+            "truncated": self.truncated,
+        }
+
+
+class RequestProfiler:
+    """Profiles of this worker: the requests being profiled, the finished profiles and the armed requests"""
+
+    def __init__(self):
+        self.auth_service = AuthService()
+        self._lock = threading.Lock()
+        self._active: dict[str, RequestProfile] = {}
+        self._profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+        self._sampler: Optional[threading.Thread] = None
+        self._armed = 0
+        self._armed_path_prefix = "/v1/"
+        self.profiled = 0
+        self.rejected = 0
+
+    def arm(self, count: int, path_prefix: str) -> dict[str, Any]:
+        """Profile the next count requests with a path starting with path_prefix, count 0 disarms"""
+        with self._lock:
+            self._armed = min(count, profiling_config.MAX_ARMED)
+            self._armed_path_prefix = path_prefix
+        logger.info(f"Request profiling armed for {self._armed} requests on {path_prefix}")
+        return {"armed": self._armed, "path_prefix": self._armed_path_prefix}
+
+    def trigger(self, scope: dict) -> Optional[tuple[str, Optional[str]]]:
+        """(trigger, admin username) when the request is to be profiled"""
+        header = profiling_config.HEADER.lower().encode()
+        headers = dict(scope["headers"])
+        if headers.get(header, b"").strip().lower() in (b"1", b"true", b"yes", b"on"):
+            authorization = headers.get(b"authorization")
+            username = self.auth_service.admin_username(authorization.decode("latin-1") if authorization else None)
+            if username is not None:
+                return "header", username
+        if self._armed and scope["path"].startswith(self._armed_path_prefix):
+            with self._lock:
+                if self._armed:
+                    self._armed -= 1
+                    return "armed", None
+        return None
+
+    def start(self, scope: dict, trigger: str, username: Optional[str], coroutine: Any, root_frame: FrameType) -> Optional[RequestProfile]:
+        """The profile of the request, None when PROFILING_MAX_CONCURRENT requests are already profiled"""
+        with self._lock:
+            if len(self._active) >= profiling_config.MAX_CONCURRENT:
+                self.rejected += 1
+                return None
+            profile = RequestProfile(scope, trigger, username, coroutine, root_frame)
+            self._active[profile.id] = profile
+            self.profiled += 1
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._sampler.start()
+        return profile
+
+    def finish(self, profile: RequestProfile, route: str) -> None:
+        with self._lock:
+            self._active.pop(profile.id, None)
+            profile.finish(route)
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > profiling_config.MAX_STORED:
+                self._profiles.popitem(last=False)
+        logger.info(f"Profiled request {profile.method} {route} in {profile.duration_ms}ms, profile id: {profile.id}")
+
+    def _sample(self) -> None:
+        """Sampler thread, runs while requests are being profiled"""
+        interval = profiling_config.INTERVAL_MS / 1000
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                frames = sys._current_frames()
+                for profile in self._active.values():
+                    try:
+                        profile.sample(frames)
+                    except Exception as e:
+                        logger.debug(f"Request profile sample failed: {e}")
+            del frames
+            time.sleep(interval)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": len(self._active),
+            "max_concurrent": profiling_config.MAX_CONCURRENT,
+            "profiled": self.profiled,
+            "rejected": self.rejected,
+            "armed": self._armed,
+            "armed_path_prefix": self._armed_path_prefix,
+            "profiles": [profile.summary() for profile in reversed(self._profiles.values())],
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests of admins sending PROFILING_HEADER and the armed requests"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = request_profiler.trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        profile = request_profiler.start(scope, *trigger, task.get_coro() if task else None, sys._getframe())
+        if profile is None:
+
+            async def send_busy(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", []), (PROFILE_STATUS_HEADER, b"busy")]
+                await send(message)
+
+            await self.app(scope, receive, send_busy)
+            return
+
+        async def send_with_profile_id(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            request_profiler.finish(profile, route_label(scope))
+
+
+# Global instance
+request_profiler = RequestProfiler()
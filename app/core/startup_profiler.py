@@ -0,0 +1,154 @@
+"""
+Startup profiler: where the time between the process start and the first healthy response goes.
+
+- import tree: execution time of every module imported while the application starts, with its own and cumulative time
+- phases: timed steps of the module level setup of main.py and of the lifespan (db connect, initial setup, workers)
+- milestones: application imported, lifespan complete (ready), first healthy response, relative to the process start
+
+main.py imports this module before any other application module, so the import tree covers the whole application.
+The import hook is removed once the application is ready. Report: /management/startup, CLI: scripts/profile_startup.py
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional
+
+
+def _process_age_seconds() -> Optional[float]:
+    """Seconds since the start of this process (Linux), None where /proc is not available"""
+    try:
+        with open("/proc/self/stat") as f:
+            # the command name (field 2) may contain spaces, the fields after it are split on the closing parenthesis
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class ImportNode:
+    module: str
+    started: float
+    cumulative: float = 0.0
+    children: List["ImportNode"] = field(default_factory=list)
+
+    @property
+    def self_time(self) -> float:
+        return self.cumulative - sum(child.cumulative for child in self.children)
+
+    def to_dict(self, min_seconds: float, depth: int) -> dict[str, Any]:
+        node: dict[str, Any] = {
+            "module": self.module,
+            "cumulative_ms": round(self.cumulative * 1000, 2),
+            "self_ms": round(self.self_time * 1000, 2),
+        }
+        children = [child for child in self.children if child.cumulative >= min_seconds]
+        if depth > 1 and children:
+            node["imports"] = [child.to_dict(min_seconds, depth - 1) for child in sorted(children, key=lambda child: -child.cumulative)]
+        return node
+
+
+class _ImportTimer:
+    """
+    Meta path finder timing the execution of the modules it finds with the other finders.
+    The loader of the spec stays the same object (isinstance checks keep working), only its exec_module is wrapped.
+    """
+
+    def __init__(self):
+        self.roots: List[ImportNode] = []
+        self._stack: List[ImportNode] = []
+
+    def find_spec(self, name: str, path: Any, target: Any = None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # builtin and frozen importers are classes shared by all their modules, loaders shared by modules (zipimport) are wrapped once
+        if loader is not None and hasattr(loader, "__dict__") and not isinstance(loader, type) and "exec_module" not in vars(loader):
+            exec_module = getattr(loader, "exec_module", None)
+            if exec_module is not None:
+                loader.exec_module = self._timed(exec_module)
+        return spec
+
+    def _timed(self, exec_module: Any) -> Any:
+        def timed_exec_module(module: Any) -> None:
+            node = ImportNode(module=module.__name__, started=time.perf_counter())
+            (self._stack[-1].children if self._stack else self.roots).append(node)
+            self._stack.append(node)
+            try:
+                exec_module(module)
+            finally:
+                node.cumulative = time.perf_counter() - node.started
+                self._stack.pop()
+
+        return timed_exec_module
+
+
+class StartupProfiler:
+    """Collects the import tree, the phases and the milestones of the application startup"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # the interpreter start, the python runtime and the imports before this module are not measured otherwise
+        self.process_age_at_start = _process_age_seconds()
+        self.phases: List[dict[str, Any]] = []
+        self.milestones: dict[str, float] = {}
+        self._imports: Optional[_ImportTimer] = None
+
+    def install_import_timer(self) -> None:
+        if self._imports is None:
+            self._imports = _ImportTimer()
+            sys.meta_path.insert(0, self._imports)
+
+    def remove_import_timer(self) -> None:
+        if self._imports in sys.meta_path:
+            sys.meta_path.remove(self._imports)
+
+    def _elapsed(self) -> float:
+        """Seconds since the process start, since the import of this module where it is unknown"""
+        return (self.process_age_at_start or 0.0) + time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a startup step, e.g. with startup_profiler.phase("db_connect"): ..."""
+        at, started = self._elapsed(), time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "at_seconds": round(at, 4), "seconds": round(time.perf_counter() - started, 4)})
+
+    def milestone(self, name: str) -> None:
+        """Record the first time a milestone is reached, e.g. ready"""
+        if name not in self.milestones:
+            self.milestones[name] = round(self._elapsed(), 4)
+            if name == "ready":
+                self.remove_import_timer()
+
+    def report(self, min_ms: float = 5.0, depth: int = 4) -> dict[str, Any]:
+        roots = self._imports.roots if self._imports else []
+        return {
+            "process_age_at_profiler_import_seconds": None if self.process_age_at_start is None else round(self.process_age_at_start, 4),
+            "milestones": self.milestones,
+            "phases": self.phases,
+            "import_seconds": round(sum(root.cumulative for root in roots), 4),
+            "imports": [
+                root.to_dict(min_ms / 1000, depth)
+                for root in sorted(roots, key=lambda root: -root.cumulative)
+                if root.cumulative >= min_ms / 1000
+            ],
+        }
+
+
+# Global instance
+startup_profiler = StartupProfiler()
+startup_profiler.install_import_timer()
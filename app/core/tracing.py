@@ -0,0 +1,345 @@
+"""
+Lightweight request tracing: a span per request (TracingMiddleware) with child spans for the service, repository and
+agent calls, propagated with contextvars. Finished traces are exported in a background thread to a JSONL file or
+to an OTLP/HTTP collector (TRACING_EXPORTER).
+
+Example : with tracer.start_span("chat_service.handle_chat_completion", username=username): ...
+
+Spans are only created inside a sampled request, start_span is a contextvar lookup otherwise.
+"""
+
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional
+
+import httpx
+from loguru import logger
+
+from app.config.tracing import tracing_config
+from app.core.metrics import route_label
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "status", "error")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str], attributes: dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_unix_nano": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _Trace:
+    """The spans of one sampled request, exported together when the request span ends"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+
+
+# the active span and its trace, None outside of sampled requests
+_current: ContextVar[Optional[tuple[_Trace, Span]]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    """Exports finished spans from a background thread, the event loop only puts them in a bounded queue"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=tracing_config.QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._http: Optional[httpx.Client] = None
+        self.exported = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def export(self, spans: List[Span]) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+        for span in spans:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            try:
+                item = self._queue.get(timeout=1.0)
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= tracing_config.EXPORT_BATCH_SIZE:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._write(batch)
+                    self.exported += len(batch)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Span export failed, {len(batch)} spans dropped: {e}")
+
+    def _write(self, spans: List[Span]) -> None:
+        if tracing_config.EXPORTER == "otlp":
+            if self._http is None:
+                self._http = httpx.Client(timeout=tracing_config.OTLP_TIMEOUT_SECONDS)
+            response = self._http.post(f"{tracing_config.OTLP_ENDPOINT.rstrip('/')}/v1/traces", json=self._otlp(spans))
+            response.raise_for_status()
+            return
+        with open(tracing_config.JSONL_FILE, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+
+    @staticmethod
+    def _otlp(spans: List[Span]) -> dict[str, Any]:
+        """OTLP/HTTP JSON encoding of the spans"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": tracing_config.SERVICE_NAME}}]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.core.tracing"},
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                                    "name": span.name,
+                                    # 2: server (the request span), 1: internal
+                                    "kind": 2 if span.attributes.get("http.method") else 1,
+                                    "startTimeUnixNano": str(span.start_ns),
+                                    "endTimeUnixNano": str(span.end_ns),
+                                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                                    "status": {"code": 2, "message": span.error} if span.status == "error" else {"code": 1},
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Export the queued spans and stop the thread"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def stats(self) -> dict:
+        return {
+            "exporter": tracing_config.EXPORTER,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        current = _current.get()
+        return current[0].trace_id if current else None
+
+    @contextmanager
+    def start_span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Child span of the active span, nothing (None) outside of a sampled request"""
+        current = _current.get()
+        if current is None:
+            yield None
+            return
+        trace, parent = current
+        span = Span(trace.trace_id, name, parent.span_id, attributes)
+        token = _current.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            trace.spans.append(span)
+            _current.reset(token)
+
+    @contextmanager
+    def start_trace(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Root span of a request, the finished trace is exported when it ends"""
+        if not sampled:
+            token = _current.set(None)
+            try:
+                yield None
+            finally:
+                _current.reset(token)
+            return
+        trace = _Trace(trace_id)
+        span = Span(trace_id, name, parent_id, attributes)
+        token = _current.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            trace.spans.append(span)
+            _current.reset(token)
+            self.exporter.export(trace.spans)
+
+
+def traced_methods(prefix: str) -> Callable[[type], type]:
+    """
+    Class decorator opening a span for every public async method of a class, e.g. @traced_methods("repository.chat").
+    Async generators get a span without becoming the active span, their items are consumed in the caller's context.
+    """
+
+    def wrap(method_name: str, method: Callable) -> Callable:
+        name = f"{prefix}.{method_name}"
+        if inspect.isasyncgenfunction(method):
+
+            @functools.wraps(method)
+            async def traced_generator(*args, **kwargs):
+                current = _current.get()
+                if current is None:
+                    async for item in method(*args, **kwargs):
+                        yield item
+                    return
+                trace, parent = current
+                span = Span(trace.trace_id, name, parent.span_id, {})
+                try:
+                    async for item in method(*args, **kwargs):
+                        yield item
+                except BaseException as e:
+                    span.set_error(e)
+                    raise
+                finally:
+                    span.end_ns = time.time_ns()
+                    trace.spans.append(span)
+
+            return traced_generator
+
+        @functools.wraps(method)
+        async def traced(*args, **kwargs):
+            with tracer.start_span(name):
+                return await method(*args, **kwargs)
+
+        return traced
+
+    def decorate(cls: type) -> type:
+        if not tracing_config.ENABLED:
+            return cls
+        for method_name, method in list(vars(cls).items()):
+            if not method_name.startswith("_") and (inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method)):
+                setattr(cls, method_name, wrap(method_name, method))
+        return cls
+
+    return decorate
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the request span and returning the trace id in TRACING_RESPONSE_HEADER"""
+
+    def __init__(self, app: Any):
+        self.app = app
+        self.header = tracing_config.RESPONSE_HEADER.lower().encode()
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, sampled = None, None, random.random() < tracing_config.SAMPLE_RATE
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                match = TRACEPARENT.match(value.decode("latin-1").strip().lower())
+                if match and match.group(1) != "0" * 32:
+                    trace_id, parent_id, sampled = match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+                break
+        trace_id = trace_id or os.urandom(16).hex()
+
+        async def send_with_trace_id(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (self.header, trace_id.encode())]
+                if span is not None:
+                    span.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        with tracer.start_trace(f"{scope['method']} {scope['path']}", trace_id, parent_id, sampled, **{"http.method": scope["method"]}) as span:
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                if span is not None:
+                    # the route template is known once the request is routed
+                    route = route_label(scope)
+                    span.name = f"{scope['method']} {route}"
+                    span.set_attribute("http.route", route)
+
+
+# Global instance
+tracer = Tracer(SpanExporter())
@@ -11,6 +11,8 @@ class DatabaseClientProtocol(Protocol):
     - close
     - client
     - db
+    - ping
+    - pool_stats
 
     This protocol is used to ensure that the database client implements the required methods and properties.
 
@@ -27,6 +29,8 @@ class DatabaseClientProtocol(Protocol):
     def client(self): ...
     @property
     def db(self): ...
+    async def ping(self) -> None: ...
+    def pool_stats(self) -> dict: ...
 
 
 class DatabaseClient(ABC, DatabaseClientProtocol):
@@ -53,3 +57,13 @@ class DatabaseClient(ABC, DatabaseClientProtocol):
     def db(self):
         """Get the database instance"""
         pass
+
+    @abstractmethod
+    async def ping(self) -> None:
+        """Round trip to the database, raises when it is not reachable"""
+        pass
+
+    @abstractmethod
+    def pool_stats(self) -> dict:
+        """Connection pool settings and counters"""
+        pass
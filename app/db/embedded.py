@@ -62,3 +62,10 @@ class EmbeddedMongoClient(DatabaseClient):
             self._client = None
             self._db = None
             self._is_connected = False
+
+    async def ping(self) -> None:
+        await self.db.command("ping")
+
+    def pool_stats(self) -> dict:
+        # in-process, no connections
+        return {"type": "embedded", "connected": self._is_connected}
@@ -1,10 +1,68 @@
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from app.config.db import db_config
 from loguru import logger
 from app.db.client import DatabaseClient
 
 
+class ConnectionPoolStats(monitoring.ConnectionPoolListener):
+    """Counts the connection pool events of the driver, the pool has no public counters"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.check_out_failures = 0
+        self.pool_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.created += 1
+        self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.closed += 1
+        self.open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.check_out_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def as_dict(self) -> dict:
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "created": self.created,
+            "closed": self.closed,
+            "check_out_failures": self.check_out_failures,
+            "pool_cleared": self.pool_cleared,
+        }
+
+
 class PersistentMongoClient(DatabaseClient):
     """Real MongoDB client implementation"""
 
@@ -12,6 +70,7 @@ class PersistentMongoClient(DatabaseClient):
         self._client: Optional[AsyncIOMotorClient] = None
         self._db = None
         self._is_connected: bool = False
+        self._pool_stats = ConnectionPoolStats()
 
     @property
     def client(self) -> AsyncIOMotorClient:
@@ -19,7 +78,8 @@ class PersistentMongoClient(DatabaseClient):
 
         if not self._client:
             logger.info("Generating PersistentMongoClient")
-            self._client = AsyncIOMotorClient(db_config.get_mongo_uri())
+            # connect=False: no connection (or monitor thread) before the first operation, the client is safe to create before a fork
+            self._client = AsyncIOMotorClient(db_config.get_mongo_uri(), connect=False, event_listeners=[self._pool_stats])
             self._db = self._client[db_config.DATABASE_NAME]
         logger.info(f"Returning PersistentMongoClient. Host: {self._client.host}")
         return self._client
@@ -59,3 +119,16 @@ class PersistentMongoClient(DatabaseClient):
             self._client = None
             self._db = None
             self._is_connected = False
+
+    async def ping(self) -> None:
+        await self.client.admin.command("ping")
+
+    def pool_stats(self) -> dict:
+        options = self.client.options.pool_options
+        return {
+            "type": "mongodb",
+            "connected": self._is_connected,
+            "max_pool_size": options.max_pool_size,
+            "min_pool_size": options.min_pool_size,
+            **self._pool_stats.as_dict(),
+        }
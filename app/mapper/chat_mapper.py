@@ -1,17 +1,29 @@
 from datetime import datetime
+from typing import List, Optional
 from app.mapper.base_mapper import BaseMapper
 from app.model.chat_model import ChatCompletion, ChatMessageModel
 from app.schema.chat_schema import ChatCompletionResponse, ChatCompletionRequest, ChatMessageResponse, ChoiceResponse
+from app.mapper.tabular_mapper import to_markdown
+from app.config.result import result_config
 from loguru import logger
 
 
 def to_message_schema(model: ChatMessageModel) -> ChatMessageResponse:
-    """Convert ChatMessageModel to ChatMessageResponse schema."""
+    """Convert ChatMessageModel to ChatMessageResponse schema. A tabular result is rendered into the content as a markdown table."""
+    content = model.content
+    if model.data is not None:
+        content = (
+            f"{content}\n\n{to_markdown(model.data, result_config.MARKDOWN_MAX_ROWS)}"
+            if content
+            else to_markdown(model.data, result_config.MARKDOWN_MAX_ROWS)
+        )
     return ChatMessageResponse(
         message_id=model.message_id,
         role=model.role,
-        content=model.content,
+        content=content,
         figure=model.figure,
+        has_figure=model.has_figure,
+        data_row_count=model.data.row_count if model.data else None,
         created_date=model.created_date,
     )
 
@@ -19,21 +31,34 @@ def to_message_schema(model: ChatMessageModel) -> ChatMessageResponse:
 class ChatMapper(BaseMapper[ChatCompletion, ChatCompletionResponse]):
     """Mapper for converting between ChatCompletion model and schema objects."""
 
-    def to_schema(self, model: ChatCompletion, convert_last_message: bool = False) -> ChatCompletionResponse:
-        """Convert ChatCompletion model to ChatCompletionResponse schema."""
-        # Convert datetime to Unix timestamp
-        created_timestamp = int(model.created_date.timestamp()) if model.created_date else int(datetime.now().timestamp())
-        choices = []
-        if convert_last_message:
-            last_message = model.messages[-1]
-            choices.append(ChoiceResponse(index=0, message=to_message_schema(last_message), finish_reason="stop"))
-        else:
-            index = 0
-            for message in model.messages:
-                choices.append(ChoiceResponse(index=index, message=to_message_schema(message), finish_reason="stop"))
-                index += 1
-
-        return ChatCompletionResponse(completion_id=model.completion_id, model=model.model, created=created_timestamp, choices=choices)
+    def to_schema(self, model: ChatCompletion, convert_last_message: bool = False, fields: Optional[List[str]] = None) -> ChatCompletionResponse:
+        """
+        Convert ChatCompletion model to ChatCompletionResponse schema.
+        With fields, only the selected fields are set, the model was loaded with their projection.
+        """
+        values = {"completion_id": model.completion_id}
+        if fields is None or "model" in fields:
+            values["model"] = model.model
+        if fields is None or "created" in fields:
+            # Convert datetime to Unix timestamp
+            values["created"] = int(model.created_date.timestamp()) if model.created_date else int(datetime.now().timestamp())
+        if fields is None or "choices" in fields:
+            choices = []
+            messages = model.messages or []
+            if convert_last_message and messages:
+                last_message = messages[-1]
+                choices.append(ChoiceResponse(index=0, message=to_message_schema(last_message), finish_reason="stop"))
+            elif not convert_last_message:
+                index = 0
+                for message in messages:
+                    choices.append(ChoiceResponse(index=index, message=to_message_schema(message), finish_reason="stop"))
+                    index += 1
+            values["choices"] = choices
+
+        return ChatCompletionResponse(**values)
+
+    def to_schema_list(self, models: List[ChatCompletion], fields: Optional[List[str]] = None) -> List[ChatCompletionResponse]:
+        return [self.to_schema(model, fields=fields) for model in models]
 
     def to_model(self, schema: ChatCompletionRequest) -> ChatCompletion:
         """Convert ChatCompletionRequest schema to ChatCompletion model."""
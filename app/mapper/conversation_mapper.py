@@ -1,5 +1,7 @@
 # ChatCompletion to ConversationItem
 
+from typing import List, Optional
+
 from app.mapper.base_mapper import BaseMapper
 from app.model.chat_model import ChatCompletion
 from app.schema.conversation_schema import ConversationItemResponse
@@ -8,23 +10,34 @@ from app.schema.conversation_schema import ConversationItemResponse
 class ConversationMapper(BaseMapper[ChatCompletion, ConversationItemResponse]):
     """Mapper for converting between ChatCompletion model and ConversationItem schema."""
 
-    def to_schema(self, model: ChatCompletion) -> ConversationItemResponse:
-        """Convert ChatCompletion model to ConversationItem schema."""
-
-        # Get the first message content as title if title is not set
-        title = model.title
-        if not title and model.messages:
-            first_message = model.messages[0]
-            title = first_message.content[:20] + "..." if len(first_message.content) > 20 else first_message.content
-
-        return ConversationItemResponse(
-            completion_id=model.completion_id,
-            title=title,
-            create_time=model.created_date,
-            update_time=model.last_updated_date,
-            is_archived=model.is_archived,
-            is_starred=model.is_starred,
-        )
+    def to_schema(self, model: ChatCompletion, fields: Optional[List[str]] = None) -> ConversationItemResponse:
+        """
+        Convert ChatCompletion model to ConversationItem schema.
+        With fields, only the selected fields are set, the model was loaded with their projection.
+        """
+        values = {
+            "completion_id": model.completion_id,
+            "create_time": model.created_date,
+            "update_time": model.last_updated_date,
+            "is_archived": model.is_archived,
+            "is_starred": model.is_starred,
+            "async_status": model.async_status,
+            "snippet": model.snippet,
+        }
+        if fields is None or "title" in fields:
+            # Get the first message content as title if title is not set
+            title = model.title
+            if not title and model.messages:
+                first_message = model.messages[0]
+                title = first_message.content[:20] + "..." if len(first_message.content) > 20 else first_message.content
+            values["title"] = title
+        if fields is not None:
+            values = {name: value for name, value in values.items() if name in fields}
+
+        return ConversationItemResponse(**values)
+
+    def to_schema_list(self, models: List[ChatCompletion], fields: Optional[List[str]] = None) -> List[ConversationItemResponse]:
+        return [self.to_schema(model, fields=fields) for model in models]
 
     def to_model(self, schema: ConversationItemResponse) -> ChatCompletion:
         raise NotImplementedError("ConversationMapper.to_model is not implemented")
@@ -0,0 +1,50 @@
+# `fields=` query parameter of the read endpoints to database projections
+
+from typing import Any, List, Optional
+
+# response field -> database fields (and their projection) needed to map it
+CHAT_COMPLETION_FIELDS: dict[str, dict[str, Any]] = {
+    "completion_id": {"completion_id": 1},
+    "model": {"model": 1},
+    "created": {"created_date": 1},
+    "choices": {"messages": 1},
+}
+
+CONVERSATION_FIELDS: dict[str, dict[str, Any]] = {
+    "completion_id": {"completion_id": 1},
+    # the first message is the title until a title is set
+    "title": {"title": 1, "messages": {"$slice": 1}},
+    "create_time": {"created_date": 1},
+    "update_time": {"last_updated_date": 1},
+    "is_archived": {"is_archived": 1},
+    "is_starred": {"is_starred": 1},
+    "async_status": {"async_status": 1},
+    "snippet": {"snippet": 1},
+}
+
+
+def parse_fields(fields: Optional[str], allowed: dict[str, dict[str, Any]]) -> Optional[List[str]]:
+    """
+    Parse a comma separated `fields` query parameter against an allow-list, None when no fields are selected.
+    completion_id identifies the item and is always selected. Raises ValueError for unknown fields.
+    Example : parse_fields("title,update_time", CONVERSATION_FIELDS) -> ["completion_id", "title", "update_time"]
+    """
+    if not fields or not fields.strip():
+        return None
+    selected = ["completion_id"]
+    for field in fields.split(","):
+        field = field.strip()
+        if not field or field in selected:
+            continue
+        if field not in allowed:
+            raise ValueError(f"Unknown field: {field}. Allowed fields: {', '.join(allowed)}")
+        selected.append(field)
+    return selected
+
+
+def to_projection(fields: Optional[List[str]], allowed: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """The database projection of the selected fields, all allowed fields when fields is None"""
+    projection: dict[str, Any] = {"_id": 0}
+    for field in fields if fields is not None else allowed:
+        projection.update(allowed[field])
+    return projection
@@ -0,0 +1,158 @@
+# Plotly figure data to a reduced view with at most max_points points per trace
+
+import base64
+from typing import Any, Optional
+
+import numpy as np
+
+# traces drawn point by point, reduced with LTTB
+_LINE_TRACE_TYPES = {"scatter", "scattergl"}
+# per point attributes which must follow the selected points
+_PER_POINT_KEYS = ("customdata", "text", "hovertext", "ids")
+_PER_POINT_MARKER_KEYS = ("color", "size", "symbol", "opacity")
+
+
+def decode_array(value: Any) -> Optional[np.ndarray]:
+    """Values of a plotly data array: a list or a typed array ({"dtype": "f8", "bdata": "..."})"""
+    if value is None:
+        return None
+    if isinstance(value, dict) and "bdata" in value:
+        array = np.frombuffer(base64.b64decode(value["bdata"]), dtype=np.dtype(value["dtype"]).newbyteorder("<"))
+        if "shape" in value:
+            shape = value["shape"]
+            array = array.reshape([int(size) for size in shape.split(",")] if isinstance(shape, str) else shape)
+        return array
+    if isinstance(value, (list, tuple)):
+        array = np.asarray(value, dtype=object if value and isinstance(value[0], (list, tuple, dict)) else None)
+        if array.dtype == object and array.ndim == 1:
+            # numbers with gaps (None)
+            try:
+                array = np.array([np.nan if item is None else item for item in value], dtype=float)
+            except (TypeError, ValueError):
+                pass
+        return array
+    return None
+
+
+def encode_array(array: np.ndarray) -> Any:
+    """Plotly typed array of a numeric array, a list otherwise"""
+    if array.ndim == 1 and array.dtype.kind in "iuf" and array.dtype.itemsize <= 8:
+        if array.dtype.kind in "iu" and array.dtype.itemsize == 8:
+            array = array.astype("<f8")  # plotly.js has no 64 bit integer typed arrays
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        return {"dtype": array.dtype.str.lstrip("<|="), "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+    return array.tolist()
+
+
+def _numeric_axis(values: Optional[np.ndarray], length: int) -> np.ndarray:
+    """x values as floats for the area computation: numbers, dates, or the point index for categories"""
+    if values is None or len(values) != length:
+        return np.arange(length, dtype=float)
+    if values.dtype.kind in "iuf":
+        return values.astype(float)
+    try:
+        return np.asarray(values, dtype="datetime64[ms]").astype("int64").astype(float)
+    except (ValueError, TypeError):
+        return np.arange(length, dtype=float)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of at most max_points points which keep the visual shape of the series.
+    The first and last points are kept, every bucket in between keeps the point forming the largest triangle with
+    the point kept in the previous bucket and the average of the next bucket. The area of a bucket is computed at once.
+    """
+    length = len(y)
+    if max_points >= length or max_points < 3:
+        return np.arange(length) if max_points >= length else np.linspace(0, length - 1, max(max_points, 1)).astype(int)
+
+    y = np.where(np.isfinite(y), y, np.nan).astype(float)
+    # bucket boundaries of the points between the first and the last one
+    edges = np.linspace(1, length - 1, max_points - 1).astype(int)
+    # average of every bucket, used as the third vertex for the previous bucket
+    sums_x = np.add.reduceat(x[1 : length - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(np.nan_to_num(y[1 : length - 1]), edges[:-1] - 1)
+    counts = np.diff(edges)
+    averages_x = np.append(sums_x / counts, x[-1])
+    averages_y = np.append(sums_y / counts, y[-1] if np.isfinite(y[-1]) else 0.0)
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_x, next_y = averages_x[bucket + 1], averages_y[bucket + 1]
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + (int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else 0)
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _take(trace: dict, indices: np.ndarray, length: int) -> None:
+    """Keep only the points at indices of the per point attributes of the trace"""
+    for key in ("x", "y", *_PER_POINT_KEYS):
+        values = decode_array(trace.get(key))
+        if values is not None and len(values) == length:
+            trace[key] = encode_array(values[indices])
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        for key in _PER_POINT_MARKER_KEYS:
+            values = decode_array(marker.get(key)) if isinstance(marker.get(key), (list, dict)) else None
+            if values is not None and values.ndim == 1 and len(values) == length:
+                marker[key] = encode_array(values[indices])
+
+
+def _downsample_line(trace: dict, max_points: int) -> bool:
+    y = decode_array(trace.get("y"))
+    if y is None or y.ndim != 1 or len(y) <= max_points or y.dtype.kind not in "iuf":
+        return False
+    length = len(y)
+    indices = lttb_indices(_numeric_axis(decode_array(trace.get("x")), length), y.astype(float), max_points)
+    _take(trace, indices, length)
+    return True
+
+
+def _downsample_histogram(trace: dict, max_points: int) -> bool:
+    """Bin the raw samples of a histogram on the server, the trace becomes a bar trace with max_points bins at most"""
+    horizontal = trace.get("x") is None and trace.get("y") is not None
+    samples = decode_array(trace.get("y" if horizontal else "x"))
+    if samples is None or samples.ndim != 1 or len(samples) <= max_points or samples.dtype.kind not in "iuf":
+        return False
+    samples = samples[np.isfinite(samples)]
+    nbins = trace.get("nbinsx" if not horizontal else "nbinsy") or max_points
+    counts, edges = np.histogram(samples, bins=min(int(nbins), max_points))
+    centers, widths = (edges[:-1] + edges[1:]) / 2, np.diff(edges)
+    for key in ("x", "y", "nbinsx", "nbinsy", "xbins", "ybins", "autobinx", "autobiny", "histfunc", "histnorm", "cumulative", "bingroup"):
+        trace.pop(key, None)
+    trace.update(
+        {
+            "type": "bar",
+            "x" if not horizontal else "y": encode_array(centers),
+            "y" if not horizontal else "x": encode_array(counts.astype("<i4")),
+            "width": encode_array(widths),
+            "orientation": "h" if horizontal else "v",
+        }
+    )
+    return True
+
+
+def downsample_figure(figure: dict[str, Any], max_points: int) -> tuple[dict[str, Any], bool]:
+    """
+    A reduced copy of the figure with at most max_points points per line/scatter trace (LTTB)
+    and at most max_points bins per histogram trace. The figure itself is not changed.
+    Returns the figure and whether any trace was reduced.
+    """
+    traces = figure.get("data") or []
+    reduced = False
+    result = {**figure, "data": []}
+    for trace in traces:
+        trace_type = trace.get("type", "scatter")
+        if trace_type in _LINE_TRACE_TYPES or trace_type == "histogram":
+            # shallow copies, reduced attributes are replaced and never changed in place
+            trace = {**trace, "marker": {**trace["marker"]}} if isinstance(trace.get("marker"), dict) else {**trace}
+            if trace_type == "histogram":
+                reduced |= _downsample_histogram(trace, max_points)
+            else:
+                reduced |= _downsample_line(trace, max_points)
+        result["data"].append(trace)
+    return result, reduced
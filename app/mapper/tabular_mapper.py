@@ -0,0 +1,82 @@
+# TabularResult to markdown, row pages and plotly figure data
+
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.model.tabular_model import TabularColumn, TabularResult
+
+# typed arrays supported by plotly.js, 64 bit integers are not
+_PLOTLY_INT_DTYPES = ("i1", "u1", "i2", "u2", "i4", "u4")
+
+
+def _json_values(column: TabularColumn, start: int, stop: int) -> List[Any]:
+    """JSON serializable values of column rows [start, stop)"""
+    array = column.to_array()[start:stop]
+    if array.dtype.kind == "M":
+        return np.where(np.isnat(array), None, np.datetime_as_string(array, unit="auto").astype(object)).tolist()
+    if array.dtype.kind == "f":
+        # NaN is not valid JSON
+        return np.where(np.isnan(array), None, array.astype(object)).tolist()
+    return array.tolist()
+
+
+def to_rows(result: TabularResult, offset: int = 0, limit: Optional[int] = None) -> List[List[Any]]:
+    """Rows [offset, offset + limit) of the result, each column is sliced and converted at once."""
+    stop = result.row_count if limit is None else min(offset + limit, result.row_count)
+    if offset >= stop:
+        return []
+    columns = [_json_values(column, offset, stop) for column in result.columns]
+    return [list(row) for row in zip(*columns)]
+
+
+def _markdown_cell(value: Any) -> str:
+    return "" if value is None else str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def to_markdown(result: TabularResult, max_rows: int) -> str:
+    """Markdown table of the first max_rows rows of the result"""
+    header = "|" + "|".join(_markdown_cell(column.name) for column in result.columns) + "|"
+    separator = "|" + "|".join("---" for _ in result.columns) + "|"
+    lines = [header, separator]
+    lines.extend("|" + "|".join(_markdown_cell(value) for value in row) + "|" for row in to_rows(result, 0, max_rows))
+    if result.row_count > max_rows:
+        lines.append(f"\n_Showing {max_rows} of {result.row_count} rows._")
+    return "\n".join(lines)
+
+
+def _plotly_array(column: TabularColumn) -> Any:
+    """Plotly typed array of a buffer column (no per row conversion), plain values otherwise."""
+    if column.bdata is None or column.dtype.startswith("M"):
+        return _json_values(column, 0, None)
+    if column.dtype in _PLOTLY_INT_DTYPES or column.dtype in ("f4", "f8"):
+        return {"dtype": column.dtype, "bdata": column.bdata}
+    array = column.to_array()
+    if array.dtype.kind in "iu" and array.size and np.iinfo(np.int32).min <= array.min() and array.max() <= np.iinfo(np.int32).max:
+        array = array.astype("<i4")
+    else:
+        array = array.astype("<f8")
+    return TabularColumn.from_values(column.name, array).model_dump(include={"dtype", "bdata"})
+
+
+def to_plotly_figure(
+    result: TabularResult, x: Optional[str] = None, y: Optional[List[str]] = None, kind: str = "bar"
+) -> Optional[dict[str, Any]]:
+    """
+    Plotly figure data of the result: one trace per y column over the x column.
+    Defaults: x is the first non numeric column (or the first column), y are the numeric columns.
+    Returns None when the result has no numeric column to plot.
+    """
+    if not result.columns:
+        return None
+    numeric = [column.name for column in result.columns if column.dtype[0] in "iuf"]
+    if x is None:
+        x = next((column.name for column in result.columns if column.name not in numeric), result.columns[0].name)
+    y = [name for name in (y or numeric) if name != x]
+    if not y:
+        return None
+
+    x_values = _plotly_array(result.column(x))
+    traces = [{"type": kind, "name": name, "x": x_values, "y": _plotly_array(result.column(name))} for name in y]
+    layout = {"xaxis": {"title": {"text": x}}, "yaxis": {"title": {"text": y[0] if len(y) == 1 else ""}}, "showlegend": len(y) > 1}
+    return {"data": traces, "layout": layout}
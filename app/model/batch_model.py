@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Optional
+
+
+class BatchModel(BaseModel):
+    """
+    A batch of chat completion requests, processed in the background.
+    """
+
+    batch_id: str = Field(..., description="The unique identifier for the batch")
+    username: str = Field(..., description="The user who created the batch")
+    status: str = Field("queued", description="The status of the batch", examples=["queued", "in_progress", "completed", "cancelled"])
+    total: int = Field(0, description="The number of requests in the batch")
+    completed: int = Field(0, description="The number of successfully processed requests")
+    failed: int = Field(0, description="The number of failed requests")
+    metadata: Optional[dict[str, str]] = Field(None, description="Optional metadata of the batch")
+    owner: Optional[str] = Field(None, description="The worker processing the batch")
+    lease_expires_at: Optional[datetime] = Field(None, description="The time the claim of the owner expires")
+    created_date: Optional[datetime] = Field(None, description="The date and time the batch was created")
+    started_date: Optional[datetime] = Field(None, description="The date and time the processing started")
+    finished_date: Optional[datetime] = Field(None, description="The date and time the batch was completed or cancelled")
+
+
+class BatchItemModel(BaseModel):
+    """
+    A request of a batch and its result. Results are persisted per request, a resumed batch only processes pending requests.
+    """
+
+    batch_id: str = Field(..., description="The batch of the request")
+    index: int = Field(..., description="The line number of the request in the batch input, starting at 0")
+    custom_id: str = Field(..., description="The caller provided identifier of the request")
+    request: dict[str, Any] = Field(..., description="The chat completion request")
+    status: str = Field("pending", description="The status of the request", examples=["pending", "completed", "failed"])
+    status_code: Optional[int] = Field(None, description="The http status code of the result")
+    response: Optional[dict[str, Any]] = Field(None, description="The chat completion response")
+    error: Optional[str] = Field(None, description="The error of a failed request")
+    finished_date: Optional[datetime] = Field(None, description="The date and time the request was processed")
@@ -4,6 +4,7 @@ from bson import ObjectId
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional, Any
+from app.model.tabular_model import TabularResult
 
 
 class ChatMessageModel(BaseModel):
@@ -15,6 +16,12 @@ class ChatMessageModel(BaseModel):
     role: str = Field(..., description="The role of the message sender", examples=["user", "assistant", "system"])
     content: str = Field(..., description="The content of the message")
     figure: Optional[dict[str, Any]] = Field(None, description="The figure data for visualization")
+    data: Optional[TabularResult] = Field(None, description="The tabular result of the message in columnar form")
+    token_count: Optional[int] = Field(None, description="The number of tokens of the content, computed once when the message is saved")
+    # set when the message is loaded without its figure, never stored
+    has_figure: Optional[bool] = Field(
+        None, exclude=True, description="Whether the message has a figure or a tabular result to generate it from, when the figure is not loaded"
+    )
     created_date: Optional[datetime] = Field(None, description="The timestamp of the message")
 
     def __str__(self):
@@ -24,6 +31,8 @@ class ChatMessageModel(BaseModel):
             role={self.role},
             content={self.content},
             figure={self.figure},
+            data_rows={self.data.row_count if self.data else None},
+            token_count={self.token_count},
             created_date={self.created_date})
             """
 
@@ -60,9 +69,19 @@ class ChatCompletion(BaseModel):
     )
 
     title: Optional[str] = Field(None, description="The title of the chat completion")
+    title_generated: bool = Field(False, description="Whether the title was generated, until then the title is the start of the first message")
+    snippet: Optional[str] = Field(None, description="A short excerpt of the last answer of the chat completion")
     object_field: str = Field("chat.completion", alias="object_field", description="The object field of the chat completion")
     is_archived: bool = Field(False, description="Whether the chat completion is archived")
     is_starred: bool = Field(False, description="Whether the chat completion is starred")
+    async_status: Optional[str] = Field(
+        None, description="The status of the background completion job", examples=["queued", "in_progress", "completed", "failed"]
+    )
+
+    # rolling summary of the turns which fell out of the agent context token budget
+    context_summary: Optional[str] = Field(None, description="The summary of the older turns of the chat completion")
+    context_summary_token_count: int = Field(0, description="The number of tokens of the context summary")
+    context_summary_until: Optional[str] = Field(None, description="The message_id of the last message folded into the context summary")
 
     # audit fields
     created_by: Optional[str] = Field(None, description="The user who created the chat completion")
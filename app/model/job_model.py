@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Optional
+
+
+class CompletionJobModel(BaseModel):
+    """
+    A background chat completion job. The durable record of agent work queued for a conversation.
+    """
+
+    job_id: str = Field(..., description="The unique identifier for the job")
+    completion_id: str = Field(..., description="The chat completion the job answers")
+    username: str = Field(..., description="The user who submitted the job")
+    request: dict[str, Any] = Field(..., description="The chat completion request to process")
+    status: str = Field("queued", description="The status of the job", examples=["queued", "in_progress", "completed", "failed"])
+    attempts: int = Field(0, description="The number of times the job was claimed")
+    error: Optional[str] = Field(None, description="The last error of the job")
+    owner: Optional[str] = Field(None, description="The worker which claimed the job")
+    lease_expires_at: Optional[datetime] = Field(None, description="The time the claim of the owner expires")
+    created_date: Optional[datetime] = Field(None, description="The date and time the job was created")
+    last_updated_date: Optional[datetime] = Field(None, description="The date and time the job was last updated")
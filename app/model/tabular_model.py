@@ -0,0 +1,69 @@
+import base64
+from typing import Any, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+# numeric, boolean and datetime columns are stored as base64 encoded little-endian buffers (like plotly typed arrays)
+_BUFFER_KINDS = "biufM"
+
+
+class TabularColumn(BaseModel):
+    """
+    A column of a tabular result. Numeric, boolean and datetime columns keep their values in `bdata`,
+    other columns (strings, mixed values) in `values`.
+    """
+
+    name: str = Field(..., description="The name of the column")
+    dtype: str = Field(
+        ..., description="The numpy dtype of the column, `object` for strings and mixed values", examples=["i8", "f8", "b1", "M8[ms]", "object"]
+    )
+    bdata: Optional[str] = Field(None, description="The base64 encoded little-endian buffer of the column values")
+    values: Optional[List[Any]] = Field(None, description="The values of a string or mixed column")
+
+    @classmethod
+    def from_values(cls, name: str, values: Any) -> "TabularColumn":
+        array = np.asarray(values)
+        if array.dtype.kind == "M":
+            array = array.astype("datetime64[ms]")
+        if array.dtype.kind in _BUFFER_KINDS:
+            array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+            dtype = array.dtype.str.lstrip("<|=")
+            return cls(name=name, dtype=dtype, bdata=base64.b64encode(array.tobytes()).decode("ascii"))
+        return cls(name=name, dtype="object", values=array.astype(object).tolist())
+
+    def to_array(self) -> np.ndarray:
+        """The column values as a numpy array, buffer columns are decoded without copying."""
+        if self.bdata is not None:
+            return np.frombuffer(base64.b64decode(self.bdata), dtype=np.dtype(self.dtype).newbyteorder("<"))
+        return np.array(self.values or [], dtype=object)
+
+
+class TabularResult(BaseModel):
+    """
+    A typed columnar query result, e.g. the rows an agent retrieved for a question.
+    Stored with the message instead of a markdown table in the content, rendered only when needed.
+    """
+
+    columns: List[TabularColumn] = Field(..., description="The columns of the result")
+    row_count: int = Field(..., description="The number of rows of the result")
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, Any]) -> "TabularResult":
+        """
+        Build a result from column values (lists, numpy arrays or pandas series) of the same length.
+        Example : TabularResult.from_columns({"status": ["active", "passive"], "count": [100, 150]})
+        """
+        result_columns = [TabularColumn.from_values(name, values) for name, values in columns.items()]
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        return cls(columns=result_columns, row_count=lengths.pop() if lengths else 0)
+
+    @classmethod
+    def from_dataframe(cls, dataframe: Any) -> "TabularResult":
+        """Build a result from a pandas DataFrame"""
+        return cls.from_columns({str(name): dataframe[name].to_numpy() for name in dataframe.columns})
+
+    def column(self, name: str) -> Optional[TabularColumn]:
+        return next((column for column in self.columns if column.name == name), None)
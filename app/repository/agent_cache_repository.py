@@ -0,0 +1,57 @@
+import datetime
+from typing import Any, Optional
+from app.db.factory import db_client
+from app.core.metrics import timed_methods
+from app.core.tracing import traced_methods
+from loguru import logger
+import pymongo
+
+
+@timed_methods("agent_cache")
+@traced_methods("repository.agent_cache")
+class AgentCacheRepository:
+    """Data access for the persistent agent response cache. One document per cache key."""
+
+    def __init__(self):
+        logger.info("Initializing AgentCacheRepository")
+        self.db = db_client.db
+        self.collection = "agent_response_cache"
+
+    async def create_indexes(self) -> None:
+        """Create the lookup index and the TTL index which lets MongoDB drop expired entries."""
+        await self.db.agent_response_cache.create_index("key", unique=True)
+        await self.db.agent_response_cache.create_index("expires_at", expireAfterSeconds=0)
+
+    async def find_by_key(self, key: str) -> Optional[dict[str, Any]]:
+        """
+        Find a not expired cached response by key.
+        Example : key = "3f2a..."
+        """
+        query = {"key": key, "expires_at": {"$gt": datetime.datetime.now()}}
+        entity_doc = await self.db.agent_response_cache.find_one(query, {"_id": 0, "response": 1})
+        return entity_doc["response"] if entity_doc else None
+
+    async def save(self, key: str, response: dict[str, Any], ttl_seconds: float) -> None:
+        """Save a cached response by key, replacing any previous entry."""
+        now = datetime.datetime.now()
+        document = {"key": key, "response": response, "created_date": now, "expires_at": now + datetime.timedelta(seconds=ttl_seconds)}
+        await self.db.agent_response_cache.replace_one({"key": key}, document, upsert=True)
+
+    async def count(self) -> int:
+        return await self.db.agent_response_cache.count_documents({})
+
+    async def delete_oldest(self, keep: int) -> int:
+        """Delete expired entries and the oldest entries beyond `keep`. Returns the number of deleted entries."""
+        result = await self.db.agent_response_cache.delete_many({"expires_at": {"$lte": datetime.datetime.now()}})
+        deleted = result.deleted_count
+        overflow = await self.count() - keep
+        if overflow > 0:
+            cursor = self.db.agent_response_cache.find({}, {"key": 1}).sort("created_date", pymongo.ASCENDING).limit(overflow)
+            keys = [doc["key"] async for doc in cursor]
+            result = await self.db.agent_response_cache.delete_many({"key": {"$in": keys}})
+            deleted += result.deleted_count
+        logger.debug(f"REPO agent cache evicted {deleted} entries")
+        return deleted
+
+    async def delete_all(self) -> None:
+        await self.db.agent_response_cache.delete_many({})
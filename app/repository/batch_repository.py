@@ -0,0 +1,114 @@
+import datetime
+from typing import AsyncIterator, List, Optional
+from app.db.factory import db_client
+from app.core.metrics import timed_methods
+from app.core.tracing import traced_methods
+from app.model.batch_model import BatchItemModel, BatchModel
+from loguru import logger
+import pymongo
+
+UNFINISHED_STATUSES = ["queued", "in_progress"]
+
+
+@timed_methods("batch")
+@traced_methods("repository.batch")
+class BatchRepository:
+    """Data access for batches (chat_completion_batch) and their requests (chat_completion_batch_item)."""
+
+    def __init__(self):
+        logger.info("Initializing BatchRepository")
+        self.db = db_client.db
+        self.collection = "chat_completion_batch"
+        self.item_collection = "chat_completion_batch_item"
+
+    async def create_indexes(self) -> None:
+        """Pending requests and results are read by batch in input order"""
+        await self.db.chat_completion_batch.create_index("batch_id", unique=True)
+        await self.db.chat_completion_batch_item.create_index(
+            [("batch_id", pymongo.ASCENDING), ("status", pymongo.ASCENDING), ("index", pymongo.ASCENDING)]
+        )
+
+    async def create(self, entity: BatchModel, items: List[BatchItemModel]) -> BatchModel:
+        """Create a batch and its requests. The batch is created last, so a half inserted batch is never processed."""
+        logger.info(f"Creating new batch: {entity.batch_id} with {len(items)} requests for user: {entity.username}")
+        if items:
+            await self.db.chat_completion_batch_item.insert_many([item.model_dump() for item in items], ordered=False)
+        entity.created_date = datetime.datetime.now()
+        await self.db.chat_completion_batch.insert_one(entity.model_dump())
+        return entity
+
+    async def find_by_id(self, batch_id: str) -> Optional[BatchModel]:
+        entity_doc = await self.db.chat_completion_batch.find_one({"batch_id": batch_id}, {"_id": 0})
+        return BatchModel(**entity_doc) if entity_doc else None
+
+    async def find_by_username(self, username: str, limit: int = 100) -> List[BatchModel]:
+        cursor = self.db.chat_completion_batch.find({"username": username}, {"_id": 0}).sort("created_date", pymongo.DESCENDING).limit(limit)
+        return [BatchModel(**doc) async for doc in cursor]
+
+    async def claim_next(self, owner: str, lease_seconds: float) -> Optional[BatchModel]:
+        """
+        Atomically claim the oldest unfinished batch which is not owned by a live worker.
+        Batches left by a restart are claimable again after their lease expired.
+        """
+        now = datetime.datetime.now()
+        query = {
+            "status": {"$in": UNFINISHED_STATUSES},
+            "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}],
+        }
+        cursor = self.db.chat_completion_batch.find(query, {"batch_id": 1, "_id": 0}).sort("created_date", pymongo.ASCENDING).limit(5)
+        for doc in [doc async for doc in cursor]:
+            claim = {"batch_id": doc["batch_id"], **query}
+            update = {"$set": {"status": "in_progress", "owner": owner, "lease_expires_at": now + datetime.timedelta(seconds=lease_seconds)}}
+            # the conditional update is atomic, only one worker can claim the batch
+            result = await self.db.chat_completion_batch.update_one(claim, update)
+            if result.modified_count:
+                await self.db.chat_completion_batch.update_one(
+                    {"batch_id": doc["batch_id"], "started_date": None}, {"$set": {"started_date": now}}
+                )
+                return await self.find_by_id(doc["batch_id"])
+        return None
+
+    async def renew_lease(self, batch_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease of a running batch. Returns False if the batch is not owned anymore or not running (cancelled)."""
+        lease_expires_at = datetime.datetime.now() + datetime.timedelta(seconds=lease_seconds)
+        query = {"batch_id": batch_id, "owner": owner, "status": "in_progress"}
+        result = await self.db.chat_completion_batch.update_one(query, {"$set": {"lease_expires_at": lease_expires_at}})
+        return result.matched_count > 0
+
+    async def release_lease(self, batch_id: str, owner: str) -> None:
+        """Give up a running batch on shutdown, it is resumed by the next worker right away instead of after the lease expired."""
+        query = {"batch_id": batch_id, "owner": owner}
+        await self.db.chat_completion_batch.update_one(query, {"$set": {"owner": None, "lease_expires_at": None}})
+
+    async def update_status(self, batch_id: str, status: str, statuses: Optional[List[str]] = None) -> bool:
+        """Set the status of a batch, optionally only if its current status is one of statuses. Final statuses release the lease."""
+        query = {"batch_id": batch_id}
+        if statuses:
+            query["status"] = {"$in": statuses}
+        update = {"status": status}
+        if status not in UNFINISHED_STATUSES:
+            update.update({"finished_date": datetime.datetime.now(), "owner": None, "lease_expires_at": None})
+        result = await self.db.chat_completion_batch.update_one(query, {"$set": update})
+        return result.modified_count > 0
+
+    async def find_pending_items(self, batch_id: str, limit: int) -> List[BatchItemModel]:
+        query = {"batch_id": batch_id, "status": "pending"}
+        cursor = self.db.chat_completion_batch_item.find(query, {"_id": 0}).sort("index", pymongo.ASCENDING).limit(limit)
+        return [BatchItemModel(**doc) async for doc in cursor]
+
+    async def save_item_result(self, item: BatchItemModel) -> None:
+        """Persist the result of a request and count it on the batch."""
+        item.finished_date = datetime.datetime.now()
+        update = item.model_dump(include={"status", "status_code", "response", "error", "finished_date"})
+        result = await self.db.chat_completion_batch_item.update_one(
+            {"batch_id": item.batch_id, "index": item.index, "status": "pending"}, {"$set": update}
+        )
+        if result.modified_count:
+            counter = "completed" if item.status == "completed" else "failed"
+            await self.db.chat_completion_batch.update_one({"batch_id": item.batch_id}, {"$inc": {counter: 1}})
+
+    async def iter_finished_items(self, batch_id: str) -> AsyncIterator[BatchItemModel]:
+        """Processed requests of a batch in input order, read with a cursor."""
+        query = {"batch_id": batch_id, "status": {"$ne": "pending"}}
+        async for doc in self.db.chat_completion_batch_item.find(query, {"_id": 0}).sort("index", pymongo.ASCENDING):
+            yield BatchItemModel(**doc)
@@ -1,8 +1,14 @@
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, List, Optional
 from app.db.factory import db_client
+from app.core.metrics import timed_methods
+from app.core.tracing import traced_methods
+from app.config.db import db_config
+from app.config.result import result_config
 from app.model.chat_model import ChatMessageModel, ChatCompletion
+from app.model.tabular_model import TabularResult
 from loguru import logger
 import pymongo
+from pymongo.errors import BulkWriteError
 
 
 class DocumentNotFoundError(Exception):
@@ -14,6 +20,8 @@ class DocumentNotFoundError(Exception):
 # TODO: llm_model, llm_provider will come from .env file
 
 
+@timed_methods("chat")
+@traced_methods("repository.chat")
 class ChatRepository:
     def __init__(self):
         logger.info("Initializing ChatRepository")
@@ -146,6 +154,69 @@ class ChatRepository:
         logger.debug(f"END REPO: find, returning {len(result_models)} models.")
         return result_models
 
+    async def iter_find(
+        self, query: dict = {}, sort: dict = {"created_date": 1}, projection: dict = None, batch_size: int = 100
+    ) -> AsyncIterator[ChatCompletion]:
+        """
+        Stream the chat completions of a query, documents are fetched batch_size at a time.
+        Unlike find, the result is never materialized, memory stays bounded by one batch.
+        Example : async for entity in repository.iter_find({"created_by": "admin"}): ...
+        """
+        logger.debug(f"BEGIN REPO: iter_find chat completion. query: {query}, sort: {sort}, batch_size: {batch_size}")
+        cursor = self.db.chat_completion.find(query, projection).sort(list(sort.items())).batch_size(batch_size)
+        count = 0
+        async for item in cursor:
+            try:
+                entity = ChatCompletion(**item)
+            except Exception as e:
+                logger.error(f"Error parsing ChatCompletion from DB for item with id {item.get('_id', 'N/A')}: {e}", exc_info=True)
+                continue
+            count += 1
+            yield entity
+        logger.debug(f"END REPO: iter_find, streamed {count} models.")
+
+    async def find_owners(self, completion_ids: List[str]) -> dict[str, Optional[str]]:
+        """The created_by of the existing chat completions among completion_ids"""
+        cursor = self.db.chat_completion.find({"completion_id": {"$in": completion_ids}}, {"_id": 0, "completion_id": 1, "created_by": 1})
+        return {doc["completion_id"]: doc.get("created_by") async for doc in cursor}
+
+    async def bulk_upsert(self, entities: List[ChatCompletion]) -> tuple[int, int, dict[int, str]]:
+        """
+        Insert or replace chat completions by completion_id with one unordered bulk write.
+        A failing document does not stop the others.
+        Returns the number of inserted and replaced documents and the errors by index in entities.
+        """
+        logger.debug(f"BEGIN REPO: bulk upsert of {len(entities)} chat completions")
+        if db_config.DATABASE_TYPE == "embedded":
+            # mongomock does not accept the bulk operations of current pymongo versions
+            return await self._upsert_each(entities)
+        operations = [
+            pymongo.ReplaceOne({"completion_id": entity.completion_id}, entity.model_dump(exclude={"id"}), upsert=True) for entity in entities
+        ]
+        try:
+            result = await self.db.chat_completion.bulk_write(operations, ordered=False)
+            inserted, replaced, errors = result.upserted_count, result.matched_count, {}
+        except BulkWriteError as e:
+            details = e.details
+            inserted, replaced = details.get("nUpserted", 0), details.get("nMatched", 0)
+            errors = {error["index"]: error.get("errmsg", "write error") for error in details.get("writeErrors", [])}
+        logger.debug(f"END REPO: bulk upsert. inserted: {inserted}, replaced: {replaced}, errors: {len(errors)}")
+        return inserted, replaced, errors
+
+    async def _upsert_each(self, entities: List[ChatCompletion]) -> tuple[int, int, dict[int, str]]:
+        inserted, replaced, errors = 0, 0, {}
+        for index, entity in enumerate(entities):
+            try:
+                result = await self.db.chat_completion.replace_one(
+                    {"completion_id": entity.completion_id}, entity.model_dump(exclude={"id"}), upsert=True
+                )
+            except Exception as e:
+                errors[index] = str(e)
+                continue
+            inserted += 1 if result.upserted_id is not None else 0
+            replaced += result.matched_count
+        return inserted, replaced, errors
+
     async def find_by_id(self, completion_id: str, projection: dict = None) -> ChatCompletion | None:
         """
         Find a chat completion by a given id.
@@ -168,35 +239,127 @@ class ChatRepository:
             logger.info(f"Chat completion with ID {completion_id} not found in DB.")
             return None
 
-    async def find_messages(self, completion_id: str) -> List[ChatMessageModel]:
+    async def find_message_ids(self, completion_id: str) -> Optional[List[str]]:
         """
-        Find all messages for a given chat completion id.
+        Find the message ids of a chat completion in order, without loading the messages.
         Example : completion_id = "123"
         """
-        logger.debug(f"BEGIN REPO: find messages for chat completion id. input parameters: completion_id: {completion_id}")
-        projection = {"messages": 1, "_id": 0}
-        chat_doc = await self.db.chat_completion.find_one({"completion_id": completion_id}, projection)
-        logger.trace(f"REPO find_messages. chat_doc: {chat_doc}")
-        if chat_doc and "messages" in chat_doc and chat_doc["messages"]:
-            try:
-                messages_list = [
-                    ChatMessageModel(
-                        message_id=item["message_id"],
-                        role=item["role"],
-                        content=item["content"],
-                        figure=item["figure"] if item["figure"] else None,
-                        created_date=item["created_date"],
-                    )
-                    for item in chat_doc["messages"]
-                ]
-                logger.debug(f"END REPO: find_messages. Found {len(messages_list)} messages.")
-                return messages_list
-            except Exception as e:
-                logger.error(f"Error parsing messages for completion_id {completion_id}: {e}", exc_info=True)
-                return []
+        logger.debug(f"BEGIN REPO: find message ids. completion_id: {completion_id}")
+        entity_doc = await self.db.chat_completion.find_one({"completion_id": completion_id}, {"_id": 0, "messages.message_id": 1})
+        if entity_doc is None:
+            return None
+        return [message.get("message_id") for message in entity_doc.get("messages") or []]
+
+    async def find_message_range(self, completion_id: str, start: int, count: int, include_figures: bool = True) -> List[ChatMessageModel]:
+        """
+        Find count messages of a chat completion from the index start, only these messages are loaded.
+        Without figures, every message has a has_figure flag instead, the figures are not sent by the database.
+        has_figure is also set for a tabular result without a stored figure when RESULT_LAZY_FIGURE generates it on the plot request.
+        Example : completion_id = "123", start = 480, count = 20
+        """
+        logger.debug(
+            f"BEGIN REPO: find message range. completion_id: {completion_id}, start: {start}, count: {count}, figures: {include_figures}"
+        )
+        if count <= 0:
+            return []
+        pipeline = [
+            {"$match": {"completion_id": completion_id}},
+            {"$project": {"_id": 0, "messages": {"$slice": [{"$ifNull": ["$messages", []]}, start, count]}}},
+        ]
+        if not include_figures:
+            fields = {name: f"$$message.{name}" for name in ChatMessageModel.model_fields if name not in ("figure", "has_figure")}
+            has_figure = {"$ne": [{"$ifNull": ["$$message.figure", None]}, None]}
+            if result_config.LAZY_FIGURE:
+                has_figure = {"$or": [has_figure, {"$ne": [{"$ifNull": ["$$message.data", None]}, None]}]}
+            pipeline.append(
+                {"$project": {"messages": {"$map": {"input": "$messages", "as": "message", "in": {**fields, "has_figure": has_figure}}}}}
+            )
+        messages = []
+        async for doc in self.db.chat_completion.aggregate(pipeline):
+            messages = [ChatMessageModel(**message) for message in doc.get("messages") or []]
+        logger.debug(f"END REPO: find message range. Found {len(messages)} messages.")
+        return messages
+
+    async def find_context(self, completion_id: str, max_messages: int) -> ChatCompletion | None:
+        """
+        Find the context summary and the last max_messages messages of a chat completion.
+        Example : completion_id = "123", max_messages = 50
+        """
+        logger.debug(f"BEGIN REPO: find context. completion_id: {completion_id}, max_messages: {max_messages}")
+        projection = {
+            "_id": 0,
+            "completion_id": 1,
+            "context_summary": 1,
+            "context_summary_token_count": 1,
+            "context_summary_until": 1,
+            "messages": {"$slice": -max_messages},
+        }
+        entity_doc = await self.db.chat_completion.find_one({"completion_id": completion_id}, projection)
+        return ChatCompletion(**entity_doc) if entity_doc else None
+
+    async def update_context_summary(self, completion_id: str, summary: str, token_count: int, until_message_id: str) -> None:
+        """
+        Update the rolling context summary of a chat completion.
+        Example : completion_id = "123", summary = "user: ...", token_count = 12, until_message_id = "456"
+        """
+        logger.debug(f"BEGIN REPO: update context summary. completion_id: {completion_id}, until_message_id: {until_message_id}")
+        update = {"context_summary": summary, "context_summary_token_count": token_count, "context_summary_until": until_message_id}
+        await self.db.chat_completion.update_one({"completion_id": completion_id}, {"$set": update})
+
+    async def update_title(self, completion_id: str, title: str) -> bool:
+        """
+        Set the generated title of a chat completion, only once. Returns False if the title was already generated.
+        Example : completion_id = "123", title = "Customers by status"
+        """
+        logger.debug(f"BEGIN REPO: update title. completion_id: {completion_id}, title: {title}")
+        query = {"completion_id": completion_id, "title_generated": {"$ne": True}}
+        result = await self.db.chat_completion.update_one(query, {"$set": {"title": title, "title_generated": True}})
+        return result.modified_count > 0
+
+    async def update_snippet(self, completion_id: str, snippet: str) -> None:
+        """
+        Update the snippet of a chat completion.
+        Example : completion_id = "123", snippet = "There are 42 customers..."
+        """
+        logger.debug(f"BEGIN REPO: update snippet. completion_id: {completion_id}")
+        await self.db.chat_completion.update_one({"completion_id": completion_id}, {"$set": {"snippet": snippet}})
+
+    async def update_async_status(self, completion_id: str, async_status: Optional[str]) -> None:
+        """
+        Update the background job status of a chat completion.
+        Example : completion_id = "123", async_status = "in_progress"
+        """
+        logger.debug(f"BEGIN REPO: update async_status. completion_id: {completion_id}, async_status: {async_status}")
+        await self.db.chat_completion.update_one({"completion_id": completion_id}, {"$set": {"async_status": async_status}})
+
+    async def find_async_status(self, completion_id: str) -> Optional[str]:
+        """
+        Find the background job status of a chat completion.
+        Example : completion_id = "123"
+        """
+        entity_doc = await self.db.chat_completion.find_one({"completion_id": completion_id}, {"async_status": 1, "_id": 0})
+        return entity_doc.get("async_status") if entity_doc else None
 
-        logger.info(f"No messages found for completion_id {completion_id} or messages field is empty/missing.")
-        return []
+    async def find_message_data(self, completion_id: str, message_id: str) -> Optional[TabularResult]:
+        """
+        Find the tabular result of a message, only the matching message is loaded.
+        Example : completion_id = "123", message_id = "123"
+        """
+        message = await self.find_message(completion_id, message_id)
+        return message.data if message else None
+
+    async def find_message(self, completion_id: str, message_id: str) -> Optional[ChatMessageModel]:
+        """
+        Find a message of a chat completion, only the matching message is loaded.
+        Example : completion_id = "123", message_id = "123"
+        """
+        logger.debug(f"BEGIN REPO: find message. completion_id: {completion_id}, message_id: {message_id}")
+        projection = {"_id": 0, "messages": {"$elemMatch": {"message_id": message_id}}}
+        entity_doc = await self.db.chat_completion.find_one({"completion_id": completion_id}, projection)
+        if not entity_doc or not entity_doc.get("messages"):
+            logger.warning(f"Message with ID {message_id} not found")
+            return None
+        return ChatMessageModel(**entity_doc["messages"][0])
 
     async def find_plot_by_message(self, completion_id: str, message_id: str) -> Optional[dict[str, Any]]:
         """
@@ -204,31 +367,19 @@ class ChatRepository:
         Example : completion_id = "123", message_id = "123"
         """
         logger.debug(f"BEGIN REPO: find plot by message id. input parameters: completion_id: {completion_id}, message_id: {message_id}")
-
-        query = {"completion_id": completion_id}
-        projection = {"messages": 1, "_id": 0}
         try:
-            entity_doc = await self.db.chat_completion.find_one(query, projection)
-            logger.debug(f"REPO   entity_doc: {entity_doc}")
+            message = await self.find_message(completion_id, message_id)
         except Exception as e:
             logger.error(f"Error finding plot by message id: {e}")
             return None
+        return message.figure if message else None
 
-        if entity_doc and "messages" in entity_doc and entity_doc["messages"]:
-            try:
-                match = next((message for message in entity_doc["messages"] if message["message_id"] == message_id), None)
-                if match:
-                    figure = match.get("figure")
-                    logger.debug(f"REPO find figure: {figure}")
-                    return figure
-                else:
-                    logger.warning(f"Message with ID {message_id} not found")
-
-                logger.warning(f"Message with ID {message_id} not found")
-                return None
-            except Exception as e:
-                logger.error(f"Error finding plot by message id: {e}")
-                return None
-        else:
-            logger.warning(f"REPO find_plot_by_message. entity_doc: {entity_doc}")
-            return None
+    async def update_message_figure(self, completion_id: str, message_id: str, figure: dict[str, Any]) -> bool:
+        """
+        Save a generated figure to a message which has no figure yet. Returns False if the message already has one.
+        Example : completion_id = "123", message_id = "123", figure = {"data": [...], "layout": {...}}
+        """
+        logger.debug(f"BEGIN REPO: update message figure. completion_id: {completion_id}, message_id: {message_id}")
+        query = {"completion_id": completion_id, "messages": {"$elemMatch": {"message_id": message_id, "figure": None}}}
+        result = await self.db.chat_completion.update_one(query, {"$set": {"messages.$.figure": figure}})
+        return result.modified_count > 0
@@ -0,0 +1,83 @@
+import datetime
+from typing import List, Optional
+from app.db.factory import db_client
+from app.core.metrics import timed_methods
+from app.core.tracing import traced_methods
+from app.model.job_model import CompletionJobModel
+from loguru import logger
+import pymongo
+
+
+@timed_methods("job")
+@traced_methods("repository.job")
+class JobRepository:
+    """Data access for background chat completion jobs."""
+
+    def __init__(self):
+        logger.info("Initializing JobRepository")
+        self.db = db_client.db
+        self.collection = "chat_completion_job"
+
+    async def create(self, entity: CompletionJobModel) -> CompletionJobModel:
+        """Create a new job in the database."""
+        logger.info(f"Creating new completion job: {entity.job_id} for completion_id: {entity.completion_id}")
+        entity.created_date = entity.last_updated_date = datetime.datetime.now()
+        await self.db.chat_completion_job.insert_one(entity.model_dump())
+        return entity
+
+    async def find_by_id(self, job_id: str) -> Optional[CompletionJobModel]:
+        entity_doc = await self.db.chat_completion_job.find_one({"job_id": job_id}, {"_id": 0})
+        return CompletionJobModel(**entity_doc) if entity_doc else None
+
+    def _claimable_query(self, max_attempts: int) -> dict:
+        now = datetime.datetime.now()
+        return {
+            "attempts": {"$lt": max_attempts},
+            "$or": [{"status": "queued"}, {"status": "in_progress", "lease_expires_at": {"$lt": now}}],
+        }
+
+    async def find_claimable_ids(self, max_attempts: int, limit: int) -> List[str]:
+        """Find jobs which are queued or whose owner lost its lease (e.g. the process was restarted)."""
+        cursor = (
+            self.db.chat_completion_job.find(self._claimable_query(max_attempts), {"job_id": 1, "_id": 0})
+            .sort("created_date", pymongo.ASCENDING)
+            .limit(limit)
+        )
+        return [doc["job_id"] async for doc in cursor]
+
+    async def claim(self, job_id: str, owner: str, lease_seconds: float, max_attempts: int) -> Optional[CompletionJobModel]:
+        """
+        Atomically claim a job for a worker. Returns None if the job is not claimable anymore,
+        e.g. another worker claimed it first.
+        """
+        now = datetime.datetime.now()
+        query = {"job_id": job_id, **self._claimable_query(max_attempts)}
+        update = {
+            "$set": {
+                "status": "in_progress",
+                "owner": owner,
+                "lease_expires_at": now + datetime.timedelta(seconds=lease_seconds),
+                "last_updated_date": now,
+            },
+            "$inc": {"attempts": 1},
+        }
+        # the conditional update is atomic, only one worker can move the job out of the claimable state
+        result = await self.db.chat_completion_job.update_one(query, update)
+        if result.modified_count == 0:
+            return None
+        return await self.find_by_id(job_id)
+
+    async def update_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        update = {"status": status, "error": error, "last_updated_date": datetime.datetime.now()}
+        if status != "in_progress":
+            update["lease_expires_at"] = None
+        await self.db.chat_completion_job.update_one({"job_id": job_id}, {"$set": update})
+
+    async def fail_exhausted(self, max_attempts: int) -> List[CompletionJobModel]:
+        """Mark jobs whose lease expired after the last attempt as failed. Returns the failed jobs."""
+        query = {"status": "in_progress", "attempts": {"$gte": max_attempts}, "lease_expires_at": {"$lt": datetime.datetime.now()}}
+        entities = [CompletionJobModel(**doc) async for doc in self.db.chat_completion_job.find(query, {"_id": 0})]
+        if entities:
+            update = {"$set": {"status": "failed", "error": "Max attempts exceeded", "lease_expires_at": None}}
+            await self.db.chat_completion_job.update_many({"job_id": {"$in": [entity.job_id for entity in entities]}}, update)
+        return entities
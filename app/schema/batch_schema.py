@@ -0,0 +1,51 @@
+from typing import Any, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+from app.schema.chat_schema import ChatCompletionRequest
+
+
+class BatchRequestLine(BaseModel):
+    """
+    A line of the NDJSON batch input, in the OpenAI batch input format.
+    Example : {"custom_id": "q-1", "method": "POST", "url": "/v1/chat/completions", "body": {"messages": [...]}}
+    """
+
+    custom_id: Optional[str] = Field(None, description="Identifier of the request, returned with its result. Defaults to the line number")
+    method: str = Field("POST", description="Only POST is supported")
+    url: str = Field("/v1/chat/completions", description="Only /v1/chat/completions is supported")
+    body: ChatCompletionRequest = Field(..., description="The chat completion request")
+
+
+class BatchRequestCounts(BaseModel):
+    total: int = Field(..., description="The number of requests in the batch")
+    completed: int = Field(..., description="The number of successfully processed requests")
+    failed: int = Field(..., description="The number of failed requests")
+
+
+class BatchResponse(BaseModel):
+    """
+    A batch of chat completion requests.
+    """
+
+    batch_id: str = Field(..., description="The unique identifier for the batch")
+    object_field: str = Field("batch", alias="object", description="The object type, which is always `batch`")
+    status: str = Field(..., description="The status of the batch", examples=["queued", "in_progress", "completed", "cancelled"])
+    request_counts: BatchRequestCounts = Field(..., description="The request counts of the batch")
+    metadata: Optional[dict[str, str]] = Field(None, description="Optional metadata of the batch")
+    created_date: Optional[datetime] = Field(None, description="The date and time the batch was created")
+    started_date: Optional[datetime] = Field(None, description="The date and time the processing started")
+    finished_date: Optional[datetime] = Field(None, description="The date and time the batch was completed or cancelled")
+
+    model_config = {"populate_by_name": True}
+
+
+class BatchResultLine(BaseModel):
+    """
+    A line of the NDJSON batch results, in the OpenAI batch output format.
+    """
+
+    id: str = Field(..., description="The identifier of the result")
+    custom_id: str = Field(..., description="The identifier of the request")
+    response: Optional[dict[str, Any]] = Field(None, description="The status_code and body of the chat completion response")
+    error: Optional[dict[str, Any]] = Field(None, description="The error of a failed request")
@@ -24,6 +24,11 @@ class ChatCompletionRequest(BaseModel):
     model: Optional[str] = Field(None, description="The model to use for the chat completion")
     messages: Optional[List[ChatMessageRequest]] = Field(None, description="The messages to use for the chat completion")
     stream: bool = Field(False, description="Whether to stream the chat completion")
+    use_cache: bool = Field(True, description="Whether an identical previous answer may be returned from the agent response cache")
+    background: bool = Field(
+        False,
+        description="If set to true, the user message is saved and the answer is generated in the background. Poll the conversation's `async_status` or subscribe to `/v1/conversations/{completion_id}/events` for completion.",
+    )
 
 
 class ChatMessageResponse(BaseModel):
@@ -35,9 +40,30 @@ class ChatMessageResponse(BaseModel):
     role: Optional[str] = Field(None, description="The role of the message", examples=["user", "assistant", "system"])
     content: Optional[str] = Field(None, description="The content of the message")
     figure: Optional[dict[str, Any]] = Field(None, description="The figure data to be visualized")
+    has_figure: Optional[bool] = Field(
+        None, description="Whether the message has a figure, set when figures are omitted. Load it with `/messages/{message_id}/plot`"
+    )
+    data_row_count: Optional[int] = Field(
+        None, description="The number of rows of the tabular result of the message, page through it with `/messages/{message_id}/data`"
+    )
     created_date: Optional[datetime] = Field(None, description="The date and time the message was created")
 
 
+class ChatMessageListResponse(BaseModel):
+    """
+    A page of the messages of a chat completion.
+    """
+
+    object_field: str = Field("list", alias="object", description="The object type, which is always `list`")
+    data: List[ChatMessageResponse] = Field(..., description="The messages of the page, in the requested order")
+    first_id: Optional[str] = Field(None, description="The message_id of the first message of the page")
+    last_id: Optional[str] = Field(None, description="The message_id of the last message of the page")
+    has_more: bool = Field(..., description="Whether there are more messages after the page in the paging direction")
+    total: int = Field(..., description="The number of messages of the chat completion")
+
+    model_config = {"populate_by_name": True}
+
+
 class ChoiceResponse(BaseModel):
     finish_reason: Optional[str] = Field(
         None,
@@ -70,6 +96,25 @@ class ChatCompletionStreamResponse(ChatCompletionResponse):
     """
 
 
+class DataColumnResponse(BaseModel):
+    name: str = Field(..., description="The name of the column")
+    dtype: str = Field(..., description="The numpy dtype of the column, `object` for strings and mixed values", examples=["i8", "f8", "object"])
+
+
+class MessageDataResponse(BaseModel):
+    """
+    A page of rows of the tabular result of a message.
+    """
+
+    completion_id: str = Field(..., description="The unique identifier for the chat completion")
+    message_id: str = Field(..., description="The unique identifier for the message")
+    columns: List[DataColumnResponse] = Field(..., description="The columns of the result")
+    row_count: int = Field(..., description="The total number of rows of the result")
+    offset: int = Field(..., description="The index of the first row of the page")
+    limit: int = Field(..., description="The maximum number of rows of the page")
+    rows: List[List[Any]] = Field(..., description="The rows of the page, values in column order")
+
+
 class PlotRequest(BaseModel):
     """
     Represents a plot request for a given message to be visualized.
@@ -7,11 +7,12 @@ class ConversationItemResponse(BaseModel):
     """Represents an individual conversation record in the platform's chat history."""
 
     completion_id: str = Field(description="Unique identifier for the conversation in UUID format.")
-    title: str = Field(description="Title or name of the conversation, describing its content or purpose.")
-    create_time: datetime = Field(
-        description="Timestamp when the conversation was created, in ISO 8601 format (e.g., '2025-05-22T10:54:37.569747Z')."
+    title: Optional[str] = Field(default=None, description="Title or name of the conversation, describing its content or purpose.")
+    create_time: Optional[datetime] = Field(
+        default=None,
+        description="Timestamp when the conversation was created, in ISO 8601 format (e.g., '2025-05-22T10:54:37.569747Z').",
     )
-    update_time: datetime = Field(description="Timestamp when the conversation was last updated, in ISO 8601 format.")
+    update_time: Optional[datetime] = Field(default=None, description="Timestamp when the conversation was last updated, in ISO 8601 format.")
     mapping: Optional[dict] = Field(
         default=None,
         description="Optional dictionary containing additional conversation metadata or mappings, if applicable.",
@@ -28,7 +29,7 @@ class ConversationItemResponse(BaseModel):
         default=None,
         description="Identifier for the gizmo or tool associated with the conversation, if applicable.",
     )
-    is_archived: bool = Field(description="Indicates whether the conversation is archived.")
+    is_archived: Optional[bool] = Field(default=None, description="Indicates whether the conversation is archived.")
     is_starred: Optional[bool] = Field(
         default=None,
         description="Indicates whether the conversation is marked as starred or favorite, if set.",
@@ -74,3 +75,25 @@ class ConversationResponse(BaseModel):
     total: int = Field(description="Total number of conversations available in the user's history.")
     limit: int = Field(description="Maximum number of conversation items returned in this response.")
     offset: int = Field(description="Starting index of the conversation items in this response, used for pagination.")
+
+
+class ConversationImportError(BaseModel):
+    """A record of a conversation import which was not imported."""
+
+    line: int = Field(description="The line number of the record in the NDJSON body, starting at 1.")
+    completion_id: Optional[str] = Field(default=None, description="The completion_id of the record, if it could be read.")
+    error: str = Field(description="Why the record was not imported.")
+
+
+class ConversationImportResponse(BaseModel):
+    """Represents the result and the throughput of a conversation import."""
+
+    received: int = Field(description="Number of records read from the body.")
+    inserted: int = Field(description="Number of conversations created.")
+    replaced: int = Field(description="Number of existing conversations of the user replaced by their record.")
+    failed: int = Field(description="Number of records not imported.")
+    messages: int = Field(description="Number of messages of the imported conversations.")
+    errors: List[ConversationImportError] = Field(description="The errors of failed records, the first IMPORT_MAX_REPORTED_ERRORS only.")
+    elapsed_seconds: float = Field(description="Duration of the import.")
+    records_per_second: float = Field(description="Imported records per second.")
+    messages_per_second: float = Field(description="Imported messages per second.")
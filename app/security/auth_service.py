@@ -1,11 +1,14 @@
 from app.config.security_config import get_security_config
+from app.core.metrics import auth_verification_duration
 from fastapi import HTTPException, status, Security
 from fastapi.security import APIKeyHeader
 from loguru import logger
+from typing import Optional
 import base64
 import hmac
 import hashlib
 import json
+import time
 
 
 api_key_header = APIKeyHeader(
@@ -99,7 +102,36 @@ class AuthService:
                 detail="API key is required when security is enabled",
             )
 
-        username = self.decode_api_key(api_key)
+        started = time.perf_counter()
+        try:
+            username = self.decode_api_key(api_key)
+        except HTTPException:
+            auth_verification_duration.observe(time.perf_counter() - started, "rejected")
+            raise
+        auth_verification_duration.observe(time.perf_counter() - started, "ok")
         result = username
         logger.trace(f"END: result: {result}")
         return result
+
+    def admin_username(self, api_key: Optional[str]) -> Optional[str]:
+        """Username of the API key when it belongs to an admin, None otherwise (no key, invalid key, not an admin)"""
+        if not self.security_config.ENABLED:
+            username = self.security_config.DEFAULT_USERNAME
+        elif not api_key:
+            return None
+        else:
+            try:
+                username = self.decode_api_key(api_key)
+            except HTTPException:
+                return None
+        return username if username in self.security_config.ADMIN_USERNAMES else None
+
+    async def verify_admin(self, api_key: str = Security(api_key_header)) -> str:
+        """Verify API key and require an admin (SECURITY_ADMIN_USERNAMES)."""
+        username = await self.verify_credentials(api_key)
+        if username not in self.security_config.ADMIN_USERNAMES:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Admin privileges are required",
+            )
+        return username
@@ -0,0 +1,195 @@
+"""
+Production server: python -m app.serve
+
+- N uvicorn worker processes (SERVER_WORKERS, one per CPU core by default) sharing one listening socket
+- uvloop event loop and httptools http parser
+- the application is imported once in the master process and the workers are forked from it (SERVER_PRELOAD),
+  the objects of the application are frozen out of the garbage collector (SERVER_GC_FREEZE), so the workers share
+  its memory copy-on-write instead of touching every page on the first collection
+- the embedded database lives in the process memory, with DB_DATABASE_TYPE=embedded the server runs 1 worker
+- the Gradio UI keeps its sessions in the process memory, it is mounted only when the server runs 1 worker.
+  Run the UI as its own process (python -m app.serve_ui) in front of a multi-worker API.
+
+Development keeps using `uvicorn main:app --reload`.
+"""
+
+import gc
+import importlib
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Any, Optional
+
+import uvicorn
+from loguru import logger
+
+from app.config.db import db_config
+from app.config.server import server_config
+
+# a worker exiting within this many seconds after its start is not restarted right away
+_RESTART_BACKOFF_SECONDS = 1.0
+
+
+def resolve_workers() -> int:
+    """The number of worker processes for the configuration"""
+    workers = server_config.WORKERS or os.cpu_count() or 1
+    if workers > 1 and db_config.DATABASE_TYPE == "embedded":
+        logger.warning(f"DB_DATABASE_TYPE=embedded keeps the data in the process memory, running 1 worker instead of {workers}")
+        workers = 1
+    return workers
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve_loop_and_http() -> tuple[str, str]:
+    loop, http = server_config.LOOP, server_config.HTTP
+    if loop == "uvloop" and (sys.platform == "win32" or not _installed("uvloop")):
+        logger.warning("uvloop is not available, using the asyncio event loop")
+        loop = "asyncio"
+    if http == "httptools" and not _installed("httptools"):
+        logger.warning("httptools is not available, using the h11 http parser")
+        http = "h11"
+    return loop, http
+
+
+def load_app() -> Any:
+    """Import the application, e.g. main:app"""
+    module_name, _, attribute = server_config.APP.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+def server_options(workers: int) -> dict[str, Any]:
+    """uvicorn options of the configuration"""
+    loop, http = resolve_loop_and_http()
+    logger.info(f"Server: {server_config.HOST}:{server_config.PORT}, workers: {workers}, loop: {loop}, http: {http}")
+    return {
+        "host": server_config.HOST,
+        "port": server_config.PORT,
+        "loop": loop,
+        "http": http,
+        "lifespan": "on",
+        "backlog": server_config.BACKLOG,
+        "limit_concurrency": server_config.LIMIT_CONCURRENCY,
+        "timeout_keep_alive": server_config.TIMEOUT_KEEP_ALIVE,
+        "timeout_graceful_shutdown": server_config.TIMEOUT_GRACEFUL_SHUTDOWN,
+        "access_log": server_config.ACCESS_LOG,
+        "proxy_headers": True,
+        "server_header": False,
+    }
+
+
+def preload() -> Any:
+    """Import the application in this process and freeze its objects out of the garbage collector"""
+    # no collection may run while the application is imported, it would only move objects between generations
+    gc.disable()
+    started = time.perf_counter()
+    app = load_app()
+    logger.info(f"Preloaded application {server_config.APP} in {time.perf_counter() - started:.2f}s")
+    if server_config.GC_FREEZE:
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Frozen {gc.get_freeze_count()} objects out of the garbage collector")
+    gc.enable()
+    return app
+
+
+class WorkerSupervisor:
+    """Forks the workers from the preloaded master, restarts workers which exit and stops them on SIGTERM/SIGINT."""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.socket: Optional[socket.socket] = None
+        self.children: dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # worker process
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            random.seed()
+            try:
+                uvicorn.Server(self.config).run(sockets=[self.socket])
+            finally:
+                os._exit(0)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Started worker process {pid}")
+
+    def _stop(self, signum: int, frame: Any) -> None:
+        if self.stopping:
+            return
+        logger.info(f"Stopping {len(self.children)} worker processes")
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+
+        deadline: Optional[float] = None
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if self.stopping:
+                    deadline = deadline or time.monotonic() + server_config.TIMEOUT_GRACEFUL_SHUTDOWN + 5
+                    if time.monotonic() > deadline:
+                        for child in self.children:
+                            logger.warning(f"Killing worker process {child} after the graceful shutdown timeout")
+                            try:
+                                os.kill(child, signal.SIGKILL)
+                            except ProcessLookupError:
+                                pass
+                time.sleep(0.2)
+                continue
+
+            started = self.children.pop(pid, None)
+            if self.stopping or started is None:
+                continue
+            logger.error(f"Worker process {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if time.monotonic() - started < _RESTART_BACKOFF_SECONDS:
+                time.sleep(_RESTART_BACKOFF_SECONDS)
+            self._spawn()
+        self.socket.close()
+        logger.info("Server stopped")
+
+
+def main() -> None:
+    workers = resolve_workers()
+    if workers > 1 and server_config.MOUNT_UI:
+        logger.warning("The Gradio UI is not mounted in a multi-worker server, run it with python -m app.serve_ui")
+        server_config.MOUNT_UI = False
+        # spawned workers (SERVER_PRELOAD=false) read their configuration again, env variables win over .env
+        os.environ["SERVER_MOUNT_UI"] = "false"
+
+    options = server_options(workers)
+    if workers > 1 and not server_config.PRELOAD:
+        # every worker process imports the application itself
+        uvicorn.run(server_config.APP, workers=workers, **options)
+        return
+
+    config = uvicorn.Config(preload(), **options)
+    if workers == 1:
+        uvicorn.Server(config).run()
+    else:
+        WorkerSupervisor(config, workers).run()
+
+
+if __name__ == "__main__":
+    main()
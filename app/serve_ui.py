@@ -0,0 +1,37 @@
+"""
+Standalone Gradio UI: python -m app.serve_ui
+
+The UI runs as its own process in front of API-only servers (SERVER_MOUNT_UI=false), it calls the API over http
+at BASE_URL with API_KEY. It listens on SERVER_HOST:SERVER_UI_PORT and serves the UI at /ui like the mounted UI.
+"""
+
+import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import RedirectResponse
+from fastapi.staticfiles import StaticFiles
+from loguru import logger
+
+from app.config.server import server_config
+from gradio_chatbot import BASE_URL, app_auth, build_gradio_app
+
+
+def create_ui_app() -> FastAPI:
+    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+    # fonts and avatars of the UI
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+
+    @app.get("/", include_in_schema=False)
+    async def root():
+        return RedirectResponse(url="/ui")
+
+    return gr.mount_gradio_app(app, build_gradio_app(mounted=False), path="/ui", auth=app_auth)
+
+
+def main() -> None:
+    logger.info(f"Starting Gradio UI on {server_config.HOST}:{server_config.UI_PORT}, API: {BASE_URL}")
+    uvicorn.run(create_ui_app(), host=server_config.HOST, port=server_config.UI_PORT, access_log=server_config.ACCESS_LOG, proxy_headers=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import uuid
+from typing import AsyncIterator, List, Optional
+
+from loguru import logger
+from pydantic import ValidationError
+
+from app.config.batch import batch_config
+from app.model.batch_model import BatchItemModel, BatchModel
+from app.repository.batch_repository import UNFINISHED_STATUSES, BatchRepository
+from app.schema.batch_schema import BatchRequestCounts, BatchRequestLine, BatchResponse, BatchResultLine
+from app.schema.chat_schema import ChatCompletionRequest
+from app.service.chat_service import ChatService
+
+BATCH_URL = "/v1/chat/completions"
+
+
+class BatchValidationError(ValueError):
+    """The batch input is rejected, errors holds one message per invalid line"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def to_batch_schema(entity: BatchModel) -> BatchResponse:
+    return BatchResponse(
+        batch_id=entity.batch_id,
+        status=entity.status,
+        request_counts=BatchRequestCounts(total=entity.total, completed=entity.completed, failed=entity.failed),
+        metadata=entity.metadata,
+        created_date=entity.created_date,
+        started_date=entity.started_date,
+        finished_date=entity.finished_date,
+    )
+
+
+class BatchService:
+    """Creates batches from NDJSON input and reads their status and results"""
+
+    MAX_ERRORS = 20
+
+    def __init__(self, batch_repository: Optional[BatchRepository] = None):
+        self.batch_repository = batch_repository or BatchRepository()
+
+    def parse_line(self, batch_id: str, index: int, line: bytes) -> BatchItemModel:
+        request_line = BatchRequestLine.model_validate_json(line)
+        if request_line.method.upper() != "POST" or request_line.url != BATCH_URL:
+            raise ValueError(f"only POST {BATCH_URL} is supported")
+        # batch requests are answered by the batch runner, never streamed or queued as background jobs
+        request = request_line.body.model_dump(exclude={"background", "stream"})
+        return BatchItemModel(batch_id=batch_id, index=index, custom_id=request_line.custom_id or str(index), request=request)
+
+    async def create_batch(self, username: str, lines: AsyncIterator[bytes], metadata: Optional[dict[str, str]] = None) -> BatchResponse:
+        """
+        Validate every line of the NDJSON input and store the batch, the batch runner picks it up.
+        The whole batch is rejected with the line numbers of invalid lines.
+        """
+        logger.debug(f"BEGIN SERVICE: create batch for username: {username}")
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        items: List[BatchItemModel] = []
+        errors: List[str] = []
+        custom_ids = set()
+        line_number = 0
+        try:
+            async for line in lines:
+                line_number += 1
+                if not line.strip():
+                    continue
+                if len(items) >= batch_config.MAX_REQUESTS:
+                    raise BatchValidationError([f"The batch has more than BATCH_MAX_REQUESTS: {batch_config.MAX_REQUESTS} requests"])
+                try:
+                    item = self.parse_line(batch_id, len(items), line)
+                except ValidationError as e:
+                    details = ", ".join(f"{'.'.join(map(str, error['loc'])) or 'line'}: {error['msg']}" for error in e.errors())
+                    errors.append(f"line {line_number}: {details}")
+                    if len(errors) >= self.MAX_ERRORS:
+                        break
+                    continue
+                except ValueError as e:
+                    errors.append(f"line {line_number}: {e}")
+                    if len(errors) >= self.MAX_ERRORS:
+                        break
+                    continue
+                if item.custom_id in custom_ids:
+                    errors.append(f"line {line_number}: duplicate custom_id: {item.custom_id}")
+                    continue
+                custom_ids.add(item.custom_id)
+                items.append(item)
+        except BatchValidationError:
+            raise
+        except ValueError as e:
+            errors.append(f"line {line_number + 1}: {e}")
+        if errors:
+            raise BatchValidationError(errors)
+        if not items:
+            raise BatchValidationError(["The batch has no requests"])
+
+        entity = BatchModel(batch_id=batch_id, username=username, total=len(items), metadata=metadata)
+        entity = await self.batch_repository.create(entity, items)
+        logger.debug(f"END SERVICE: created batch: {batch_id} with {len(items)} requests")
+        return to_batch_schema(entity)
+
+    async def find_by_id(self, batch_id: str, username: str) -> Optional[BatchResponse]:
+        entity = await self.batch_repository.find_by_id(batch_id)
+        if entity is None or entity.username != username:
+            return None
+        return to_batch_schema(entity)
+
+    async def find_by_username(self, username: str) -> List[BatchResponse]:
+        return [to_batch_schema(entity) for entity in await self.batch_repository.find_by_username(username)]
+
+    async def cancel(self, batch_id: str, username: str) -> Optional[BatchResponse]:
+        """Cancel a queued or running batch. Processed requests keep their results, in flight requests are stopped."""
+        entity = await self.batch_repository.find_by_id(batch_id)
+        if entity is None or entity.username != username:
+            return None
+        await self.batch_repository.update_status(batch_id, "cancelled", UNFINISHED_STATUSES)
+        return to_batch_schema(await self.batch_repository.find_by_id(batch_id))
+
+    @staticmethod
+    def to_result_line(item: BatchItemModel) -> BatchResultLine:
+        result = BatchResultLine(id=f"{item.batch_id}-{item.index}", custom_id=item.custom_id)
+        if item.status == "completed":
+            result.response = {"status_code": item.status_code, "body": item.response}
+        else:
+            result.error = {"code": "chat_completion_failed", "status_code": item.status_code, "message": item.error}
+        return result
+
+    async def iter_results(self, batch_id: str) -> AsyncIterator[str]:
+        """NDJSON lines of the processed requests in input order, a running batch returns the results so far"""
+        async for item in self.batch_repository.iter_finished_items(batch_id):
+            yield self.to_result_line(item).model_dump_json(exclude_none=True) + "\n"
+
+
+class BatchRunner:
+    """
+    Background processing of batches in this process.
+
+    Batches are claimed one at a time with a lease which is renewed while the batch runs,
+    its requests are processed with at most BATCH_CONCURRENCY in flight. Every result is persisted
+    when its request finishes, so a batch interrupted by a restart resumes with its pending requests.
+    A request interrupted in flight is processed again (at-least-once).
+    """
+
+    def __init__(self):
+        self.owner = f"batch-{uuid.uuid4().hex[:8]}"
+        self.batch_repository = BatchRepository()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.chat_service = ChatService()
+        self.batch_id: Optional[str] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        logger.info(f"Starting batch runner: {self.owner} with BATCH_CONCURRENCY: {batch_config.CONCURRENCY}")
+        await self.batch_repository.create_indexes()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop processing, the running batch is released and resumed by the next start."""
+        if self._task is None:
+            return
+        logger.info(f"Stopping batch runner: {self.owner}")
+        # read before the cancellation, _run clears it when it exits
+        batch_id = self.batch_id
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if batch_id:
+            await self.batch_repository.release_lease(batch_id, self.owner)
+            self.batch_id = None
+
+    def notify(self) -> None:
+        """Look for batches right away instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                batch = await self.batch_repository.claim_next(self.owner, batch_config.LEASE_SECONDS)
+                if batch is not None:
+                    await self._run(batch)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing batches: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), batch_config.POLL_SECONDS)
+            except TimeoutError:
+                pass
+
+    async def _run(self, batch: BatchModel) -> None:
+        logger.info(f"BEGIN BATCH: {batch.batch_id}, processed: {batch.completed + batch.failed}/{batch.total}")
+        self.batch_id = batch.batch_id
+        process = asyncio.create_task(self._process(batch))
+        heartbeat = asyncio.create_task(self._heartbeat(batch.batch_id, process))
+        try:
+            await asyncio.wait({process})
+            if process.cancelled():
+                # the heartbeat lost the lease, the batch was cancelled or is owned by another worker
+                logger.info(f"Batch {batch.batch_id} stopped, it is cancelled or owned by another worker")
+                return
+            process.result()
+            await self.batch_repository.update_status(batch.batch_id, "completed", ["in_progress"])
+            logger.info(f"END BATCH: {batch.batch_id}")
+        except Exception:
+            # e.g. a database error saving a result, the batch is claimed again at the next poll instead of after the lease expired
+            try:
+                await self.batch_repository.release_lease(batch.batch_id, self.owner)
+            except Exception as e:
+                logger.error(f"Error releasing the lease of batch {batch.batch_id}: {e}")
+            raise
+        finally:
+            heartbeat.cancel()
+            process.cancel()
+            await asyncio.gather(heartbeat, process, return_exceptions=True)
+            self.batch_id = None
+
+    async def _heartbeat(self, batch_id: str, process: asyncio.Task) -> None:
+        """Renew the lease of the batch, stop processing once it is cancelled"""
+        while True:
+            await asyncio.sleep(batch_config.LEASE_SECONDS / 3)
+            if not await self.batch_repository.renew_lease(batch_id, self.owner, batch_config.LEASE_SECONDS):
+                process.cancel()
+                return
+
+    async def _process(self, batch: BatchModel) -> None:
+        semaphore = asyncio.Semaphore(batch_config.CONCURRENCY)
+        page_size = batch_config.CONCURRENCY * 8
+        while True:
+            items = await self.batch_repository.find_pending_items(batch.batch_id, page_size)
+            if not items:
+                return
+            await asyncio.gather(*(self._process_item(batch, item, semaphore) for item in items))
+
+    async def _process_item(self, batch: BatchModel, item: BatchItemModel, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            self.in_flight += 1
+            try:
+                result = await self.chat_service.handle_chat_completion(ChatCompletionRequest(**item.request), batch.username)
+                item.status, item.status_code = "completed", 200
+                item.response = json.loads(result.model_dump_json())
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Batch {batch.batch_id} request {item.index} failed: {e}")
+                item.status, item.status_code, item.error = "failed", 500, str(e)
+                self.failed += 1
+            finally:
+                self.in_flight -= 1
+            await self.batch_repository.save_item_result(item)
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "concurrency": batch_config.CONCURRENCY,
+            "running_batch_id": self.batch_id,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+# Global instance
+batch_runner = BatchRunner()
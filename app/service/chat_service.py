@@ -1,16 +1,44 @@
+import asyncio
 import datetime
-from typing import Any, List
+import re
+import zlib
+from typing import Any, AsyncIterator, List, Optional
 
-from app.agent.chat_agent_scheme import UserChatAgentRequest
+from fastapi import BackgroundTasks
+
+from app.agent.chat_agent_scheme import AssistantChatAgentResponse, UserChatAgentRequest
 from app.repository.chat_repository import ChatRepository
-from app.schema.chat_schema import ChatCompletionRequest, ChatCompletionResponse, ChatMessageResponse, ChatMessageRequest
-from app.mapper.chat_mapper import ChatMapper
+from app.schema.chat_schema import (
+    ChatCompletionRequest,
+    ChatCompletionResponse,
+    ChatMessageListResponse,
+    ChatMessageRequest,
+    DataColumnResponse,
+    MessageDataResponse,
+)
+from app.mapper.chat_mapper import ChatMapper, to_message_schema
+from app.mapper.tabular_mapper import to_plotly_figure, to_rows
+from app.mapper.figure_downsampling import downsample_figure
+from app.service.figure_cache import figure_cache
+from app.config.result import result_config
 from app.mapper.conversation_mapper import ConversationMapper
+from app.mapper.field_selection import CHAT_COMPLETION_FIELDS, CONVERSATION_FIELDS, to_projection
 import uuid
 from loguru import logger
 from app.schema.conversation_schema import ConversationItemResponse, ConversationResponse
 from app.service.chat_validation import ChatValidation
-from app.agent.chat_agent_client import ChatAgentClient
+from app.agent.factory import chat_agent
+from app.model.job_model import CompletionJobModel
+from app.service.completion_job_worker import completion_job_worker
+from app.service.context_builder import ConversationContextBuilder
+from app.agent.token_counter import count_tokens
+from app.config.context import context_config
+from app.config.enrichment import enrichment_config
+from app.config.export import export_config
+from app.service.enrichment_pipeline import enrichment_pipeline
+from app.core.metrics import agent_call_duration, stored_message_size
+from app.core.tracing import tracer
+import time
 
 
 class ChatService:
@@ -19,60 +47,204 @@ class ChatService:
         self.chat_mapper = ChatMapper()
         self.conversation_mapper = ConversationMapper()
         self.chat_validation = ChatValidation()
-        self.chat_agent_client = ChatAgentClient()
+        self.chat_agent = chat_agent
+        self.context_builder = ConversationContextBuilder(self.chat_repository)
 
-    async def find(self, query: dict, page: int, limit: int, sort: dict, project: dict = None) -> List[ChatCompletionResponse]:
+    async def find(
+        self, query: dict, page: int, limit: int, sort: dict, project: dict = None, fields: Optional[List[str]] = None
+    ) -> List[ChatCompletionResponse]:
+        """Find chat completions. fields (see field_selection) selects the response fields and the projection of the query."""
+        if fields is not None:
+            project = to_projection(fields, CHAT_COMPLETION_FIELDS)
         logger.debug(f"BEGIN SERVICE: find for query: {query}, page: {page}, limit: {limit}, sort: {sort}, project: {project}")
         entities = await self.chat_repository.find(query, page, limit, sort, project)
-        return self.chat_mapper.to_schema_list(entities)
-
-    async def find_by_id(self, completion_id: str, project: dict = None) -> ChatCompletionResponse:
-        entity = await self.chat_repository.find_by_id(completion_id, project)
-        return self.chat_mapper.to_schema(entity) if entity else None
-
-    async def find_messages(self, completion_id: str) -> List[ChatMessageResponse]:
-        logger.debug(f"BEGIN SERVICE: find_messages for completion_id: {completion_id}")
-        messages = await self.chat_repository.find_messages(completion_id)
-        logger.debug(f"END SERVICE: find_messages for completion_id: {completion_id}, messages: {len(messages)}")
-        messages_response = [
-            ChatMessageResponse(
-                message_id=message.message_id,
-                role=message.role,
-                content=message.content,
-                created_date=message.created_date,
-                figure=(message.figure),
-            )
-            for message in messages
-        ]
-        return messages_response
+        return self.chat_mapper.to_schema_list(entities, fields=fields)
+
+    async def find_by_id(
+        self,
+        completion_id: str,
+        project: dict = None,
+        limit: Optional[int] = None,
+        include_figures: bool = True,
+        fields: Optional[List[str]] = None,
+    ) -> ChatCompletionResponse:
+        """Find a chat completion, with its last limit messages only when limit is set"""
+        if fields is not None:
+            project = to_projection(fields, CHAT_COMPLETION_FIELDS)
+        if (limit is None and include_figures) or (fields is not None and "choices" not in fields):
+            entity = await self.chat_repository.find_by_id(completion_id, project)
+            return self.chat_mapper.to_schema(entity, fields=fields) if entity else None
+
+        # the messages of the page are loaded on their own
+        if fields is not None:
+            header = to_projection([field for field in fields if field != "choices"], CHAT_COMPLETION_FIELDS)
+        else:
+            header = {"_id": 0, "messages": 0}
+        entity = await self.chat_repository.find_by_id(completion_id, header)
+        if entity is None:
+            return None
+        message_ids = await self.chat_repository.find_message_ids(completion_id) or []
+        start = max(len(message_ids) - limit, 0) if limit is not None else 0
+        entity.messages = await self.chat_repository.find_message_range(completion_id, start, len(message_ids) - start, include_figures)
+        return self.chat_mapper.to_schema(entity, fields=fields)
+
+    @staticmethod
+    def _message_page_range(
+        message_ids: List[str], limit: int, before: Optional[str], after: Optional[str], order: str
+    ) -> tuple[int, int, bool]:
+        """
+        The [start, end) message indexes of a page and whether more messages follow in the paging direction.
+        Without a cursor the page starts at the newest (desc) or the oldest (asc) message.
+        """
+        if before and after:
+            raise ValueError("Only one of before and after can be set")
+        cursor = before or after
+        if cursor:
+            try:
+                index = message_ids.index(cursor)
+            except ValueError:
+                raise ValueError(f"Message not found: {cursor}")
+        total = len(message_ids)
+        if before or (not after and order == "desc"):
+            # towards older messages
+            end = index if before else total
+            start = max(end - limit, 0)
+            return start, end, start > 0
+        start = index + 1 if after else 0
+        end = min(start + limit, total)
+        return start, end, end < total
+
+    async def find_message_page(
+        self,
+        completion_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        order: str = "desc",
+        include_figures: bool = True,
+    ) -> ChatMessageListResponse | None:
+        """
+        Find a page of the messages of a chat completion. before/after are message_id cursors for older/newer messages.
+        Only the messages of the page are loaded, figures are replaced by has_figure when include_figures is false.
+        """
+        logger.debug(
+            f"BEGIN SERVICE: find_message_page for completion_id: {completion_id}, limit: {limit}, before: {before}, after: {after}, order: {order}"
+        )
+        message_ids = await self.chat_repository.find_message_ids(completion_id)
+        if message_ids is None:
+            return None
+        start, end, has_more = self._message_page_range(message_ids, limit, before, after, order)
+        messages = await self.chat_repository.find_message_range(completion_id, start, end - start, include_figures)
+        data = [to_message_schema(message) for message in messages]
+        if order == "desc":
+            data.reverse()
+        logger.debug(f"END SERVICE: find_message_page for completion_id: {completion_id}, messages: {len(data)}, has_more: {has_more}")
+        return ChatMessageListResponse(
+            data=data,
+            first_id=data[0].message_id if data else None,
+            last_id=data[-1].message_id if data else None,
+            has_more=has_more,
+            total=len(message_ids),
+        )
+
+    async def find_message_data(self, completion_id: str, message_id: str, offset: int, limit: int) -> MessageDataResponse | None:
+        """Find a page of rows of the tabular result of a message."""
+        logger.debug(
+            f"BEGIN SERVICE: find_message_data for completion_id: {completion_id}, message_id: {message_id}, offset: {offset}, limit: {limit}"
+        )
+        data = await self.chat_repository.find_message_data(completion_id, message_id)
+        if data is None:
+            return None
+        limit = min(limit, result_config.PAGE_MAX_ROWS)
+        return MessageDataResponse(
+            completion_id=completion_id,
+            message_id=message_id,
+            columns=[DataColumnResponse(name=column.name, dtype=column.dtype) for column in data.columns],
+            row_count=data.row_count,
+            offset=offset,
+            limit=limit,
+            rows=to_rows(data, offset, limit),
+        )
 
     # conversation service
-    async def find_all_conversations(self, username: str) -> ConversationResponse:
-        """Find all conversations for a given username."""
+    async def find_all_conversations(self, username: str, fields: Optional[List[str]] = None) -> ConversationResponse:
+        """Find all conversations for a given username. Only the fields of the conversation items are loaded."""
         query = {"created_by": username}
         sort = {"last_updated_date": -1}  # Sort by last updated date in descending order
+        projection = to_projection(fields, CONVERSATION_FIELDS)
 
-        entities = await self.chat_repository.find(query, page=1, limit=100, sort=sort)
-        result = self.conversation_mapper.to_schema_list(entities)
+        entities = await self.chat_repository.find(query, page=1, limit=100, sort=sort, projection=projection)
+        result = self.conversation_mapper.to_schema_list(entities, fields=fields)
         return ConversationResponse(items=result, total=len(result), limit=100, offset=0)
 
     # conversation service
-    async def find_conversation_by_id(self, completion_id: str) -> ConversationItemResponse | None:
+    async def find_conversation_by_id(self, completion_id: str, fields: Optional[List[str]] = None) -> ConversationItemResponse | None:
         """Find a conversation by its completion ID."""
-        logger.debug(f"BEGIN SERVICE: find_conversation_by_id for completion_id: {completion_id}")
-        projection = {"messages": 0, "_id": 0}
+        logger.debug(f"BEGIN SERVICE: find_conversation_by_id for completion_id: {completion_id}, fields: {fields}")
+        projection = to_projection(fields, CONVERSATION_FIELDS)
         entity = await self.chat_repository.find_by_id(completion_id, projection=projection)
 
         if entity:
-            conversation_item = self.conversation_mapper.to_schema(entity)
+            conversation_item = self.conversation_mapper.to_schema(entity, fields=fields)
             logger.debug(f"END SERVICE: find_conversation_by_id for completion_id: {completion_id}, entity: {conversation_item}")
             return conversation_item
 
         return None
 
-    async def find_plot_by_message(self, completion_id: str, message_id: str) -> dict[str, Any]:
+    async def export_conversations(self, username: str, compress: bool = False) -> AsyncIterator[bytes]:
+        """
+        All conversations of a user as NDJSON, one chat completion with its messages per line, oldest first.
+        Conversations are streamed from a cursor and sent in chunks of EXPORT_CHUNK_BYTES, gzip compressed when compress is true,
+        so memory stays constant regardless of the history size.
+        """
+        logger.debug(f"BEGIN SERVICE: export_conversations for username: {username}, compress: {compress}")
+        # wbits=31 writes a gzip container
+        compressor = zlib.compressobj(export_config.GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        chunk = bytearray()
+        count = 0
+        entities = self.chat_repository.iter_find(
+            {"created_by": username}, sort={"created_date": 1}, projection={"_id": 0}, batch_size=export_config.BATCH_SIZE
+        )
+        async for entity in entities:
+            chunk += entity.model_dump_json(exclude={"id"}, exclude_none=True).encode()
+            chunk += b"\n"
+            count += 1
+            if len(chunk) >= export_config.CHUNK_BYTES:
+                data = compressor.compress(chunk) if compressor else bytes(chunk)
+                chunk.clear()
+                if data:
+                    yield data
+        data = compressor.compress(chunk) + compressor.flush() if compressor else bytes(chunk)
+        if data:
+            yield data
+        logger.debug(f"END SERVICE: export_conversations for username: {username}, conversations: {count}")
+
+    async def _load_or_generate_figure(self, completion_id: str, message_id: str) -> dict[str, Any] | None:
+        """The stored figure of a message, or a figure generated from its tabular result and saved back to the message."""
+        message = await self.chat_repository.find_message(completion_id, message_id)
+        if message is None:
+            return None
+        if message.figure or message.data is None or not result_config.LAZY_FIGURE:
+            return message.figure
+
+        logger.debug(f"Generating figure from tabular result for completion_id: {completion_id}, message_id: {message_id}")
+        figure = await asyncio.to_thread(to_plotly_figure, message.data)
+        if figure:
+            await self.chat_repository.update_message_figure(completion_id, message_id, figure)
+        return figure
+
+    async def find_plot_by_message(self, completion_id: str, message_id: str, max_points: Optional[int] = None) -> dict[str, Any]:
+        """
+        Find the figure of a message. With max_points, large line/scatter and histogram traces are downsampled
+        in the response, the stored figure keeps its full resolution.
+        """
         logger.debug(f"BEGIN SERVICE: find_plot_by_message for completion_id: {completion_id}, message_id: {message_id}")
-        figure = await self.chat_repository.find_plot_by_message(completion_id, message_id)
+        figure = await figure_cache.get_or_create((completion_id, message_id), lambda: self._load_or_generate_figure(completion_id, message_id))
+        max_points = max_points or result_config.PLOT_MAX_POINTS
+        if figure and max_points:
+            figure, reduced = await asyncio.to_thread(downsample_figure, figure, max_points)
+            if reduced:
+                logger.debug(f"Downsampled figure to max_points: {max_points}")
 
         if figure:
             result = figure
@@ -83,9 +255,11 @@ class ChatService:
         logger.debug(f"END SERVICE: find_plot_by_message for completion_id: {completion_id}, message_id: {message_id} with figure")
         return result
 
-    async def _save_chat_completion(self, chat_schema: ChatCompletionRequest, username: str) -> ChatCompletionResponse:
+    async def _save_chat_completion(
+        self, chat_schema: ChatCompletionRequest, username: str, agent_result: Optional[AssistantChatAgentResponse] = None
+    ) -> ChatCompletionResponse:
         """
-        Save a chat completion to the database.
+        Save a chat completion to the database. The figure and tabular result of agent_result are saved with the last message.
         """
         logger.debug("BEGIN SERVICE: Saving Chat Completion")
         try:
@@ -103,6 +277,11 @@ class ChatService:
             last_user_message_model = chat_model.messages[-1]
             last_user_message_model.message_id = str(uuid.uuid4())
             last_user_message_model.created_date = datetime.datetime.now()
+            last_user_message_model.token_count = count_tokens(last_user_message_model.content)
+            stored_message_size.observe(len(last_user_message_model.content.encode()), last_user_message_model.role)
+            if agent_result is not None:
+                last_user_message_model.figure = agent_result.figure
+                last_user_message_model.data = agent_result.data
             logger.trace(f"last_user_message_model: {last_user_message_model}")
 
             logger.trace(f"finding by id. entity: {chat_model.completion_id}")
@@ -116,7 +295,7 @@ class ChatService:
                 chat_model.created_date = datetime.datetime.now()
                 chat_model.last_updated_by = username
                 chat_model.last_updated_date = datetime.datetime.now()
-                # title can generate with LLM from user request message.content
+                # provisional title, the final title is generated after the response by the enrichment pipeline
                 chat_model.title = last_user_message_model.content[:20]
 
                 final_entity = await self.chat_repository.create(chat_model)
@@ -141,12 +320,32 @@ class ChatService:
     async def chat_agent_client_process(self, user_chat_completion: ChatCompletionRequest, username: str):
         logger.debug(f"BEGIN SERVICE: Agentic Chat AI process. username: {username}")
         last_user_message = user_chat_completion.messages[-1].content
-        user_chat_agent_request = UserChatAgentRequest(message=last_user_message)
-        result = self.chat_agent_client.process(user_chat_agent_request)
+        user_chat_agent_request = UserChatAgentRequest(
+            message=last_user_message, model=user_chat_completion.model, use_cache=user_chat_completion.use_cache
+        )
+        if context_config.ENABLED and user_chat_completion.completion_id:
+            context = await self.context_builder.build(user_chat_completion.completion_id)
+            user_chat_agent_request.history = context.history
+            user_chat_agent_request.summary = context.summary
+        agent_name, started, outcome = getattr(self.chat_agent, "agent_name", type(self.chat_agent).__name__), time.perf_counter(), "error"
+        try:
+            with tracer.start_span("agent.process", agent=agent_name, history_messages=len(user_chat_agent_request.history)):
+                result = await self.chat_agent.process(user_chat_agent_request)
+            outcome = "ok"
+        finally:
+            agent_call_duration.observe(time.perf_counter() - started, agent_name, outcome)
         logger.debug("END SERVICE: Agentic Chat AI process")
         return result
 
-    async def handle_chat_completion(self, user_chat_completion: ChatCompletionRequest, username: str) -> ChatCompletionResponse:
+    async def handle_chat_completion(
+        self, user_chat_completion: ChatCompletionRequest, username: str, background_tasks: Optional[BackgroundTasks] = None
+    ) -> ChatCompletionResponse:
+        with tracer.start_span("chat_service.handle_chat_completion", username=username, background=bool(user_chat_completion.background)):
+            return await self._handle_chat_completion(user_chat_completion, username, background_tasks)
+
+    async def _handle_chat_completion(
+        self, user_chat_completion: ChatCompletionRequest, username: str, background_tasks: Optional[BackgroundTasks] = None
+    ) -> ChatCompletionResponse:
         last_user_message = user_chat_completion
         logger.debug(f"BEGIN SERVICE: last_user_message: {last_user_message}, username: {username}")
 
@@ -158,6 +357,92 @@ class ChatService:
         repo_user_message = await self._save_chat_completion(user_chat_completion, username)
         logger.info(f"Saved user message to database with completion_id: {repo_user_message.completion_id}")
 
+        # the assistant message continues the same chat completion, a new chat gets its completion_id with the user message
+        user_chat_completion.completion_id = repo_user_message.completion_id
+
+        if user_chat_completion.background:
+            job = CompletionJobModel(
+                job_id=str(uuid.uuid4()),
+                completion_id=repo_user_message.completion_id,
+                username=username,
+                request=user_chat_completion.model_dump(exclude={"background"}),
+            )
+            await completion_job_worker.submit(job)
+            logger.info(f"Submitted background completion job: {job.job_id}")
+            logger.debug("END SERVICE")
+            return repo_user_message
+
+        result = await self._complete_chat_completion(user_chat_completion, username)
+        # enrichment is queued after the response is sent when called from the api
+        if background_tasks is not None:
+            background_tasks.add_task(self.enrich_chat_completion, result.completion_id)
+        else:
+            await self.enrich_chat_completion(result.completion_id)
+        logger.debug("END SERVICE")
+        return result
+
+    async def process_completion_job(self, job: CompletionJobModel) -> None:
+        """Generate and save the assistant message of a background completion job."""
+        await self._complete_chat_completion(ChatCompletionRequest(**job.request), job.username)
+        await self.enrich_chat_completion(job.completion_id)
+
+    # region enrichment ######################################################################
+    async def enrich_chat_completion(self, completion_id: str) -> None:
+        """
+        Queue the non-critical work of a completed turn: title and snippet generation.
+        A coroutine, so BackgroundTasks runs it on the event loop: the pipeline queue is not thread-safe.
+        """
+        if not enrichment_config.ENABLED:
+            return
+        enrichment_pipeline.submit("title", self.generate_title, completion_id)
+        enrichment_pipeline.submit("snippet", self.generate_snippet, completion_id)
+
+    @staticmethod
+    def _shorten(text: str, max_characters: int) -> str:
+        """Collapse whitespace and cut at a word boundary"""
+        text = re.sub(r"\s+", " ", text).strip()
+        if len(text) <= max_characters:
+            return text
+        cut = text[:max_characters].rsplit(" ", 1)[0] or text[:max_characters]
+        return cut.rstrip(" ,.;:") + "..."
+
+    async def generate_title(self, completion_id: str) -> None:
+        """Generate the title of a chat completion from its first question, once."""
+        projection = {"_id": 0, "completion_id": 1, "model": 1, "title_generated": 1, "messages": {"$slice": 1}}
+        entity = await self.chat_repository.find_by_id(completion_id, projection)
+        if not entity or entity.title_generated or not entity.messages:
+            return
+
+        question = entity.messages[0].content
+        if enrichment_config.TITLE_MODE == "agent":
+            prompt = (
+                f"Write a short title, at most {enrichment_config.TITLE_MAX_CHARACTERS} characters, for a conversation starting with: {question}"
+            )
+            agent_result = await self.chat_agent.process(UserChatAgentRequest(message=prompt, model=entity.model))
+            title = agent_result.message.strip().strip('"')
+        else:
+            # first sentence of the question
+            title = re.split(r"(?<=[.?!])\s", question.strip(), maxsplit=1)[0]
+        title = self._shorten(title, enrichment_config.TITLE_MAX_CHARACTERS)
+        if title and await self.chat_repository.update_title(completion_id, title):
+            logger.debug(f"Generated title for completion_id: {completion_id}, title: {title}")
+
+    async def generate_snippet(self, completion_id: str) -> None:
+        """Set the snippet of a chat completion from its last message."""
+        projection = {"_id": 0, "completion_id": 1, "messages": {"$slice": -1}}
+        entity = await self.chat_repository.find_by_id(completion_id, projection)
+        if not entity or not entity.messages:
+            return
+        await self.chat_repository.update_snippet(
+            completion_id, self._shorten(entity.messages[-1].content, enrichment_config.SNIPPET_MAX_CHARACTERS)
+        )
+
+    # endregion enrichment ###################################################################
+
+    async def _complete_chat_completion(self, user_chat_completion: ChatCompletionRequest, username: str) -> ChatCompletionResponse:
+        """
+        Run the agent for the last user message and save the assistant message to the database.
+        """
         # region agentic-ai process start #########################################################
         try:
             logger.info("Agentic Chat AI process started")
@@ -175,10 +460,7 @@ class ChatService:
         self.chat_validation.validate_response(agent_result)
 
         # save assistant message to database
-        repo_assistant_message = await self._save_chat_completion(assistant_chat_completion, username)
+        repo_assistant_message = await self._save_chat_completion(assistant_chat_completion, username, agent_result)
 
         # generate api response with user, agent, db etc... TBD
-        result = repo_assistant_message
-
-        logger.debug("END SERVICE")
-        return result
+        return repo_assistant_message
@@ -0,0 +1,166 @@
+import asyncio
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.config.job import job_config
+from app.model.job_model import CompletionJobModel
+from app.repository.chat_repository import ChatRepository
+from app.repository.job_repository import JobRepository
+
+JobHandler = Callable[[CompletionJobModel], Awaitable[None]]
+
+FINAL_STATUSES = {"completed", "failed"}
+
+
+class CompletionJobWorker:
+    """
+    In-process worker pool for background chat completion jobs.
+
+    Jobs are durable records in the database, the in-memory queue only carries job ids.
+    A worker atomically claims a job with a lease before processing it, so jobs left by a restart
+    (or submitted by another process) are picked up again by the database poller once claimable.
+    Status changes are published to subscribers of the conversation.
+    """
+
+    def __init__(self):
+        self.worker_id = f"worker-{uuid.uuid4().hex[:8]}"
+        self.job_repository = JobRepository()
+        self.chat_repository = ChatRepository()
+        self._queue: Optional[asyncio.Queue[str]] = None
+        self._tasks: list[asyncio.Task] = []
+        self._handler: Optional[JobHandler] = None
+        self._subscribers: dict[str, set[asyncio.Queue[str]]] = {}
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self, handler: JobHandler) -> None:
+        """Start the workers and the database poller. handler processes one claimed job."""
+        logger.info(f"Starting completion job worker: {self.worker_id} with JOB_WORKERS: {job_config.WORKERS}")
+        self._handler = handler
+        self._queue = asyncio.Queue(maxsize=job_config.QUEUE_SIZE)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(job_config.WORKERS)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self) -> None:
+        """Stop the workers. Jobs in progress keep their lease and are claimed again after a restart."""
+        logger.info(f"Stopping completion job worker: {self.worker_id}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job: CompletionJobModel) -> CompletionJobModel:
+        """Persist a new job and enqueue it."""
+        job = await self.job_repository.create(job)
+        await self.chat_repository.update_async_status(job.completion_id, "queued")
+        self._publish(job.completion_id, "queued")
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(job.job_id)
+            except asyncio.QueueFull:
+                logger.warning(f"Completion job queue is full, job {job.job_id} will be picked up by the poller")
+        return job
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                for job in await self.job_repository.fail_exhausted(job_config.MAX_ATTEMPTS):
+                    logger.error(f"Completion job {job.job_id} failed after {job.attempts} attempts")
+                    await self._set_status(job.completion_id, "failed")
+                free = self._queue.maxsize - self._queue.qsize()
+                if free > 0:
+                    for job_id in await self.job_repository.find_claimable_ids(job_config.MAX_ATTEMPTS, free):
+                        self._queue.put_nowait(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling completion jobs: {e}")
+            await asyncio.sleep(job_config.POLL_SECONDS)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error running completion job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.job_repository.claim(job_id, self.worker_id, job_config.LEASE_SECONDS, job_config.MAX_ATTEMPTS)
+        if job is None:
+            logger.debug(f"Completion job {job_id} is not claimable, skipping")
+            return
+
+        logger.info(f"BEGIN JOB: {job.job_id} for completion_id: {job.completion_id}, attempt: {job.attempts}")
+        await self._set_status(job.completion_id, "in_progress")
+        try:
+            await self._handler(job)
+        except Exception as e:
+            logger.error(f"Completion job {job.job_id} attempt {job.attempts} failed: {e}")
+            if job.attempts >= job_config.MAX_ATTEMPTS:
+                self.failed += 1
+                await self.job_repository.update_status(job.job_id, "failed", error=str(e))
+                await self._set_status(job.completion_id, "failed")
+            else:
+                await self.job_repository.update_status(job.job_id, "queued", error=str(e))
+                await self._set_status(job.completion_id, "queued")
+            return
+
+        self.completed += 1
+        await self.job_repository.update_status(job.job_id, "completed")
+        await self._set_status(job.completion_id, "completed")
+        logger.info(f"END JOB: {job.job_id}")
+
+    async def _set_status(self, completion_id: str, status: str) -> None:
+        await self.chat_repository.update_async_status(completion_id, status)
+        self._publish(completion_id, status)
+
+    def _publish(self, completion_id: str, status: str) -> None:
+        for queue in self._subscribers.get(completion_id, ()):
+            queue.put_nowait(status)
+
+    async def subscribe(self, completion_id: str) -> AsyncIterator[str]:
+        """
+        Yield the async_status of a conversation on every change until it is completed or failed.
+        The database is re-read every JOB_POLL_SECONDS, so jobs processed by other processes are seen too.
+        """
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        self._subscribers.setdefault(completion_id, set()).add(queue)
+        try:
+            status = await self.chat_repository.find_async_status(completion_id)
+            last = None
+            while True:
+                if status != last:
+                    yield status
+                    last = status
+                if status is None or status in FINAL_STATUSES:
+                    return
+                try:
+                    status = await asyncio.wait_for(queue.get(), job_config.POLL_SECONDS)
+                except TimeoutError:
+                    status = await self.chat_repository.find_async_status(completion_id)
+        finally:
+            subscribers = self._subscribers.get(completion_id)
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[completion_id]
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "workers": job_config.WORKERS,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+
+# Global instance
+completion_job_worker = CompletionJobWorker()
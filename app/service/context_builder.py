@@ -0,0 +1,122 @@
+import re
+from typing import List, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.agent.chat_agent_scheme import AgentContextMessage
+from app.agent.token_counter import count_tokens
+from app.config.context import context_config
+from app.model.chat_model import ChatMessageModel
+from app.repository.chat_repository import ChatRepository
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ConversationContext(BaseModel):
+    """The context sent to the agent with the last user message"""
+
+    history: List[AgentContextMessage] = []
+    summary: Optional[str] = None
+    token_count: int = 0
+
+
+class ConversationContextBuilder:
+    """
+    Assembles the agent context of a conversation within a token budget.
+
+    - the most recent turns which fit CONTEXT_MAX_TOKENS are sent as they are
+    - turns which fall out of the budget or out of the CONTEXT_MAX_MESSAGES window are folded once into a rolling
+      summary stored with the conversation
+    - token counts are stored with the messages when they are saved, so a turn never re-tokenizes the history
+
+    The summary is extractive (one shortened line per message), an LLM summarizer can replace `summarize_messages`.
+    """
+
+    SUMMARY_LINE_MAX_CHARACTERS = 200
+
+    def __init__(self, chat_repository: Optional[ChatRepository] = None):
+        self.chat_repository = chat_repository or ChatRepository()
+
+    @staticmethod
+    def message_tokens(message: ChatMessageModel) -> int:
+        # messages saved before token counts were stored are counted on the fly
+        return message.token_count if message.token_count is not None else count_tokens(message.content)
+
+    def summarize_messages(self, messages: List[ChatMessageModel]) -> List[str]:
+        """One summary line per message"""
+        lines = []
+        for message in messages:
+            content = _WHITESPACE.sub(" ", message.content).strip()
+            if len(content) > self.SUMMARY_LINE_MAX_CHARACTERS:
+                content = content[: self.SUMMARY_LINE_MAX_CHARACTERS].rstrip() + "..."
+            lines.append(f"{message.role}: {content}")
+        return lines
+
+    def fold_summary(self, summary: Optional[str], summary_tokens: int, messages: List[ChatMessageModel]) -> tuple[str, int]:
+        """Append the messages to the summary, the oldest lines are dropped to keep it within CONTEXT_SUMMARY_MAX_TOKENS"""
+        lines = summary.split("\n") if summary else []
+        new_lines = self.summarize_messages(messages)
+        lines.extend(new_lines)
+        summary_tokens += sum(count_tokens(line) for line in new_lines)
+        while lines and summary_tokens > context_config.SUMMARY_MAX_TOKENS:
+            summary_tokens -= count_tokens(lines.pop(0))
+        return "\n".join(lines), max(summary_tokens, 0)
+
+    async def _messages_before_window(self, completion_id: str, summary_until: Optional[str], window_first_id: str) -> List[ChatMessageModel]:
+        """
+        Messages which are neither in the loaded window nor in the summary yet, between summary_until and the window.
+        Only the newest of them can survive in the summary, at most CONTEXT_SUMMARY_MAX_TOKENS messages are loaded.
+        """
+        message_ids = await self.chat_repository.find_message_ids(completion_id) or []
+        window_start = next((i for i in range(len(message_ids) - 1, -1, -1) if message_ids[i] == window_first_id), 0)
+        start = 0
+        if summary_until:
+            start = next((i + 1 for i in range(window_start - 1, -1, -1) if message_ids[i] == summary_until), 0)
+        start = max(start, window_start - context_config.SUMMARY_MAX_TOKENS)
+        return await self.chat_repository.find_message_range(completion_id, start, window_start - start, include_figures=False)
+
+    async def build(self, completion_id: str) -> ConversationContext:
+        """
+        Build the context for the last message of a conversation, the message itself is not part of the history.
+        """
+        logger.debug(f"BEGIN SERVICE: build context for completion_id: {completion_id}")
+        entity = await self.chat_repository.find_context(completion_id, context_config.MAX_MESSAGES)
+        if not entity or not entity.messages:
+            return ConversationContext()
+
+        messages = entity.messages
+        budget = context_config.MAX_TOKENS - context_config.SUMMARY_MAX_TOKENS - self.message_tokens(messages[-1])
+
+        # messages already folded into the summary never come back into the history
+        summarized = -1
+        if entity.context_summary_until:
+            summarized = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].message_id == entity.context_summary_until), -1)
+
+        # walk back from the newest message while the budget allows, O(window)
+        start = len(messages) - 1
+        history_tokens = 0
+        while start - 1 > summarized:
+            tokens = self.message_tokens(messages[start - 1])
+            if history_tokens + tokens > budget:
+                break
+            history_tokens += tokens
+            start -= 1
+
+        summary, summary_tokens = entity.context_summary, entity.context_summary_token_count
+        folded = messages[summarized + 1 : start]
+        if summarized < 0 and len(messages) >= context_config.MAX_MESSAGES:
+            # older messages left the window without being folded, e.g. short turns which all fit the budget
+            folded = await self._messages_before_window(completion_id, entity.context_summary_until, messages[0].message_id) + folded
+        if folded:
+            summary, summary_tokens = self.fold_summary(summary, summary_tokens, folded)
+            await self.chat_repository.update_context_summary(completion_id, summary, summary_tokens, folded[-1].message_id)
+            logger.debug(f"Folded {len(folded)} messages into the context summary of completion_id: {completion_id}")
+
+        context = ConversationContext(
+            history=[AgentContextMessage(role=message.role, content=message.content) for message in messages[start:-1]],
+            summary=summary or None,
+            token_count=summary_tokens + history_tokens + self.message_tokens(messages[-1]),
+        )
+        logger.debug(f"END SERVICE: build context. history: {len(context.history)} messages, tokens: {context.token_count}")
+        return context
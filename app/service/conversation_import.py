@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+import time
+import uuid
+from typing import AsyncIterator, List, Optional
+
+from loguru import logger
+from pydantic import ValidationError
+
+from app.config.conversation_import import import_config
+from app.model.chat_model import ChatCompletion
+from app.repository.chat_repository import ChatRepository
+from app.schema.conversation_schema import ConversationImportError, ConversationImportResponse
+
+
+class ConversationImporter:
+    """
+    Bulk import of conversations from NDJSON, one chat completion with its messages per line (the export format).
+
+    - records are validated one by one while the body streams in, an invalid record is reported and skipped
+    - valid records are written with unordered bulk upserts of IMPORT_BATCH_SIZE by completion_id,
+      the next batch is validated while the previous one is written
+    - records are imported for the calling user, a completion_id owned by another user is rejected
+    """
+
+    def __init__(self, chat_repository: Optional[ChatRepository] = None):
+        self.chat_repository = chat_repository or ChatRepository()
+
+    @staticmethod
+    def parse_record(line: bytes, username: str, now: datetime.datetime) -> ChatCompletion:
+        entity = ChatCompletion.model_validate_json(line)
+        entity.completion_id = entity.completion_id or str(uuid.uuid4())
+        entity.created_by = username
+        entity.created_date = entity.created_date or now
+        for message in entity.messages or []:
+            message.message_id = message.message_id or str(uuid.uuid4())
+            message.created_date = message.created_date or entity.created_date
+        last_message_date = entity.messages[-1].created_date if entity.messages else None
+        entity.last_updated_by = username
+        entity.last_updated_date = entity.last_updated_date or last_message_date or entity.created_date
+        # titles of other systems are kept as they are
+        entity.title_generated = entity.title_generated or bool(entity.title)
+        # jobs and context summaries of the source system do not exist here
+        entity.async_status = None
+        entity.context_summary, entity.context_summary_token_count, entity.context_summary_until = None, 0, None
+        return entity
+
+    def _fail(self, report: ConversationImportResponse, line: int, error: str, completion_id: Optional[str] = None) -> None:
+        report.failed += 1
+        if len(report.errors) < import_config.MAX_REPORTED_ERRORS:
+            report.errors.append(ConversationImportError(line=line, completion_id=completion_id, error=error))
+
+    async def _write(self, username: str, batch: List[tuple[int, ChatCompletion]], report: ConversationImportResponse) -> None:
+        owners = await self.chat_repository.find_owners([entity.completion_id for _, entity in batch])
+        writable = []
+        for line, entity in batch:
+            owner = owners.get(entity.completion_id, username)
+            if owner != username:
+                self._fail(report, line, "completion_id belongs to another user", entity.completion_id)
+            else:
+                writable.append((line, entity))
+        if not writable:
+            return
+
+        inserted, replaced, errors = await self.chat_repository.bulk_upsert([entity for _, entity in writable])
+        report.inserted += inserted
+        report.replaced += replaced
+        for index, (line, entity) in enumerate(writable):
+            if index in errors:
+                self._fail(report, line, errors[index], entity.completion_id)
+            else:
+                report.messages += len(entity.messages or [])
+
+    async def import_conversations(self, username: str, lines: AsyncIterator[bytes]) -> ConversationImportResponse:
+        """Import the NDJSON records of lines for username, errors of single records never abort the import."""
+        logger.debug(f"BEGIN SERVICE: import_conversations for username: {username}")
+        started = time.perf_counter()
+        now = datetime.datetime.now()
+        report = ConversationImportResponse(
+            received=0, inserted=0, replaced=0, failed=0, messages=0, errors=[], elapsed_seconds=0, records_per_second=0, messages_per_second=0
+        )
+        batch: List[tuple[int, ChatCompletion]] = []
+        writing: Optional[asyncio.Task] = None
+        line_number = 0
+        try:
+            async for line in lines:
+                line_number += 1
+                if not line.strip():
+                    continue
+                report.received += 1
+                try:
+                    batch.append((line_number, self.parse_record(line, username, now)))
+                except ValidationError as e:
+                    details = ", ".join(f"{'.'.join(map(str, error['loc'])) or 'record'}: {error['msg']}" for error in e.errors())
+                    self._fail(report, line_number, details)
+                    continue
+                if len(batch) >= import_config.BATCH_SIZE:
+                    if writing:
+                        await writing
+                    writing = asyncio.create_task(self._write(username, batch, report))
+                    batch = []
+        except ValueError as e:
+            # the body can not be split into records anymore, the records read so far are imported
+            report.received += 1
+            self._fail(report, line_number + 1, f"{e}, import stopped")
+        finally:
+            if writing:
+                await writing
+        if batch:
+            await self._write(username, batch, report)
+
+        report.elapsed_seconds = round(time.perf_counter() - started, 3)
+        elapsed = max(report.elapsed_seconds, 1e-3)
+        report.records_per_second = round((report.inserted + report.replaced) / elapsed, 1)
+        report.messages_per_second = round(report.messages / elapsed, 1)
+        logger.info(
+            f"Imported conversations for username: {username}. inserted: {report.inserted}, replaced: {report.replaced}, "
+            f"failed: {report.failed}, messages: {report.messages}, elapsed: {report.elapsed_seconds}s, records/s: {report.records_per_second}"
+        )
+        logger.debug("END SERVICE: import_conversations")
+        return report
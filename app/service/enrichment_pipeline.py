@@ -0,0 +1,154 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.core.latency_histogram import LatencyHistogram
+from app.config.enrichment import enrichment_config
+
+EnrichmentFunction = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class EnrichmentTask:
+    name: str
+    func: EnrichmentFunction
+    args: tuple
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class EnrichmentPipeline:
+    """
+    Bounded in-process queue for non-critical work done after a chat response is sent, e.g. title and snippet generation.
+
+    - submit never blocks: when the queue is full the task is dropped and counted
+    - failed tasks are retried with exponential backoff up to ENRICHMENT_MAX_ATTEMPTS
+    - stop drains the queue for at most ENRICHMENT_DRAIN_TIMEOUT_SECONDS
+    - queue lag (enqueue to start) and run time are measured per pipeline
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue[EnrichmentTask]] = None
+        self._tasks: list[asyncio.Task] = []
+        self._retries: dict[asyncio.TimerHandle, EnrichmentTask] = {}
+        self._closing = False
+        self.queue_lag = LatencyHistogram("enrichment_queue_lag_seconds", "Enrichment task wait from enqueue to start")
+        self.run_time = LatencyHistogram("enrichment_run_seconds", "Enrichment task run time")
+        self.submitted = 0
+        self.dropped = 0
+        self.counts: dict[str, dict[str, int]] = {}
+
+    def _count(self, name: str, counter: str) -> None:
+        counts = self.counts.setdefault(name, {"completed": 0, "failed": 0, "retries": 0})
+        counts[counter] += 1
+
+    async def start(self) -> None:
+        logger.info(f"Starting enrichment pipeline with ENRICHMENT_WORKERS: {enrichment_config.WORKERS}")
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=enrichment_config.QUEUE_SIZE)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(enrichment_config.WORKERS)]
+
+    async def stop(self) -> None:
+        """Stop accepting tasks, drain the queue within the drain timeout and stop the workers."""
+        if self._queue is None:
+            return
+        logger.info(f"Draining enrichment pipeline, queued tasks: {self._queue.qsize()}")
+        self._closing = True
+        # pending retries run right away instead of waiting for their backoff
+        for handle, task in list(self._retries.items()):
+            handle.cancel()
+            self._put(task)
+        self._retries.clear()
+        try:
+            await asyncio.wait_for(self._queue.join(), enrichment_config.DRAIN_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning(f"Enrichment pipeline drain timed out, dropping {self._queue.qsize()} tasks")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, name: str, func: EnrichmentFunction, *args) -> bool:
+        """Queue func(*args), returns False when the task is dropped."""
+        if self._queue is None or self._closing:
+            logger.warning(f"Enrichment pipeline is not running, dropping task: {name}")
+            self.dropped += 1
+            return False
+        if not self._put(EnrichmentTask(name, func, args)):
+            return False
+        self.submitted += 1
+        return True
+
+    def _put(self, task: EnrichmentTask) -> bool:
+        try:
+            self._queue.put_nowait(task)
+        except asyncio.QueueFull:
+            logger.warning(f"Enrichment queue is full, dropping task: {task.name}")
+            self.dropped += 1
+            return False
+        return True
+
+    def _retry(self, task: EnrichmentTask) -> None:
+        self._count(task.name, "retries")
+        delay = enrichment_config.RETRY_BACKOFF_SECONDS * 2 ** (task.attempts - 1)
+        task.enqueued_at = time.monotonic() + delay
+        if self._closing:
+            self._put(task)
+            return
+
+        def put() -> None:
+            self._retries.pop(handle, None)
+            if self._queue is not None:
+                self._put(task)
+
+        handle = asyncio.get_running_loop().call_later(delay, put)
+        self._retries[handle] = task
+
+    async def _work(self) -> None:
+        while True:
+            task = await self._queue.get()
+            try:
+                await self._run(task)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, task: EnrichmentTask) -> None:
+        started = time.monotonic()
+        self.queue_lag.observe(max(started - task.enqueued_at, 0.0))
+        task.attempts += 1
+        try:
+            await task.func(*task.args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if task.attempts < enrichment_config.MAX_ATTEMPTS:
+                logger.warning(f"Enrichment task {task.name} attempt {task.attempts} failed, retrying: {e}")
+                self._retry(task)
+            else:
+                logger.error(f"Enrichment task {task.name} failed after {task.attempts} attempts: {e}")
+                self._count(task.name, "failed")
+            return
+        finally:
+            self.run_time.observe(time.monotonic() - started)
+        self._count(task.name, "completed")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": enrichment_config.ENABLED,
+            "workers": enrichment_config.WORKERS,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending_retries": len(self._retries),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "tasks": self.counts,
+            "queue_lag_seconds": self.queue_lag.as_dict(),
+            "run_time_seconds": self.run_time.as_dict(),
+        }
+
+
+# Global instance
+enrichment_pipeline = EnrichmentPipeline()
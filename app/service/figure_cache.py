@@ -0,0 +1,49 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config.result import result_config
+
+Figure = dict[str, Any]
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of rendered plot figures by (completion_id, message_id).
+    Concurrent misses of the same key share one figure lookup/generation.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], Figure] = OrderedDict()
+        self._in_flight: dict[tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_create(self, key: tuple[str, str], factory: Callable[[], Awaitable[Optional[Figure]]]) -> Optional[Figure]:
+        figure = self._entries.get(key)
+        if figure is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return figure
+
+        self.misses += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        figure = await asyncio.shield(task)
+        if figure is not None:
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+# Global instance
+figure_cache = FigureCache(result_config.FIGURE_CACHE_MAX_ENTRIES)
@@ -0,0 +1,166 @@
+import gc
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from typing import Any, Literal, Optional
+
+from loguru import logger
+
+from app.agent.chat_agent_protocol import AsyncChatAgent
+from app.agent.factory import chat_agent
+from app.config.db import db_config
+from app.config.memory import memory_config
+from app.core.request_profiler import short_filename
+from app.db.client import DatabaseClient
+from app.db.factory import db_client
+
+# allocations of tracemalloc itself and of the import machinery are left out of the snapshots
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def process_memory() -> dict[str, Optional[int]]:
+    """Resident set size of this process and its peak, from /proc (Linux) or getrusage"""
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return {"rss_bytes": int(status["VmRSS"].split()[0]) * 1024, "peak_rss_bytes": int(status["VmHWM"].split()[0]) * 1024}
+    except (OSError, KeyError, ValueError):
+        import resource
+
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_bytes": None, "peak_rss_bytes": peak if sys.platform == "darwin" else peak * 1024}
+
+
+class MemoryProfiler:
+    """
+    Memory report and tracemalloc snapshots of this worker, to find what keeps growing in a long-running worker.
+
+    - report: RSS, gc generations, live objects of MEMORY_TRACKED_TYPES, agent response cache entries,
+      documents of the embedded database (held in this process) and the tracemalloc totals
+    - snapshots: tracemalloc is started with the first snapshot, the difference of two snapshots is grouped by file or line
+    """
+
+    def __init__(self, database: DatabaseClient, agent: AsyncChatAgent):
+        self.database = database
+        self.agent = agent
+        self._snapshots: OrderedDict[str, tuple[float, tracemalloc.Snapshot]] = OrderedDict()
+
+    @staticmethod
+    def start_tracing() -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(memory_config.TRACEMALLOC_FRAMES)
+            logger.info(f"tracemalloc started with {memory_config.TRACEMALLOC_FRAMES} frames")
+
+    @staticmethod
+    def object_counts(collect: bool) -> dict[str, Any]:
+        """Live objects of the tracked types, walks all the gc tracked objects"""
+        if collect:
+            gc.collect()
+        tracked = set(memory_config.TRACKED_TYPES)
+        counts = dict.fromkeys(memory_config.TRACKED_TYPES, 0)
+        objects = gc.get_objects()
+        for obj in objects:
+            name = type(obj).__name__
+            if name in tracked:
+                counts[name] += 1
+        return {"gc_tracked": len(objects), "types": counts}
+
+    async def _database_documents(self) -> Optional[dict[str, int]]:
+        """Documents per collection of the embedded database, they are held in the memory of this worker"""
+        if db_config.DATABASE_TYPE != "embedded":
+            return None
+        db = self.database.db
+        return {name: await db[name].estimated_document_count() for name in sorted(await db.list_collection_names())}
+
+    async def report(self, collect: bool = False) -> dict[str, Any]:
+        started = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        try:
+            cache_entries = self.agent.stats().get("cache", {}).get("memory_entries")
+        except Exception as e:
+            logger.debug(f"Agent stats failed: {e}")
+            cache_entries = None
+        result = {
+            "process": process_memory(),
+            "gc": {"counts": gc.get_count(), "thresholds": gc.get_threshold(), "frozen": gc.get_freeze_count()},
+            "objects": self.object_counts(collect),
+            "agent_cache_entries": cache_entries,
+            "embedded_database_documents": await self._database_documents(),
+            "tracemalloc": {
+                "tracing": tracemalloc.is_tracing(),
+                "traced_bytes": current,
+                "traced_peak_bytes": peak,
+                "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            },
+            "snapshots": [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, (taken_at, _) in self._snapshots.items()],
+        }
+        result["report_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def take_snapshot(self) -> dict[str, Any]:
+        """A tracemalloc snapshot, starting tracemalloc when it is not tracing yet (the first snapshot is the baseline)"""
+        self.start_tracing()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        snapshot_id = uuid.uuid4().hex[:12]
+        self._snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(self._snapshots) > memory_config.MAX_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+        traced = sum(stat.size for stat in snapshot.statistics("filename"))
+        logger.info(f"tracemalloc snapshot {snapshot_id} taken, {traced} bytes traced")
+        return {"id": snapshot_id, "traced_bytes": traced, "snapshots": list(self._snapshots)}
+
+    def diff(self, snapshot_id: str, against: Optional[str], group_by: Literal["filename", "lineno"], limit: int) -> Optional[dict[str, Any]]:
+        """
+        Allocation changes from the against snapshot (by default the one taken before) to snapshot_id,
+        largest change first. None when a snapshot is not found.
+        """
+        ids = list(self._snapshots)
+        if snapshot_id not in self._snapshots:
+            return None
+        if against is None:
+            position = ids.index(snapshot_id)
+            if position == 0:
+                return None
+            against = ids[position - 1]
+        if against not in self._snapshots:
+            return None
+        (taken_at, snapshot), (old_taken_at, old_snapshot) = self._snapshots[snapshot_id], self._snapshots[against]
+        stats = snapshot.compare_to(old_snapshot, group_by)
+        return {
+            "snapshot": snapshot_id,
+            "against": against,
+            "seconds_between": round(taken_at - old_taken_at, 3),
+            "group_by": group_by,
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "count_diff": sum(stat.count_diff for stat in stats),
+            "top": [
+                {
+                    "location": short_filename(stat.traceback[0].filename) + (f":{stat.traceback[0].lineno}" if group_by == "lineno" else ""),
+                    "size_diff_bytes": stat.size_diff,
+                    "size_bytes": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def clear(self) -> dict[str, Any]:
+        """Drop the snapshots and stop tracemalloc, allocations are not slowed down anymore"""
+        self._snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        return {"tracing": False, "snapshots": []}
+
+
+# Global instance
+memory_profiler = MemoryProfiler(db_client, chat_agent)
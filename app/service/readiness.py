@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Any, Optional
+
+from loguru import logger
+
+from app.agent.chat_agent_protocol import AsyncChatAgent
+from app.agent.factory import chat_agent
+from app.config.ready import ready_config
+from app.db.client import DatabaseClient
+from app.db.factory import db_client
+
+
+class ReadinessProbe:
+    """
+    Deep readiness check of this worker: database ping, connection pool, agent backend and event loop lag.
+
+    - the database and the agent are probed concurrently, each with its own timeout
+    - the result is cached for READY_CACHE_SECONDS, concurrent checks share one running probe
+    - ready is false when the database is unreachable, the agent is unreachable (READY_AGENT_REQUIRED)
+      or the event loop lag is above READY_MAX_LOOP_LAG_MS
+    """
+
+    def __init__(self, database: DatabaseClient, agent: AsyncChatAgent):
+        self.database = database
+        self.agent = agent
+        self._result: Optional[dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._probe: Optional[asyncio.Task] = None
+        self.probes = 0
+        self.failures = 0
+
+    async def _database(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.database.ping(), ready_config.DB_TIMEOUT_SECONDS)
+            result: dict[str, Any] = {"reachable": True}
+        except Exception as e:
+            result = {"reachable": False, "error": f"{type(e).__name__}: {e}" if str(e) else type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        try:
+            result["pool"] = self.database.pool_stats()
+        except Exception as e:
+            result["pool"] = {"error": str(e)}
+        return result
+
+    async def _agent(self) -> dict[str, Any]:
+        try:
+            return await asyncio.wait_for(self.agent.ping(ready_config.AGENT_TIMEOUT_SECONDS), ready_config.AGENT_TIMEOUT_SECONDS + 1)
+        except Exception as e:
+            return {"reachable": False, "error": f"{type(e).__name__}: {e}"}
+
+    @staticmethod
+    async def _loop_lag_ms() -> float:
+        """Time a callback waits in the ready queue of the event loop, high when the loop is blocked or overloaded"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queued = time.perf_counter()
+        loop.call_soon(lambda: future.done() or future.set_result(time.perf_counter() - queued))
+        return round(await future * 1000, 2)
+
+    async def _run(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        loop_lag_ms = await self._loop_lag_ms()
+        database, agent = await asyncio.gather(self._database(), self._agent())
+
+        reasons = []
+        if not database["reachable"]:
+            reasons.append("database unreachable")
+        if not agent["reachable"] and ready_config.AGENT_REQUIRED:
+            reasons.append("agent backend unreachable")
+        if loop_lag_ms > ready_config.MAX_LOOP_LAG_MS:
+            reasons.append(f"event loop lag {loop_lag_ms}ms above {ready_config.MAX_LOOP_LAG_MS}ms")
+
+        self.probes += 1
+        if reasons:
+            self.failures += 1
+            logger.warning(f"Readiness probe degraded: {', '.join(reasons)}")
+        return {
+            "status": "degraded" if reasons else "ok",
+            "reasons": reasons,
+            "database": database,
+            "agent": agent,
+            "event_loop_lag_ms": loop_lag_ms,
+            "probe_ms": round((time.perf_counter() - started) * 1000, 2),
+            "checked_at": time.time(),
+        }
+
+    async def check(self) -> tuple[dict[str, Any], bool]:
+        """The probe result and whether it was served from the cache"""
+        if self._result is not None and time.monotonic() - self._checked_at < ready_config.CACHE_SECONDS:
+            return self._result, True
+        if self._probe is None:
+            self._probe = asyncio.create_task(self._run())
+        probe = self._probe
+        try:
+            # shielded, a caller giving up does not cancel the probe the other callers wait for
+            result = await asyncio.shield(probe)
+        finally:
+            if self._probe is probe and probe.done():
+                self._probe = None
+        if self._result is not result:
+            self._result, self._checked_at = result, time.monotonic()
+        return result, False
+
+
+# Global instance
+readiness_probe = ReadinessProbe(db_client, chat_agent)
@@ -22,6 +22,13 @@ BASE_URL = env.str("BASE_URL", SPACE_URL)
 API_KEY = env.str("API_KEY", "sk-test-xxx")
 CHAT_API_ENDPOINT = f"{BASE_URL}/v1/chat/completions"
 
+# UI -> API transport: "auto" (in-process when mounted into the API app, http otherwise), "http" or "inprocess"
+UI_TRANSPORT = env.str("UI_TRANSPORT", "auto")
+# max points per trace of the plots fetched by the UI, large series are downsampled by the API
+UI_PLOT_MAX_POINTS = env.int("UI_PLOT_MAX_POINTS", 5000)
+# messages loaded per page when a conversation is opened, older messages are loaded on demand
+UI_MESSAGE_PAGE_SIZE = env.int("UI_MESSAGE_PAGE_SIZE", 20)
+
 # Get absolute paths for static files
 STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 AVATAR_DIR = os.path.join(STATIC_DIR, "avatars")
@@ -132,10 +139,96 @@ class ChatMessageResponse:
     content: str
     figure: Optional[dict] = None
     error: Optional[str] = None
+    completion_id: Optional[str] = None
+    message_id: Optional[str] = None
+    # the message has a tabular result, its figure is generated on the first plot request
+    has_data: bool = False
+
+
+def _to_message_response(result: dict) -> ChatMessageResponse:
+    """
+    Convert a chat completion response payload to a ChatMessageResponse
+
+    Args:
+        result (dict): The chat completion response as a dict
+
+    Returns:
+        ChatMessageResponse: The message response for the UI
+    """
+    if "choices" in result and len(result["choices"]) > 0:
+        message = result["choices"][0].get("message", {})
+        figure = message.get("figure", None)
+        logger.trace(f"Figure: {figure}")
+        content = message.get("content", "Content not found")
+        logger.trace(f"Last message: {content}")
+        return ChatMessageResponse(
+            status=MessageStatus.SUCCESS,
+            content=content,
+            figure=figure,
+            completion_id=result.get("completion_id"),
+            message_id=message.get("message_id"),
+            has_data=message.get("data_row_count") is not None,
+        )
+
+    logger.error("Invalid API response")
+    return ChatMessageResponse(
+        status=MessageStatus.ERROR,
+        content="",
+        error="Invalid API response",
+    )
+
+
+def _to_history(messages: List[dict]) -> List[List[Optional[str]]]:
+    """
+    Convert messages in chronological order to the chatbot history format, [user message, assistant message] pairs
+
+    Args:
+        messages (List[dict]): The messages of a message page, oldest first
+
+    Returns:
+        List[List[Optional[str]]]: The chatbot history
+    """
+    history: List[List[Optional[str]]] = []
+    for message in messages:
+        content = message.get("content") or ""
+        if message.get("has_figure"):
+            content += "\n\n📊 (figure)"
+        if message.get("role") == "user" or not history or history[-1][1] is not None:
+            history.append([content, None] if message.get("role") == "user" else [None, content])
+        else:
+            history[-1][1] = content
+    return history
+
+
+def _prepend_history(older: List[List[Optional[str]]], history: List[List[Optional[str]]]) -> List[List[Optional[str]]]:
+    """
+    Prepend the history of an older message page, the user message ending the older page and
+    the assistant message starting the loaded history are merged back into one pair
+
+    Args:
+        older (List[List[Optional[str]]]): The chatbot history of the older page
+        history (List[List[Optional[str]]]): The loaded chatbot history
+
+    Returns:
+        List[List[Optional[str]]]: The chatbot history
+    """
+    if older and history and older[-1][1] is None and history[0][0] is None:
+        return older[:-1] + [[older[-1][0], history[0][1]]] + history[1:]
+    return older + history
+
+
+def _chat_request_payload(prompt: str) -> dict:
+    """Build the chat completion request payload sent for a UI prompt"""
+    return {
+        "messages": [{"role": "user", "content": prompt}],
+        "model": "gpt-3.5-turbo",
+        "completion_id": "new_chat",
+        "stream": True,
+    }
 
 
 class ChatAPI:
-    """Class to handle chat API interactions"""
+    """Class to handle chat API interactions over HTTP"""
 
     def __init__(self, base_url: str, api_key: str):
         self.base_url = base_url
@@ -158,12 +251,7 @@ class ChatAPI:
                 response = await client.post(
                     self.endpoint,
                     headers={"Authorization": f"Bearer {self.api_key}"},
-                    json={
-                        "messages": [{"role": "user", "content": prompt}],
-                        "model": "gpt-3.5-turbo",
-                        "completion_id": "new_chat",
-                        "stream": True,
-                    },
+                    json=_chat_request_payload(prompt),
                     timeout=30.0,  # Add timeout
                 )
 
@@ -180,25 +268,10 @@ class ChatAPI:
                 logger.trace("######################## BEGIN API response #########################")
                 logger.trace(json.dumps(result, indent=4))
                 logger.trace("######################## END API response #########################")
-
-                if "choices" in result and len(result["choices"]) > 0:
-                    message = result["choices"][0].get("message", {})
-                    figure = message.get("figure", None)
-                    logger.trace(f"Figure: {figure}")
-                    content = message.get("content", "Content not found")
-                    logger.trace(f"Last message: {content}")
-                    return ChatMessageResponse(
-                        status=MessageStatus.SUCCESS,
-                        content=content,
-                        figure=figure,
-                    )
-                else:
-                    logger.error("Invalid API response")
-                    return ChatMessageResponse(
-                        status=MessageStatus.ERROR,
-                        content="",
-                        error="Invalid API response",
-                    )
+                message_response = _to_message_response(result)
+                if message_response.figure is None and message_response.has_data:
+                    message_response.figure = await self.fetch_plot(client, message_response.completion_id, message_response.message_id)
+                return message_response
 
         except httpx.TimeoutException:
             logger.error("API request timed out")
@@ -215,11 +288,107 @@ class ChatAPI:
                 error=f"Error: {str(e)}",
             )
 
+    async def fetch_plot(self, client: httpx.AsyncClient, completion_id: str, message_id: str) -> Optional[dict]:
+        """Fetch the figure of a message, generated by the API on the first request"""
+        response = await client.get(
+            f"{self.endpoint}/{completion_id}/messages/{message_id}/plot",
+            params={"max_points": UI_PLOT_MAX_POINTS},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=30.0,
+        )
+        if response.status_code != 200:
+            logger.error(f"Plot API Error: {response.text}")
+            return None
+        return response.json()
+
+    async def fetch_messages(self, completion_id: str, before: Optional[str] = None) -> Optional[dict]:
+        """Fetch a page of the messages of a conversation without figures, the newest page or the page before a message"""
+        params = {"limit": UI_MESSAGE_PAGE_SIZE, "include_figures": False}
+        if before:
+            params["before"] = before
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{self.endpoint}/{completion_id}/messages",
+                params=params,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=30.0,
+            )
+        if response.status_code != 200:
+            logger.error(f"Messages API Error: {response.text}")
+            return None
+        return response.json()
+
+
+class InProcessChatAPI:
+    """
+    Class to handle chat API interactions in the same process as the API.
+    Calls ChatService directly instead of going through loopback HTTP, with the same API key authentication.
+    Only usable when the Gradio UI is mounted into the FastAPI application (see main.py).
+    """
+
+    def __init__(self, api_key: str):
+        # imported here so that the standalone UI (http transport) does not load the service and database layers
+        from app.security.auth_service import AuthService
+        from app.service.chat_service import ChatService
+
+        self.api_key = api_key
+        self.auth_service = AuthService()
+        self.chat_service = ChatService()
+
+    async def send_message(self, prompt: str) -> ChatMessageResponse:
+        """
+        Send a message to the chat service
+
+        Args:
+            prompt (str): The message to send
+
+        Returns:
+            ChatMessageResponse: The response from the service
+        """
+        from fastapi import HTTPException
+        from app.schema.chat_schema import ChatCompletionRequest
+
+        logger.trace(f"Calling chat service in-process with prompt: {prompt}")
+        try:
+            username = await self.auth_service.verify_credentials(f"Bearer {self.api_key}")
+            chat_completion = ChatCompletionRequest(**_chat_request_payload(prompt))
+            result = await self.chat_service.handle_chat_completion(chat_completion, username)
+            message_response = _to_message_response(result.model_dump())
+            if message_response.figure is None and message_response.has_data:
+                message_response.figure = await self.chat_service.find_plot_by_message(
+                    message_response.completion_id, message_response.message_id, UI_PLOT_MAX_POINTS
+                )
+            return message_response
+        except HTTPException as e:
+            logger.error(f"API Error: {e.detail}")
+            return ChatMessageResponse(
+                status=MessageStatus.ERROR,
+                content="",
+                error=f"API Error: {e.detail}",
+            )
+        except Exception as e:
+            logger.error(f"Error: {str(e)}")
+            return ChatMessageResponse(
+                status=MessageStatus.ERROR,
+                content="",
+                error=f"Error: {str(e)}",
+            )
+
+    async def fetch_messages(self, completion_id: str, before: Optional[str] = None) -> Optional[dict]:
+        """Fetch a page of the messages of a conversation without figures, the newest page or the page before a message"""
+        try:
+            await self.auth_service.verify_credentials(f"Bearer {self.api_key}")
+            page = await self.chat_service.find_message_page(completion_id, UI_MESSAGE_PAGE_SIZE, before=before, include_figures=False)
+            return page.model_dump(mode="json", by_alias=True) if page else None
+        except Exception as e:
+            logger.error(f"Error: {str(e)}")
+            return None
+
 
 class ChatInterface:
     """Class to handle the Gradio chat interface"""
 
-    def __init__(self, chat_api: ChatAPI):
+    def __init__(self, chat_api: ChatAPI | InProcessChatAPI):
         self.chat_api = chat_api
         self.demo = self._build_interface()
 
@@ -276,6 +445,15 @@ class ChatInterface:
                     status = gr.Textbox(label="Status", interactive=False)
                     last_message = gr.Textbox(label="Last Message", interactive=False)
 
+                    # Open a stored conversation, its newest messages first and older ones on demand
+                    with gr.Accordion("Open Conversation", open=False):
+                        with gr.Row():
+                            conversation_id = gr.Textbox(label="Conversation ID", placeholder="completion_id", scale=4)
+                            open_btn = gr.Button("Open", variant="secondary", scale=1)
+                        older_btn = gr.Button("Load Older Messages", variant="secondary", visible=False)
+                    # the message_id of the oldest loaded message, None when all messages are loaded
+                    oldest_message_id = gr.State(None)
+
             # Event handlers
             async def user_message(message: str, history: List[List[str]]) -> Tuple[List[List[str]], str, str, str, object]:
                 """Handle user message submission"""
@@ -319,6 +497,36 @@ class ChatInterface:
                         None,
                     )
 
+            async def open_conversation(completion_id: str) -> tuple[list[list[Optional[str]]], str, Optional[str], dict]:
+                """Load the newest page of the messages of a conversation"""
+                if not completion_id.strip():
+                    return [], "Please enter a conversation id.", None, gr.update(visible=False)
+                page = await self.chat_api.fetch_messages(completion_id.strip())
+                if page is None:
+                    return [], "Conversation not found.", None, gr.update(visible=False)
+                messages = list(reversed(page["data"]))  # pages are newest first
+                oldest = page["last_id"] if page["has_more"] else None
+                status_text = f"Loaded {len(messages)} of {page['total']} messages."
+                return _to_history(messages), status_text, oldest, gr.update(visible=oldest is not None)
+
+            async def load_older_messages(
+                completion_id: str, history: List[List[Optional[str]]], before: Optional[str]
+            ) -> tuple[list[list[Optional[str]]], str, Optional[str], dict]:
+                """Prepend the page of messages before the oldest loaded message"""
+                if not before:
+                    return history, "All messages are loaded.", None, gr.update(visible=False)
+                page = await self.chat_api.fetch_messages(completion_id.strip(), before=before)
+                if page is None:
+                    return history, "Older messages could not be loaded.", before, gr.update(visible=True)
+                messages = list(reversed(page["data"]))
+                oldest = page["last_id"] if page["has_more"] else None
+                return (
+                    _prepend_history(_to_history(messages), history),
+                    f"Loaded {len(messages)} older messages.",
+                    oldest,
+                    gr.update(visible=oldest is not None),
+                )
+
             def clear_history() -> tuple[list[Any], str, str, str, None]:
                 """Clear chat history"""
                 return [], "", "Chat cleared.", "", None
@@ -364,16 +572,56 @@ class ChatInterface:
                 outputs=[chatbot, msg, status, last_message, plot],
             )
 
+            open_btn.click(
+                fn=open_conversation,
+                inputs=[conversation_id],
+                outputs=[chatbot, status, oldest_message_id, older_btn],
+            )
+
+            older_btn.click(
+                fn=load_older_messages,
+                inputs=[conversation_id, chatbot, oldest_message_id],
+                outputs=[chatbot, status, oldest_message_id, older_btn],
+            )
+
         return demo
 
 
-def build_gradio_app() -> gr.Blocks:
+def create_chat_api(mounted: bool = False) -> ChatAPI | InProcessChatAPI:
+    """
+    Create the chat API transport for the UI based on UI_TRANSPORT
+
+    Args:
+        mounted (bool): Whether the UI is mounted into the API application process
+
+    Returns:
+        ChatAPI | InProcessChatAPI: The chat API transport
+    """
+    transport = UI_TRANSPORT.lower()
+    if transport == "auto":
+        transport = "inprocess" if mounted else "http"
+
+    if transport == "inprocess":
+        if not mounted:
+            raise ValueError("UI_TRANSPORT=inprocess requires the UI to be mounted into the API application")
+        logger.info("Using in-process chat transport for Gradio UI")
+        return InProcessChatAPI(API_KEY)
+    if transport == "http":
+        logger.info(f"Using http chat transport for Gradio UI. BASE_URL: {BASE_URL}")
+        return ChatAPI(BASE_URL, API_KEY)
+    raise ValueError(f"Unsupported UI_TRANSPORT: {UI_TRANSPORT}")
+
+
+def build_gradio_app(mounted: bool = False) -> gr.Blocks:
     """
     Build and return the Gradio application
 
+    Args:
+        mounted (bool): Whether the UI is mounted into the API application process
+
     Returns:
         gr.Blocks: The Gradio interface
     """
-    chat_api = ChatAPI(BASE_URL, API_KEY)
+    chat_api = create_chat_api(mounted)
     chat_interface = ChatInterface(chat_api)
     return chat_interface.demo
@@ -1,13 +1,32 @@
+# imported first, its import hook times the imports of the application (see /management/startup)
+from app.core.startup_profiler import startup_profiler
+from app.config.memory import memory_config
+
+if memory_config.TRACEMALLOC_AT_STARTUP:
+    import tracemalloc
+
+    tracemalloc.start(memory_config.TRACEMALLOC_FRAMES)
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import chat_api, conversation_api, management_api
+from app.api import batch_api, chat_api, conversation_api, management_api
 from loguru import logger
 from contextlib import asynccontextmanager
 from app.db.factory import db_client
-from gradio_chatbot import build_gradio_app, app_auth
-import gradio as gr
+from app.agent.factory import chat_agent
 from app.core.initial_setup.setup import InitialSetup
+from app.service.chat_service import ChatService
+from app.service.completion_job_worker import completion_job_worker
+from app.service.enrichment_pipeline import enrichment_pipeline
+from app.service.batch_service import batch_runner
+from app.config.server import server_config
+from app.config.metrics import metrics_config
+from app.core.metrics import MetricsMiddleware
+from app.config.tracing import tracing_config
+from app.core.tracing import TracingMiddleware, tracer
+from app.config.profiling import profiling_config
+from app.core.request_profiler import ProfilingMiddleware
 
 
 @asynccontextmanager
@@ -18,17 +37,37 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("Starting up application...")
-    await db_client.connect()
+    with startup_profiler.phase("db_connect"):
+        await db_client.connect()
 
     # Run initial setup if database type is embedded
-    initial_setup = InitialSetup()
-    await initial_setup.setup()
+    with startup_profiler.phase("initial_setup"):
+        initial_setup = InitialSetup()
+        await initial_setup.setup()
+
+    # Start the post-response enrichment pipeline (titles, snippets)
+    with startup_profiler.phase("enrichment_pipeline_start"):
+        await enrichment_pipeline.start()
+
+    # Start background completion workers, picks up jobs left by a previous run
+    with startup_profiler.phase("completion_job_worker_start"):
+        await completion_job_worker.start(ChatService().process_completion_job)
+
+    # Start the batch runner, resumes batches left by a previous run
+    with startup_profiler.phase("batch_runner_start"):
+        await batch_runner.start()
 
+    startup_profiler.milestone("ready")
     yield
 
     # Shutdown
     logger.info("Shutting down application...")
+    await batch_runner.stop()
+    await completion_job_worker.stop()
+    await enrichment_pipeline.stop()
+    await chat_agent.close()
     await db_client.close()
+    tracer.exporter.close()
 
 
 VERSION = "0.3.0"
@@ -50,7 +89,14 @@ Talk to your data chat and visualize API
     - GET  `/v1/chat/completions/{completion_id}`: getChatCompletion - Get a stored chat completion. Only Chat Completions that have been created with the `store` parameter set to `true` will be returned.
     - POST `/v1/chat/completions/{completion_id}`: modifyChatCompletion - Modify a stored chat completion.
     - DELETE `/v1/chat/completions/{completion_id}`: deleteChatCompletion - Delete a stored chat completion.
-    - GET  `/v1/chat/completions/{completion_id}/messages`: getChatCompletionMessages - Get the messages in a stored chat completion.
+    - GET  `/v1/chat/completions/{completion_id}/messages`: getChatCompletionMessages - Get a page of the messages in a stored chat completion (`limit`, `before`/`after` cursors, `order`, `include_figures`).
+
+    ### Batch (openai compatible APIs) - Offline chat completions from an NDJSON file, processed in the background.
+    - POST `/v1/batches`: createBatch - Create a batch from an NDJSON body, one chat completion request per line.
+    - GET  `/v1/batches`: listBatches - List the batches of the current user.
+    - GET  `/v1/batches/{batch_id}`: retrieveBatch - Get the status and request counts of a batch.
+    - POST `/v1/batches/{batch_id}/cancel`: cancelBatch - Cancel a queued or running batch.
+    - GET  `/v1/batches/{batch_id}/results`: getBatchResults - Stream the results of a batch as NDJSON.
 
     ### Plots( custom endpoints)
     - GET  `/v1/chat/completions/{completion_id}/messages/{message_id}/plots`: getChatPlotByMessage - Get the plot for a specific message in a chat.
@@ -73,7 +119,7 @@ app = FastAPI(
     openapi_url="/openapi.json",
     lifespan=lifespan,
     openapi_tags=openapi_tags,
-    debug=True,
+    debug=server_config.DEBUG,
 )
 
 # Configure OpenAPI security scheme
@@ -91,16 +137,38 @@ app.openapi_components = {
 # Configure CORS
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
+# On-demand profiling of single requests (/management/profiles)
+if profiling_config.ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request tracing, a span per request with the service, repository and agent calls as child spans
+if tracing_config.ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# Request metrics (/management/metrics), outermost so the latency covers the other middlewares
+if metrics_config.ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/.well-known", StaticFiles(directory=".well-known"), name="well-known")
 
 app.include_router(chat_api.router)
 app.include_router(management_api.router)
 app.include_router(conversation_api.router)
+app.include_router(batch_api.router)
+
+# Build and mount Gradio app, only in single worker servers (see app/serve.py).
+# API-only servers (SERVER_MOUNT_UI=false) never import gradio and plotly, the UI runs as its own process: python -m app.serve_ui
+if server_config.MOUNT_UI:
+    with startup_profiler.phase("gradio_ui"):
+        import gradio as gr
+        from gradio_chatbot import build_gradio_app, app_auth
+
+        demo = build_gradio_app(mounted=True)
+        app = gr.mount_gradio_app(app, demo, path="/ui", auth=app_auth)
 
-# Build and mount Gradio app
-demo = build_gradio_app()
-app = gr.mount_gradio_app(app, demo, path="/ui", auth=app_auth)
+startup_profiler.milestone("imported")
 
 
-# uv run uvicorn main:app --host 0.0.0.0 --port 7860 --reload
+# development: uv run uvicorn main:app --host 0.0.0.0 --port 7860 --reload
+# production: uv run python -m app.serve
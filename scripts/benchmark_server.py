@@ -0,0 +1,115 @@
+"""
+Server Profile Benchmark Script
+
+This script compares the throughput and latency of the development server
+(`uvicorn main:app`, asyncio event loop and h11 http parser, 1 process) with the
+production server (`python -m app.serve`, uvloop, httptools, SERVER_WORKERS processes
+forked from the preloaded application). Each server is started as a subprocess on its
+own port and loaded with concurrent keep-alive requests.
+
+Usage:
+    uv run python scripts/benchmark_server.py [--requests 5000] [--concurrency 64] [--workers 0]
+
+Example (conversation list of an authenticated user, external MongoDB):
+    DB_DATABASE_TYPE=mongodb uv run python scripts/benchmark_server.py --path /v1/conversations --api-key <key>
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "uvicorn (asyncio, h11, 1 process)": [
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--loop", "asyncio", "--http", "h11", "--no-access-log", "--log-level", "warning",
+    ],
+    "app.serve (uvloop, httptools, preload)": [sys.executable, "-m", "app.serve"],
+}  # fmt: skip
+
+
+async def wait_until_ready(client: httpx.AsyncClient, url: str, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"The server did not answer {url} within {timeout}s")
+
+
+async def load(args, base_url: str) -> dict:
+    headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        await wait_until_ready(client, "/management/health")
+        # warm up every worker before measuring
+        await asyncio.gather(*[client.get(args.path) for _ in range(args.concurrency * 2)])
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        failures = 0
+
+        async def one() -> None:
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(args.path)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(args.requests)])
+        elapsed = time.perf_counter() - started
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "failures": failures,
+        "p50": statistics.median(latencies_ms) if latencies_ms else 0,
+        "p99": latencies_ms[max(0, int(len(latencies_ms) * 0.99) - 1)] if latencies_ms else 0,
+    }
+
+
+def run_profile(args, name: str, command: list, port: int) -> dict:
+    env = dict(os.environ, SERVER_HOST="127.0.0.1", SERVER_PORT=str(port), SERVER_WORKERS=str(args.workers), SERVER_MOUNT_UI="false")
+    process = subprocess.Popen(command + (["--port", str(port)] if "uvicorn" in command else []), cwd=ROOT, env=env)
+    try:
+        return asyncio.run(load(args, f"http://127.0.0.1:{port}"))
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the development and the production server profiles")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=0, help="SERVER_WORKERS of the production server, 0: one per CPU core")
+    parser.add_argument("--path", default="/management/health")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--port", type=int, default=8780)
+    args = parser.parse_args()
+
+    print(f"cpus={os.cpu_count()} requests={args.requests} concurrency={args.concurrency} path={args.path}")
+    for offset, (name, command) in enumerate(PROFILES.items()):
+        result = run_profile(args, name, command, args.port + offset)
+        print(
+            f"{name}: throughput={result['throughput']:.1f} req/s failures={result['failures']} "
+            f"p50={result['p50']:.2f}ms p99={result['p99']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
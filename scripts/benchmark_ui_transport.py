@@ -0,0 +1,88 @@
+"""
+UI Transport Benchmark Script
+
+This script measures the per-message latency of the Gradio UI chat transports:
+- inprocess: InProcessChatAPI calls ChatService directly in the API process
+- http: ChatAPI calls POST /v1/chat/completions over loopback HTTP
+
+Both modes run against the same application instance (main:app) and database,
+so the difference is the cost of the loopback HTTP round trip (socket I/O, auth,
+request parsing and response serialization).
+
+Usage:
+    uv run python scripts/benchmark_ui_transport.py [--messages 200] [--port 7861]
+
+Example:
+    DB_DATABASE_TYPE=embedded LOG_LEVEL=WARNING uv run python scripts/benchmark_ui_transport.py --messages 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from gradio_chatbot import API_KEY, ChatAPI, InProcessChatAPI, MessageStatus
+
+
+def _summary(mode: str, latencies: list[float], errors: int) -> str:
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    p95_index = max(0, int(len(latencies_ms) * 0.95) - 1)
+    return (
+        f"{mode:<10} messages={len(latencies_ms):<5} errors={errors:<4} "
+        f"mean={statistics.mean(latencies_ms):8.2f}ms "
+        f"p50={statistics.median(latencies_ms):8.2f}ms "
+        f"p95={latencies_ms[p95_index]:8.2f}ms"
+    )
+
+
+async def _run(chat_api, messages: int, warmup: int) -> tuple[list[float], int]:
+    for i in range(warmup):
+        await chat_api.send_message(f"warmup question {i}")
+
+    latencies = []
+    errors = 0
+    for i in range(messages):
+        started = time.perf_counter()
+        response = await chat_api.send_message(f"count of customers by status {i}")
+        latencies.append(time.perf_counter() - started)
+        if response.status != MessageStatus.SUCCESS:
+            errors += 1
+    return latencies, errors
+
+
+async def benchmark(messages: int, warmup: int, port: int) -> None:
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    try:
+        in_process = await _run(InProcessChatAPI(API_KEY), messages, warmup)
+        http = await _run(ChatAPI(f"http://127.0.0.1:{port}", API_KEY), messages, warmup)
+    finally:
+        server.should_exit = True
+        await server_task
+
+    print(_summary("inprocess", *in_process))
+    print(_summary("http", *http))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark Gradio UI chat transports")
+    parser.add_argument("--messages", type=int, default=200, help="Number of measured messages per mode")
+    parser.add_argument("--warmup", type=int, default=10, help="Number of warmup messages per mode")
+    parser.add_argument("--port", type=int, default=7861, help="Port for the loopback HTTP server")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.messages, args.warmup, args.port))
+
+
+if __name__ == "__main__":
+    main_cli()
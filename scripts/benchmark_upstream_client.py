@@ -0,0 +1,95 @@
+"""
+Upstream Agent Client Benchmark Script
+
+This script measures the throughput and latency of the pooled OpenAI compatible
+upstream agent client (OpenAIChatAgentClient) against the bundled fake upstream
+server (app/agent/fake_upstream.py), fully offline.
+
+Usage:
+    uv run python scripts/benchmark_upstream_client.py [--requests 1000] [--concurrency 50] [--latency 0.05]
+
+Example (10% injected 503 errors, streamed responses):
+    uv run python scripts/benchmark_upstream_client.py --error-rate 0.1 --stream
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agent.chat_agent_scheme import UserChatAgentRequest
+from app.agent.fake_upstream import FakeUpstreamSettings, create_fake_upstream_app
+from app.agent.openai_agent_client import OpenAIChatAgentClient
+
+
+async def benchmark(args) -> None:
+    settings = FakeUpstreamSettings(
+        latency_seconds=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+    )
+    server = uvicorn.Server(uvicorn.Config(create_fake_upstream_app(settings), host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    client = OpenAIChatAgentClient(
+        base_url=f"http://127.0.0.1:{args.port}/v1",
+        stream=args.stream,
+        backoff_base_seconds=0.01,
+        max_connections=args.concurrency,
+        max_keepalive_connections=args.concurrency,
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await client.process(UserChatAgentRequest(message=f"count of customers by status {i}"))
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[one(i) for i in range(args.requests)])
+    finally:
+        elapsed = time.perf_counter() - started
+        await client.close()
+        server.should_exit = True
+        await server_task
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    print(f"requests={args.requests} concurrency={args.concurrency} stream={args.stream} error_rate={args.error_rate}")
+    print(f"throughput={len(latencies) / elapsed:.1f} req/s failures={failures} stats={client.stats()}")
+    if latencies_ms:
+        print(
+            f"latency mean={statistics.mean(latencies_ms):.2f}ms p50={statistics.median(latencies_ms):.2f}ms "
+            f"p95={latencies_ms[max(0, int(len(latencies_ms) * 0.95) - 1)]:.2f}ms max={latencies_ms[-1]:.2f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the upstream agent client against the fake upstream")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake upstream seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
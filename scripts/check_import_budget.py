@@ -0,0 +1,81 @@
+"""
+API Import Budget Check
+
+This script imports the API application (main:app) the way an API-only worker does
+(SERVER_MOUNT_UI=false) in a fresh interpreter with `python -X importtime`, and fails
+(exit code 1) when the import takes longer than the budget or a UI only module
+(gradio, plotly) is imported on the API startup path. Run it in CI after dependency
+or import changes.
+
+Usage:
+    uv run python scripts/check_import_budget.py [--budget-ms 1500] [--runs 3] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules the API-only startup path must never import
+FORBIDDEN_MODULES = ("gradio", "gradio_chatbot", "plotly")
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_app() -> tuple[int, list[tuple[int, str]], list[str]]:
+    """Import time (us) of main, the imports of main with their cumulative time and the forbidden modules imported"""
+    code = f"import sys, main; print(','.join(m for m in {FORBIDDEN_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, SERVER_MOUNT_UI="false")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing main failed:\n{result.stderr[-4000:]}")
+
+    # a module is printed after its imports, which are indented by two more spaces
+    total, children, imports = 0, [], []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 3:
+            children.append((cumulative, module))
+        elif indent == 1:
+            if module == "main":
+                total, imports = cumulative, children
+            children = []
+    forbidden = [module for module in result.stdout.strip().split(",") if module]
+    return total, imports, forbidden
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the API-only startup path")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Max import time of main:app in milliseconds")
+    parser.add_argument("--runs", type=int, default=3, help="The fastest run is compared with the budget")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports of main to print")
+    args = parser.parse_args()
+
+    runs = [import_app() for _ in range(args.runs)]
+    total, imports, forbidden = min(runs, key=lambda run: run[0])
+    print(
+        f"import main (SERVER_MOUNT_UI=false): {total / 1000:.0f}ms, budget: {args.budget_ms:.0f}ms, runs: {[round(run[0] / 1000) for run in runs]}"
+    )
+    for cumulative, module in sorted(imports, reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {module}")
+
+    failed = False
+    if forbidden:
+        print(f"FAILED: the API startup path imports UI only modules: {', '.join(forbidden)}")
+        failed = True
+    if total / 1000 > args.budget_ms:
+        print(f"FAILED: import time {total / 1000:.0f}ms exceeds the budget of {args.budget_ms:.0f}ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tabular Results Check
+
+This script exercises the columnar result path in-process (embedded database, API-only, security disabled):
+a conversation whose assistant message has a TabularResult and no figure is saved, then
+
+- GET /v1/chat/completions/{completion_id}/messages renders the first RESULT_MARKDOWN_MAX_ROWS rows into
+  the content, sets data_row_count, and has_figure when figures are omitted
+- GET .../messages/{message_id}/data pages through the rows, the values round-trip through the column buffers
+- GET .../messages/{message_id}/plot generates the figure once and saves it back to the message
+
+It fails (exit code 1) on the first check which does not hold.
+
+Usage:
+    uv run python scripts/check_tabular_results.py [--rows 1000]
+"""
+
+import argparse
+import os
+import sys
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+os.environ.setdefault("DB_DATABASE_TYPE", "embedded")
+os.environ.setdefault("SECURITY_ENABLED", "false")
+os.environ.setdefault("SERVER_MOUNT_UI", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from loguru import logger
+
+logger.remove()
+logger.add(sys.stderr, level="ERROR")
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from app.model.chat_model import ChatCompletion, ChatMessageModel
+from app.model.tabular_model import TabularResult
+from app.repository.chat_repository import ChatRepository
+
+
+def check(condition: bool, description: str) -> None:
+    print(f"{'OK  ' if condition else 'FAIL'} {description}")
+    if not condition:
+        sys.exit(1)
+
+
+def main_check():
+    parser = argparse.ArgumentParser(description="Check the columnar result path: markdown rendering, data pages and lazy figures")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows of the tabular result")
+    args = parser.parse_args()
+
+    day = np.datetime64("2024-01-01", "ms") + np.arange(args.rows) * np.timedelta64(1, "D")
+    sales = np.round(np.random.default_rng(7).uniform(0, 1000, args.rows), 2)
+    data = TabularResult.from_columns({"day": day, "sales": sales})
+
+    completion_id = f"tabular-{uuid.uuid4().hex[:8]}"
+    message_id = f"{completion_id}-2"
+    completion = ChatCompletion(
+        completion_id=completion_id,
+        model="gpt-4o",
+        created_by="anonymous",
+        messages=[
+            ChatMessageModel(message_id=f"{completion_id}-1", role="user", content="show the sales by day"),
+            ChatMessageModel(message_id=message_id, role="assistant", content="Here are the sales by day", data=data),
+        ],
+    )
+
+    with TestClient(main.app) as client:
+        repository = ChatRepository()
+        client.portal.call(repository.save, completion)
+        base = f"/v1/chat/completions/{completion_id}/messages"
+
+        page = client.get(base, params={"include_figures": False}).json()
+        message = next(message for message in page["data"] if message["message_id"] == message_id)
+        check(message["data_row_count"] == args.rows, f"data_row_count is {args.rows}")
+        check("|day|sales|" in message["content"], "the content has a markdown table")
+        check(message.get("has_figure") is True, "has_figure is set for a tabular result without a figure")
+
+        rows = client.get(f"{base}/{message_id}/data", params={"offset": args.rows - 10, "limit": 100}).json()
+        check(len(rows["rows"]) == min(10, args.rows), "the last data page has the remaining rows")
+        check(rows["rows"][-1][1] == float(sales[-1]), "the values round-trip through the column buffers")
+
+        figure = client.get(f"{base}/{message_id}/plot").json()
+        check(bool(figure and figure.get("data")), "the plot is generated from the tabular result")
+        stored = client.portal.call(repository.find_message, completion_id, message_id)
+        check(stored is not None and stored.figure is not None, "the generated figure is saved back to the message")
+
+    print("OK: the columnar result path works")
+
+
+if __name__ == "__main__":
+    main_check()
@@ -0,0 +1,97 @@
+"""
+Startup Profile and Budget Check
+
+This script starts the production server (`python -m app.serve`, 1 worker) with the embedded
+database, measures the wall time from the process spawn to the first healthy response of
+/management/health, prints the startup profile of the server (/management/startup: milestones,
+lifespan phases and the import tree) and fails (exit code 1) when the time to the first healthy
+response exceeds the budget (STARTUP_BUDGET_SECONDS). Run it in CI to catch cold start regressions.
+
+Usage:
+    uv run python scripts/profile_startup.py [--budget-seconds 10] [--api-only] [--min-ms 20] [--depth 3]
+
+Example (JSON profile of an API-only worker):
+    uv run python scripts/profile_startup.py --api-only --json > startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.config.startup import startup_config
+
+
+def wait_until_healthy(process: subprocess.Popen, base_url: str, timeout: float) -> float:
+    """Seconds from now to the first 200 of /management/health"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode} before it was healthy")
+        try:
+            if httpx.get(f"{base_url}/management/health", timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"The server was not healthy within {timeout}s")
+
+
+def print_imports(nodes: list, indent: int = 1) -> None:
+    for node in nodes:
+        print(f"{'  ' * indent}{node['cumulative_ms']:9.1f}ms {node['self_ms']:8.1f}ms  {node['module']}")
+        print_imports(node.get("imports", []), indent + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the startup of the server and check the time to the first healthy response")
+    parser.add_argument("--budget-seconds", type=float, default=startup_config.BUDGET_SECONDS)
+    parser.add_argument("--api-only", action="store_true", help="SERVER_MOUNT_UI=false, without the Gradio UI")
+    parser.add_argument("--min-ms", type=float, default=20, help="Leave out imports faster than min-ms")
+    parser.add_argument("--depth", type=int, default=3, help="Levels of the import tree")
+    parser.add_argument("--json", action="store_true", help="Print the profile as JSON")
+    parser.add_argument("--port", type=int, default=8795)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DB_DATABASE_TYPE="embedded", SERVER_WORKERS="1", SERVER_HOST="127.0.0.1", SERVER_PORT=str(args.port))
+    if args.api_only:
+        env["SERVER_MOUNT_UI"] = "false"
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    process = subprocess.Popen([sys.executable, "-m", "app.serve"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        healthy_seconds = wait_until_healthy(process, base_url, timeout=max(args.budget_seconds * 3, 60))
+        profile = httpx.get(f"{base_url}/management/startup", params={"min_ms": args.min_ms, "depth": args.depth}, timeout=10).json()
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    profile["time_to_first_healthy_seconds"] = round(healthy_seconds, 4)
+    if args.json:
+        print(json.dumps(profile, indent=2))
+    else:
+        print(f"time to first healthy response: {healthy_seconds:.2f}s (budget: {args.budget_seconds:.2f}s, api only: {args.api_only})")
+        print(f"process age at profiler import: {profile['process_age_at_profiler_import_seconds']}s")
+        print("milestones (seconds since the process start):")
+        for name, seconds in profile["milestones"].items():
+            print(f"  {seconds:8.3f}s  {name}")
+        print("phases:")
+        for phase in profile["phases"]:
+            print(f"  {phase['seconds']:8.3f}s  {phase['name']} (at {phase['at_seconds']:.3f}s)")
+        print(f"imports: {profile['import_seconds']:.3f}s (cumulative, self)")
+        print_imports(profile["imports"])
+
+    if healthy_seconds > args.budget_seconds:
+        print(f"FAILED: time to first healthy response {healthy_seconds:.2f}s exceeds the budget of {args.budget_seconds:.2f}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Memory Soak Test
+
+This script runs thousands of chat turns against the application in-process (embedded database,
+API-only, security disabled) and checks that the memory of the worker plateaus. Conversations
+have --turns-per-conversation turns, only the last --keep-conversations conversations are kept in
+the embedded database, so the stored data stays bounded and any steady growth is a leak.
+
+After --warmup turns, tracemalloc is started with a baseline snapshot (POST /management/memory/snapshots).
+The traced memory and RSS (GET /management/memory) are printed at every checkpoint. The test fails
+(exit code 1) when the traced memory still grows by more than --max-growth-kb over the second half
+of the run, and prints the lines which allocated the growth (GET /management/memory/snapshots/{id}/diff).
+
+Usage:
+    uv run python scripts/soak_memory.py [--turns 3000] [--warmup 300] [--checkpoints 6] [--max-growth-kb 512]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+os.environ.setdefault("DB_DATABASE_TYPE", "embedded")
+os.environ.setdefault("SECURITY_ENABLED", "false")
+os.environ.setdefault("SERVER_MOUNT_UI", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("MEMORY_TRACEMALLOC_AT_STARTUP", "false")
+
+from loguru import logger
+
+# the file log of LOG_LEVEL is kept, the console only shows errors
+logger.remove()
+logger.add(sys.stderr, level="ERROR")
+
+from fastapi.testclient import TestClient
+
+import main
+from app.db.factory import db_client
+
+
+class Soak:
+    def __init__(self, client: TestClient, turns_per_conversation: int, keep_conversations: int):
+        self.client = client
+        self.turns_per_conversation = turns_per_conversation
+        self.keep_conversations = keep_conversations
+        self.conversations: list[str] = []
+        self.turns = 0
+        self.errors = 0
+
+    def _delete_conversations(self, completion_ids: list[str]) -> None:
+        async def delete():
+            await db_client.db.chat_completion.delete_many({"completion_id": {"$in": completion_ids}})
+
+        self.client.portal.call(delete)
+
+    def conversation(self) -> None:
+        completion_id = None
+        for turn in range(self.turns_per_conversation):
+            body = {
+                "model": "gpt-4o",
+                # repeated prompts, the agent response cache gets hits and evictions
+                "messages": [{"role": "user", "content": f"show the sales of product {self.turns % 500} by month, turn {turn}"}],
+            }
+            if completion_id:
+                body["completion_id"] = completion_id
+            response = self.client.post("/v1/chat/completions", json=body)
+            self.turns += 1
+            if response.status_code != 200:
+                self.errors += 1
+                continue
+            completion_id = response.json()["completion_id"]
+        if completion_id:
+            self.client.get(f"/v1/chat/completions/{completion_id}/messages")
+            self.conversations.append(completion_id)
+        if len(self.conversations) > self.keep_conversations:
+            self._delete_conversations(self.conversations[: -self.keep_conversations])
+            self.conversations = self.conversations[-self.keep_conversations :]
+
+    def run(self, turns: int) -> None:
+        target = self.turns + turns
+        while self.turns < target:
+            self.conversation()
+
+
+def memory(client: TestClient) -> dict:
+    return client.get("/management/memory", params={"collect": True}).json()
+
+
+def main_soak():
+    parser = argparse.ArgumentParser(description="Run chat turns in-process and check that the memory plateaus")
+    parser.add_argument("--turns", type=int, default=3000, help="Measured chat turns, after the warmup")
+    parser.add_argument("--warmup", type=int, default=300, help="Chat turns before the baseline (caches, lazy imports, pools)")
+    parser.add_argument("--checkpoints", type=int, default=6)
+    parser.add_argument("--turns-per-conversation", type=int, default=5)
+    parser.add_argument("--keep-conversations", type=int, default=20, help="Conversations kept in the embedded database")
+    parser.add_argument("--max-growth-kb", type=float, default=512, help="Allowed traced memory growth over the second half of the run")
+    parser.add_argument("--top", type=int, default=15, help="Lines shown when the memory keeps growing")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        soak = Soak(client, args.turns_per_conversation, args.keep_conversations)
+        started = time.perf_counter()
+        soak.run(args.warmup)
+        baseline = client.post("/management/memory/snapshots").json()["id"]
+        print(f"warmup: {soak.turns} turns in {time.perf_counter() - started:.1f}s, baseline snapshot {baseline}")
+        print(f"{'turns':>8} {'traced KB':>10} {'RSS MB':>8} {'gc objects':>11}  tracked objects")
+
+        points, middle = [], None
+        per_checkpoint = max(1, args.turns // args.checkpoints)
+        for checkpoint in range(1, args.checkpoints + 1):
+            soak.run(per_checkpoint)
+            report = memory(client)
+            traced_kb = report["tracemalloc"]["traced_bytes"] / 1024
+            points.append(traced_kb)
+            objects = ", ".join(f"{name}={count}" for name, count in report["objects"]["types"].items() if count)
+            rss_mb = (report["process"]["rss_bytes"] or 0) / 1024 / 1024
+            print(f"{soak.turns:>8} {traced_kb:>10.1f} {rss_mb:>8.1f} {report['objects']['gc_tracked']:>11}  {objects}")
+            if checkpoint == args.checkpoints // 2:
+                middle = (client.post("/management/memory/snapshots").json()["id"], traced_kb)
+
+        last = client.post("/management/memory/snapshots").json()["id"]
+        middle_id, middle_kb = middle or (baseline, 0.0)
+        growth_kb = points[-1] - middle_kb
+        print(f"documents: {report['embedded_database_documents']}, agent cache entries: {report['agent_cache_entries']}")
+        print(f"{soak.turns} turns ({soak.errors} errors) in {time.perf_counter() - started:.1f}s")
+        print(f"traced memory growth over the second half: {growth_kb:.1f}KB (max {args.max_growth_kb}KB)")
+
+        if growth_kb > args.max_growth_kb or soak.errors:
+            diff = client.get(f"/management/memory/snapshots/{last}/diff", params={"against": middle_id, "limit": args.top}).json()
+            print("largest allocation changes over the second half:")
+            for stat in diff["top"]:
+                print(f"  {stat['size_diff_bytes'] / 1024:>+10.1f}KB {stat['count_diff']:>+8}  {stat['location']}")
+            print("FAIL: the memory does not plateau" if growth_kb > args.max_growth_kb else f"FAIL: {soak.errors} chat turns failed")
+            sys.exit(1)
+        client.delete("/management/memory/snapshots")
+        print("OK: the memory plateaus")
+
+
+if __name__ == "__main__":
+    main_soak()